@@ -26,13 +26,17 @@ class BaseAgent:
         query: str,
         limit: int = 3,
         user_id: Optional[str] = None,
+        score_threshold: Optional[float] = None,
     ) -> List[Dict[str, Any]]:
         """
         Busca memória relacionada para o agente.
 
         Implementação padrão:
-        - Se existir `self.vector_store` com método `get_user_context`,
-          retorna o contexto desse user_id (ignorando `query` por enquanto).
+        - Se existir `self.vector_store` com método `search`, faz busca vetorial
+          pela `query` filtrada pelo user_id: até `limit` resultados com score
+          >= `score_threshold` (default: config `memory_score_threshold`).
+        - Se só existir `get_user_context`, retorna o contexto recente desse
+          user_id (sem usar `query`).
         - Caso contrário, retorna lista vazia.
         """
         if not self.enable_memory:
@@ -43,13 +47,29 @@ class BaseAgent:
             logger.debug(f"[{self.agent_id}] search_memory called without user_id")
             return []
 
+        if score_threshold is None:
+            score_threshold = self.config.get("memory_score_threshold")
+
         try:
-            if hasattr(self, "vector_store") and hasattr(self.vector_store, "get_user_context"):
+            vector_store = getattr(self, "vector_store", None)
+            if hasattr(vector_store, "search"):
+                logger.debug(
+                    f"[{self.agent_id}] search_memory using vector_store.search "
+                    f"(user_id={user_id}, limit={limit}, score_threshold={score_threshold})"
+                )
+                hits = await vector_store.search(
+                    query=query,
+                    user_id=user_id,
+                    k=limit,
+                    score_threshold=score_threshold,
+                )
+                return hits or []
+            elif hasattr(vector_store, "get_user_context"):
                 logger.debug(
                     f"[{self.agent_id}] search_memory using vector_store.get_user_context "
                     f"(user_id={user_id}, limit={limit})"
                 )
-                context = await self.vector_store.get_user_context(
+                context = await vector_store.get_user_context(
                     user_id=user_id,
                     k=limit,
                 )
@@ -1,3 +1,4 @@
+from .prefetch import CatalogPrefetcher
 from .sync import CatalogSync
 
-__all__ = ["CatalogSync"]
+__all__ = ["CatalogPrefetcher", "CatalogSync"]
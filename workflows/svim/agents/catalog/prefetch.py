@@ -0,0 +1,155 @@
+"""
+Pré-carga do catálogo em background (modo residente).
+
+Sem isso a primeira mensagem de agendamento do dia (ou depois do TTL do cache)
+paga a latência da Trinks em `/profissionais` e em `/profissionais/{id}/servicos`.
+O `CatalogPrefetcher` roda na subida do servidor e depois a cada
+`interval_seconds`:
+
+1. busca todos os profissionais;
+2. busca os serviços de todos eles em paralelo, com no máximo `concurrency`
+   requisições simultâneas;
+3. grava as respostas no cache do catálogo (`refreshing()`: sempre vai à API,
+   mesmo com a entrada ainda válida) e monta o `CatalogIndex` de cada lista,
+   que os resolvers reaproveitam enquanto o snapshot não muda.
+
+Com o intervalo menor que o TTL do cache, as mensagens só encontram entradas
+frescas. Duração da atualização e quantidade de itens ficam em `agents.metrics`
+(`catalog_prefetch.*`) e em `stats()`.
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from agents.metrics import metrics
+from agents.resolvers.index import CatalogIndex, reserve_snapshots
+from agents.tools.cache import refreshing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = 240
+DEFAULT_CONCURRENCY = 8
+
+
+def catalog_items(response: Any, key: str) -> List[Dict[str, Any]]:
+    """Lista de itens de uma resposta de catálogo da Trinks (`data`, `<key>` ou `items`)."""
+    if not isinstance(response, dict):
+        return []
+    return response.get("data") or response.get(key) or response.get("items") or []
+
+
+class CatalogPrefetcher:
+    def __init__(
+        self,
+        list_professionals: Callable[[], Awaitable[Dict[str, Any]]],
+        list_services: Callable[..., Awaitable[Dict[str, Any]]],
+        interval_seconds: float = DEFAULT_INTERVAL_SECONDS,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        name: str = "catalog_prefetch",
+    ) -> None:
+        self.list_professionals = list_professionals
+        self.list_services = list_services
+        self.interval_seconds = interval_seconds
+        self.concurrency = max(1, concurrency)
+        self.name = name
+
+        self._task: Optional[asyncio.Task] = None
+        self._last: Dict[str, Any] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Agenda a pré-carga imediata e as atualizações periódicas (idempotente)."""
+        if self.running:
+            return
+        # Contexto novo: as chamadas da pré-carga não contam no turno de ninguém
+        self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def aclose(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                metrics.incr(f"{self.name}.errors")
+                logger.error(f"[SVIM] Catalog prefetch error: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def refresh(self) -> Optional[Dict[str, Any]]:
+        """Atualiza o catálogo inteiro; devolve contagens e duração (None se os profissionais falharem)."""
+        started = time.perf_counter()
+        with refreshing():
+            try:
+                response = await self.list_professionals()
+            except Exception as e:
+                response = {"error": str(e)}
+            if isinstance(response, dict) and response.get("error"):
+                metrics.incr(f"{self.name}.errors")
+                logger.warning(f"[SVIM] Catalog prefetch failed on professionals: {response.get('error')}")
+                return None
+
+            professionals = catalog_items(response, "profissionais")
+            ids = [prof.get("id") for prof in professionals if prof.get("id") is not None]
+            # Um snapshot por lista de serviços, mais o dos profissionais
+            reserve_snapshots(len(ids) + 1)
+            CatalogIndex.for_snapshot(professionals=professionals)
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            results = await asyncio.gather(*(self._refresh_services(semaphore, prof_id) for prof_id in ids))
+
+        services = sum(count for count in results if count is not None)
+        errors = sum(1 for count in results if count is None)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        metrics.incr(f"{self.name}.refreshes")
+        metrics.incr(f"{self.name}.errors", errors)
+        metrics.observe(f"{self.name}.refresh_ms", elapsed_ms)
+        metrics.observe(f"{self.name}.professionals", len(professionals))
+        metrics.observe(f"{self.name}.services", services)
+        self._last = {
+            "professionals": len(professionals),
+            "services": services,
+            "errors": errors,
+            "refresh_ms": round(elapsed_ms, 1),
+            "refreshed_at": time.time(),
+        }
+        logger.info(
+            f"[SVIM] Catalog prefetch: {len(professionals)} professionals, {services} services "
+            f"in {elapsed_ms:.0f} ms ({errors} error(s))"
+        )
+        return dict(self._last)
+
+    async def _refresh_services(self, semaphore: asyncio.Semaphore, professional_id: Any) -> Optional[int]:
+        async with semaphore:
+            try:
+                response = await self.list_services(profissionalId=professional_id)
+            except Exception as e:
+                response = {"error": str(e)}
+        if isinstance(response, dict) and response.get("error"):
+            logger.warning(
+                f"[SVIM] Catalog prefetch failed on services of professional {professional_id}: {response.get('error')}"
+            )
+            return None
+        services = catalog_items(response, "servicos")
+        CatalogIndex.for_snapshot(services=services)
+        return len(services)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval_seconds,
+            "refreshes": metrics.counter(f"{self.name}.refreshes"),
+            "errors": metrics.counter(f"{self.name}.errors"),
+            "last": dict(self._last) or None,
+        }
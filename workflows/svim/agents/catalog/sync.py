@@ -1,83 +1,287 @@
+"""
+Catálogo vetorizado (profissionais e serviços) no Qdrant.
+
+Os itens vindos das tools da Trinks são indexados com embeddings reais
+(`EmbeddingClient`: cache por conteúdo e requisições em lote). Cada ponto
+guarda o hash do próprio conteúdo (`content_hash`), então a sincronização só
+embeda/grava o que é novo ou mudou e apaga o que saiu do catálogo. E
+`search_services` / `search_professionals` devolvem os itens mais próximos de
+um pedido em texto livre ("quero fazer luzes", "barba") como `Candidate`,
+no mesmo formato da busca fuzzy dos resolvers.
+"""
+
+import hashlib
+import json
+import logging
 import time
-from typing import Any, Dict, List, Optional
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
 
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as rest
 
-from agents.vector_store import embed_text
+from agents.embeddings import EmbeddingClient
+from agents.metrics import metrics
+from agents.resolvers.index import Candidate
+
+logger = logging.getLogger(__name__)
+
+PROFESSIONALS_COLLECTION = "professionals_catalog"
+SERVICES_COLLECTION = "services_catalog"
+
+DEFAULT_BATCH_SIZE = 64
+SCROLL_PAGE_SIZE = 256
+
+
+def professional_text(prof: Dict[str, Any]) -> str:
+    return " ".join(
+        filter(None, [prof.get("nome"), prof.get("apelido"), " ".join(prof.get("tags") or [])])
+    )
+
+
+def service_text(svc: Dict[str, Any]) -> str:
+    return " ".join(
+        filter(
+            None,
+            [svc.get("nome"), svc.get("descricao"), svc.get("categoria"), " ".join(svc.get("tags") or [])],
+        )
+    )
+
+
+def _content_hash(model: str, text: str, payload: Dict[str, Any]) -> str:
+    raw = json.dumps([model, text, payload], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _point_id(key: str) -> str:
+    # O Qdrant só aceita inteiros sem sinal ou UUIDs como id de ponto
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"svim-catalog:{key}"))
 
 
 class CatalogSync:
     """Mantém cache local/vetorizado de profissionais e serviços."""
 
-    def __init__(self, client: QdrantClient, ttl_seconds: int = 6 * 3600):
+    def __init__(
+        self,
+        client: QdrantClient,
+        ttl_seconds: int = 6 * 3600,
+        embedder: Optional[EmbeddingClient] = None,
+        vector_size: int = 1536,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
         self.client = client
+        # Com os hashes no payload, resincronizar depois do TTL só custa um scroll
         self.ttl_seconds = ttl_seconds
+        self.embedder = embedder or EmbeddingClient()
+        self.vector_size = vector_size
+        # Pontos por upsert/delete no Qdrant
+        self.batch_size = batch_size
         self._last_sync: Dict[str, float] = {}
+        self._collections_ready = False
 
     def _should_sync(self, key: str) -> bool:
         last = self._last_sync.get(key, 0)
         return (time.time() - last) > self.ttl_seconds
 
-    def sync_professionals_catalog(self, professionals: List[Dict[str, Any]]) -> None:
-        if not self._should_sync("professionals"):
+    def ensure_collections(self) -> None:
+        """Cria as coleções do catálogo (e o índice de professionalId) se ainda não existirem."""
+        if self._collections_ready:
             return
-
-        points = []
-        for prof in professionals:
-            text = " ".join(
-                filter(
-                    None,
-                    [
-                        prof.get("nome"),
-                        prof.get("apelido"),
-                        " ".join(prof.get("tags", [])),
-                    ],
+        existing = {c.name for c in self.client.get_collections().collections}
+        for name in (PROFESSIONALS_COLLECTION, SERVICES_COLLECTION):
+            if name not in existing:
+                self.client.create_collection(
+                    collection_name=name,
+                    vectors_config=rest.VectorParams(size=self.vector_size, distance=rest.Distance.COSINE),
                 )
+        try:
+            self.client.create_payload_index(
+                collection_name=SERVICES_COLLECTION,
+                field_name="professionalId",
+                field_schema=rest.PayloadSchemaType.INTEGER,
             )
-            points.append(
-                rest.PointStruct(
-                    id=str(prof.get("id")),
-                    vector=embed_text(text),
-                    payload={"professionalId": prof.get("id"), "nome": prof.get("nome")},
-                )
+        except Exception as e:
+            if "already exists" not in str(e).lower():
+                logger.warning(f"[SVIM] Catalog index error: {e}")
+        self._collections_ready = True
+
+    async def _embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Todos os itens do catálogo numa única chamada `embed_many` (em lotes pelo cliente)."""
+        return await self.embedder.embed_many(texts)
+
+    def _existing_hashes(self, collection: str, scope: Optional[rest.Filter]) -> Dict[str, str]:
+        """id do ponto -> `content_hash` gravado no payload, para os pontos do escopo."""
+        hashes: Dict[str, str] = {}
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=collection,
+                scroll_filter=scope,
+                limit=SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=["content_hash"],
+                with_vectors=False,
+            )
+            for point in points:
+                hashes[str(point.id)] = (point.payload or {}).get("content_hash") or ""
+            if offset is None:
+                return hashes
+
+    async def _sync_collection(
+        self,
+        collection: str,
+        scope: Optional[rest.Filter],
+        entries: List[Tuple[str, str, Dict[str, Any]]],
+    ) -> Dict[str, int]:
+        """
+        Sincroniza `entries` (id do ponto, texto, payload) com o escopo da coleção.
+
+        Só embeda e grava itens novos ou alterados (hash do conteúdo diferente
+        do gravado no payload) e apaga os que sumiram; o custo acompanha o que
+        mudou, não o tamanho do catálogo.
+        """
+        self.ensure_collections()
+        existing = self._existing_hashes(collection, scope)
+        model = getattr(self.embedder, "model", "")
+
+        changed = []
+        for point_id, text, payload in entries:
+            content_hash = _content_hash(model, text, payload)
+            if existing.get(point_id) != content_hash:
+                changed.append((point_id, text, {**payload, "content_hash": content_hash}))
+
+        current = {point_id for point_id, _, _ in entries}
+        # Resposta vazia da API não apaga o catálogo inteiro
+        removed = [point_id for point_id in existing if point_id not in current] if entries else []
+
+        vectors = await self._embed_many([text for _, text, _ in changed]) if changed else []
+        points = [
+            rest.PointStruct(id=point_id, vector=vector, payload=payload)
+            for (point_id, _, payload), vector in zip(changed, vectors)
+        ]
+        for start in range(0, len(points), self.batch_size):
+            self.client.upsert(collection_name=collection, points=points[start : start + self.batch_size])
+        for start in range(0, len(removed), self.batch_size):
+            self.client.delete(
+                collection_name=collection,
+                points_selector=rest.PointIdsList(points=removed[start : start + self.batch_size]),
             )
-        if points:
-            self.client.upsert(collection_name="professionals_catalog", points=points)
+
+        result = {
+            "upserted": len(changed),
+            "deleted": len(removed),
+            "unchanged": len(entries) - len(changed),
+        }
+        for key, value in result.items():
+            metrics.incr(f"catalog_sync.{key}", value)
+        if changed or removed:
+            logger.info(f"[SVIM] Catalog sync {collection}: {result}")
+        return result
+
+    async def sync_professionals_catalog(self, professionals: List[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+        if not self._should_sync("professionals"):
+            return None
+
+        result = await self._sync_collection(
+            PROFESSIONALS_COLLECTION,
+            None,
+            [
+                (
+                    _point_id(f"professional:{prof.get('id')}"),
+                    professional_text(prof),
+                    {"professionalId": prof.get("id"), "nome": prof.get("nome"), "item": prof},
+                )
+                for prof in professionals
+            ],
+        )
         self._last_sync["professionals"] = time.time()
+        return result
 
-    def sync_services_catalog(
+    async def sync_services_catalog(
         self, professional_id: int, services: List[Dict[str, Any]]
-    ) -> None:
+    ) -> Optional[Dict[str, int]]:
         key = f"services_{professional_id}"
         if not self._should_sync(key):
-            return
+            return None
 
-        points = []
-        for svc in services:
-            text = " ".join(
-                filter(
-                    None,
-                    [
-                        svc.get("nome"),
-                        svc.get("descricao"),
-                        svc.get("categoria"),
-                        " ".join(svc.get("tags", [])),
-                    ],
-                )
-            )
-            points.append(
-                rest.PointStruct(
-                    id=f"{professional_id}_{svc.get('id')}",
-                    vector=embed_text(text),
-                    payload={
+        result = await self._sync_collection(
+            SERVICES_COLLECTION,
+            rest.Filter(must=[rest.FieldCondition(key="professionalId", match=rest.MatchValue(value=professional_id))]),
+            [
+                (
+                    _point_id(f"service:{professional_id}:{svc.get('id')}"),
+                    service_text(svc),
+                    {
                         "serviceId": svc.get("id"),
                         "nome": svc.get("nome"),
                         "categoria": svc.get("categoria"),
                         "professionalId": professional_id,
+                        "item": svc,
                     },
                 )
-            )
-        if points:
-            self.client.upsert(collection_name="services_catalog", points=points)
+                for svc in services
+            ],
+        )
         self._last_sync[key] = time.time()
+        return result
+
+    # ==================== Busca ====================
+
+    async def _search(
+        self,
+        collection: str,
+        query: str,
+        k: int,
+        score_threshold: Optional[float],
+        query_filter: Optional[rest.Filter] = None,
+    ) -> List[Candidate]:
+        if not query.strip():
+            return []
+        started = time.perf_counter()
+        [vector] = await self.embedder.embed_many([query])
+        try:
+            response = self.client.query_points(
+                collection_name=collection,
+                query=vector,
+                query_filter=query_filter,
+                limit=k,
+                score_threshold=score_threshold,
+                with_payload=True,
+            )
+        except Exception as e:
+            # Coleção ainda não sincronizada: sem resultados
+            logger.warning(f"[SVIM] Catalog search on {collection} failed: {e}")
+            return []
+        finally:
+            metrics.incr("catalog_search.queries")
+            metrics.observe("catalog_search.ms", (time.perf_counter() - started) * 1000)
+
+        return [
+            Candidate(point.payload.get("item") or {}, round(point.score, 3), point.payload.get("nome") or "")
+            for point in response.points
+            if point.payload
+        ]
+
+    async def search_services(
+        self,
+        query: str,
+        professional_id: Optional[int] = None,
+        k: int = 3,
+        score_threshold: Optional[float] = None,
+    ) -> List[Candidate]:
+        """Serviços mais próximos do pedido (só os do profissional, se informado)."""
+        query_filter = None
+        if professional_id is not None:
+            query_filter = rest.Filter(
+                must=[rest.FieldCondition(key="professionalId", match=rest.MatchValue(value=professional_id))]
+            )
+        return await self._search(SERVICES_COLLECTION, query, k, score_threshold, query_filter)
+
+    async def search_professionals(
+        self,
+        query: str,
+        k: int = 3,
+        score_threshold: Optional[float] = None,
+    ) -> List[Candidate]:
+        """Profissionais mais próximos do pedido (nome, apelido, especialidades)."""
+        return await self._search(PROFESSIONALS_COLLECTION, query, k, score_threshold)
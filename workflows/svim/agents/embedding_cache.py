@@ -0,0 +1,178 @@
+"""
+Cache de embeddings endereçado por conteúdo.
+
+Muitos turnos salvos na memória são idênticos ("oi", "obrigada", respostas
+fixas do menu). A chave é o SHA-256 do modelo + texto normalizado (Unicode NFC,
+espaços colapsados), então o mesmo texto nunca volta à API de embeddings.
+
+Dois níveis:
+- LRU em memória (`max_entries`);
+- opcional em disco (SQLite, vetores float32), que sobrevive a reinícios e é
+  compartilhado entre processos na mesma máquina.
+
+Configuração (variáveis de ambiente, usadas por `get_embedding_cache`):
+- EMBEDDING_CACHE_SIZE  -> entradas no LRU (default 4096)
+- EMBEDDING_CACHE_PATH  -> arquivo SQLite do nível em disco (desligado se vazio)
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from agents.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 4096
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def embedding_key(text: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        path: Optional[str] = None,
+        name: str = "embedding_cache",
+    ) -> None:
+        self.max_entries = max_entries
+        self.path = path
+        self.name = name
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            self._open_disk(path)
+
+    def get(self, text: str, model: str) -> Optional[List[float]]:
+        key = embedding_key(text, model)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+        if vector is not None:
+            self._count("hits")
+            return list(vector)
+
+        vector = self._disk_get(key)
+        if vector is not None:
+            self._count("disk_hits")
+            self._remember(key, vector)
+            return list(vector)
+
+        self._count("misses")
+        return None
+
+    def set(self, text: str, model: str, vector: List[float]) -> None:
+        key = embedding_key(text, model)
+        self._remember(key, list(vector))
+        self._disk_set(key, model, vector)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            # Cada hit é uma chamada à API de embeddings que não aconteceu
+            "saved_api_calls": self.hits + self.disk_hits,
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # ==================== Internos ====================
+
+    def _count(self, kind: str) -> None:
+        setattr(self, kind, getattr(self, kind) + 1)
+        metrics.incr(f"{self.name}.{kind}")
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _open_disk(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL)"
+        )
+
+    def _disk_get(self, key: str) -> Optional[List[float]]:
+        if self._db is None:
+            return None
+        try:
+            with self._lock:
+                row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"[SVIM] Embedding cache disk read failed: {e}")
+            return None
+        if row is None:
+            return None
+        return array("f", row[0]).tolist()
+
+    def _disk_set(self, key: str, model: str, vector: List[float]) -> None:
+        if self._db is None:
+            return
+        blob = array("f", vector).tobytes()
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, model, dim, vector) VALUES (?, ?, ?, ?)",
+                    (key, model, len(vector), blob),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"[SVIM] Embedding cache disk write failed: {e}")
+
+
+_default_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = EmbeddingCache(
+            max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+            path=os.getenv("EMBEDDING_CACHE_PATH") or None,
+        )
+    return _default_cache
+
+
+def reset_embedding_cache() -> None:
+    """Descarta o cache padrão (útil em testes)."""
+    global _default_cache
+    if _default_cache is not None:
+        _default_cache.close()
+    _default_cache = None
+
+
+__all__ = ["EmbeddingCache", "embedding_key", "get_embedding_cache", "normalize_text", "reset_embedding_cache"]
@@ -1,16 +1,148 @@
+"""
+Cliente de embeddings do agente SVIM.
+
+Pedidos concorrentes são agrupados (micro-batching): textos que chegam dentro
+de uma janela curta (`batch_window_ms`) vão numa única requisição à API de
+embeddings, até `max_batch_size` textos. Textos repetidos no mesmo lote são
+enviados uma vez só, e o cache por conteúdo (agents/embedding_cache.py) evita a
+chamada quando o texto já foi visto.
+
+Configuração (variáveis de ambiente):
+- EMBEDDING_BATCH_WINDOW_MS -> janela de agrupamento (default 5)
+- EMBEDDING_MAX_BATCH       -> máximo de textos por requisição (default 128)
+"""
+
+import asyncio
+import logging
 import os
-from openai import OpenAI
+from typing import Dict, List, Optional, Set, Tuple
+
+from agents.embedding_cache import EmbeddingCache, embedding_key, get_embedding_cache
+from agents.metrics import metrics
+from agents.openai_client import OpenAIPool, get_openai_pool
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+DEFAULT_BATCH_WINDOW_MS = 5.0
+DEFAULT_MAX_BATCH_SIZE = 128
+
 
 class EmbeddingClient:
-    def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(
+        self,
+        pool: Optional[OpenAIPool] = None,
+        cache: Optional[EmbeddingCache] = None,
+        use_cache: bool = True,
+        model: str = EMBEDDING_MODEL,
+        batch_window_ms: Optional[float] = None,
+        max_batch_size: Optional[int] = None,
+    ):
+        # Mesmo pool AsyncOpenAI do LLMClient
+        self.pool = pool or get_openai_pool()
+        self.model = model
+        # Cache por conteúdo compartilhado no processo (ver agents/embedding_cache.py)
+        self.cache = (cache or get_embedding_cache()) if use_cache else None
+        self.batch_window = (
+            batch_window_ms
+            if batch_window_ms is not None
+            else float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", DEFAULT_BATCH_WINDOW_MS))
+        ) / 1000
+        self.max_batch_size = max_batch_size or int(os.getenv("EMBEDDING_MAX_BATCH", DEFAULT_MAX_BATCH_SIZE))
+
+        # Lote em formação: chave do conteúdo -> (texto, future); futures são do loop corrente
+        self._pending: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._pending_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
 
     async def embed(self, text: str) -> list:
         """
         Retorna o vetor de embedding do OpenAI (text-embedding-3-small).
+        Textos já vistos (mesmo conteúdo normalizado) vêm do cache, sem chamar a API.
         """
-        response = self.client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
-        return response.data[0].embedding
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: List[str]) -> List[list]:
+        """Embeddings de vários textos, na mesma ordem; agrupa com pedidos concorrentes."""
+        results: List[Optional[list]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            key = embedding_key(text, self.model)
+            if key in missing:
+                missing[key].append(i)
+                continue
+            cached = self.cache.get(text, self.model) if self.cache is not None else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                missing[key] = [i]
+
+        if missing:
+            futures = [self._enqueue(key, texts[indexes[0]]) for key, indexes in missing.items()]
+            # Futures compartilhados com outros chamadores: cancelar este não cancela os deles
+            vectors = await asyncio.gather(*(asyncio.shield(future) for future in futures))
+            for indexes, vector in zip(missing.values(), vectors):
+                for i in indexes:
+                    results[i] = vector
+        return results
+
+    # ==================== Micro-batching ====================
+
+    def _enqueue(self, key: str, text: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if self._pending_loop is not loop:
+            self._pending = {}
+            self._pending_loop = loop
+            self._flush_handle = None
+
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = (text, loop.create_future())
+
+        if len(self._pending) >= self.max_batch_size:
+            self._dispatch()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._dispatch)
+        return entry[1]
+
+    def _dispatch(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = list(self._pending.values()), {}
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._send_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = [text for text, _ in batch]
+        metrics.incr("embeddings.requests")
+        metrics.incr("embeddings.texts", len(texts))
+        metrics.observe("embeddings.batch_size", len(texts))
+        try:
+            response = await self.pool.call(
+                lambda client: client.embeddings.create(
+                    model=self.model,
+                    input=texts,
+                )
+            )
+        except Exception as exc:
+            logger.warning(f"[SVIM] Embeddings request failed for {len(texts)} text(s): {exc}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        data = sorted(response.data, key=lambda item: item.index)
+        for (text, future), item in zip(batch, data):
+            if self.cache is not None:
+                self.cache.set(text, self.model, item.embedding)
+            if not future.done():
+                future.set_result(item.embedding)
+        for _, future in batch[len(data):]:
+            if not future.done():
+                future.set_exception(RuntimeError("Resposta de embeddings com menos vetores que textos"))
@@ -1,21 +1,40 @@
-import json
+import asyncio
 import logging
 import os
+import random
+import weakref
 from typing import Any, Dict, Optional
 
-import requests
+import httpx
 
 logger = logging.getLogger(__name__)
 
+# Status que valem nova tentativa em requisições idempotentes
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
 
 class HttpClientError(Exception):
     """Erro específico para chamadas HTTP do agente SVIM."""
 
 
+class _LoopState:
+    """Pool httpx e semáforos por estabelecimento ligados a um event loop."""
+
+    def __init__(self, client: httpx.AsyncClient) -> None:
+        self.client = client
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
 class HttpClient:
-    """HTTP client com configuração fixa e validações de segurança."""
+    """
+    HTTP client assíncrono com configuração fixa e validações de segurança.
+
+    - Pool de conexões com keep-alive (HTTP/1.1, HTTP/2 opcional via HTTP_HTTP2=1)
+    - Concorrência limitada por estabelecimento (HTTP_MAX_CONCURRENCY)
+    - Retries com backoff exponencial + jitter apenas para GET (HTTP_MAX_RETRIES)
+    """
 
-    def __init__(self) -> None:
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
         base_url = os.getenv("URL_BASE", "").rstrip("/")
         if not base_url:
             raise ValueError("URL_BASE não definida para o cliente HTTP da SVIM")
@@ -29,6 +48,42 @@ class HttpClient:
         }
 
         self.timeout = float(os.getenv("HTTP_TIMEOUT", 10))
+        self.max_connections = int(os.getenv("HTTP_MAX_CONNECTIONS", 20))
+        self.max_concurrency = int(os.getenv("HTTP_MAX_CONCURRENCY", 8))
+        self.max_retries = int(os.getenv("HTTP_MAX_RETRIES", 2))
+        self.backoff_base = float(os.getenv("HTTP_BACKOFF_BASE", 0.2))
+        self.backoff_max = float(os.getenv("HTTP_BACKOFF_MAX", 2.0))
+        self.http2 = os.getenv("HTTP_HTTP2", "").lower() in ("1", "true", "yes") and _h2_available()
+
+        self._transport = transport
+        # httpx.AsyncClient fica preso ao loop em que foi criado
+        self._states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self._transport,
+            )
+            state = _LoopState(client)
+            self._states[loop] = state
+        return state
+
+    def _semaphore(self, state: _LoopState, estabelecimento_id: str) -> asyncio.Semaphore:
+        semaphore = state.semaphores.get(estabelecimento_id)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            state.semaphores[estabelecimento_id] = semaphore
+        return semaphore
 
     def _full_url(self, path: str) -> str:
         if path.startswith("http://") or path.startswith("https://"):
@@ -39,31 +94,67 @@ class HttpClient:
             path = f"/{path}"
         return f"{self.base_url}{path}"
 
-    def _request(self, method: str, path: str, **kwargs: Any) -> Dict[str, Any]:
+    def _backoff(self, attempt: int) -> float:
+        # "full jitter": espalha os retries de conversas simultâneas
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _request(self, method: str, path: str, **kwargs: Any) -> Dict[str, Any]:
         url = self._full_url(path)
         headers = {**self.headers, **kwargs.pop("headers", {})}
-        try:
-            resp = requests.request(
-                method,
-                url,
-                headers=headers,
-                timeout=self.timeout,
-                **kwargs,
-            )
-            resp.raise_for_status()
-            return resp.json()
-        except requests.exceptions.RequestException as exc:  # pragma: no cover - comportamento de rede
-            logger.error("HTTP client error", exc_info=exc)
-            raise HttpClientError(str(exc))
-        except ValueError as exc:  # pragma: no cover - JSON inválido
-            logger.error("Invalid JSON from HTTP client", exc_info=exc)
-            raise HttpClientError("INVALID_JSON_RESPONSE")
-
-    def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        return self._request("GET", path, params=params or {})
-
-    def post(self, path: str, json: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        return self._request("POST", path, json=json or {})
+        retries = self.max_retries if method == "GET" else 0
+
+        state = self._state()
+        semaphore = self._semaphore(state, str(headers.get("estabelecimentoId", "")))
+
+        attempt = 0
+        while True:
+            try:
+                async with semaphore:
+                    resp = await state.client.request(method, url, headers=headers, **kwargs)
+                if resp.status_code in RETRYABLE_STATUS and attempt < retries:
+                    raise _RetryableStatus(resp.status_code)
+                resp.raise_for_status()
+                return resp.json()
+            except (_RetryableStatus, httpx.TransportError) as exc:
+                if attempt >= retries:  # pragma: no cover - comportamento de rede
+                    logger.error("HTTP client error", exc_info=exc)
+                    raise HttpClientError(str(exc))
+                delay = self._backoff(attempt)
+                attempt += 1
+                logger.warning(f"HTTP {method} {path} falhou ({exc!r}), retry #{attempt} em {delay:.2f}s")
+                await asyncio.sleep(delay)
+            except httpx.HTTPError as exc:  # pragma: no cover - comportamento de rede
+                logger.error("HTTP client error", exc_info=exc)
+                raise HttpClientError(str(exc))
+            except ValueError as exc:  # pragma: no cover - JSON inválido
+                logger.error("Invalid JSON from HTTP client", exc_info=exc)
+                raise HttpClientError("INVALID_JSON_RESPONSE")
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self._request("GET", path, params=params or {})
+
+    async def post(self, path: str, json: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self._request("POST", path, json=json or {})
+
+    async def aclose(self) -> None:
+        state = self._states.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state.client.aclose()
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP_HTTP2 habilitado mas o pacote 'h2' não está instalado; usando HTTP/1.1")
+        return False
+    return True
 
 
 _default_client: Optional[HttpClient] = None
@@ -1,13 +1,33 @@
 import os
 import json
-from typing import Any, Dict, Optional
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams
+from qdrant_client.models import Distance, PayloadSchemaType, VectorParams
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Integer,
+    JSON,
+    MetaData,
+    Table,
+    Text,
+    create_engine,
+    func,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
 
+from agents.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
 
 # ==================== QDRANT ====================
 def create_qdrant_client(config: Optional[Dict[str, Any]] = None) -> QdrantClient:
@@ -49,16 +69,18 @@ def ensure_qdrant_collection(
             vectors_config=VectorParams(size=vector_size, distance=distance),
         )
 
-    try:
-        client.create_payload_index(
-            collection_name=collection_name,
-            field_name="user_id",
-            field_schema={"type": "keyword"},
-        )
-    except Exception as e:
-        if "already exists" in str(e).lower():
-            return
-        print(f"Qdrant index error: {e}")
+    # user_id filtra o histórico do cliente; ts (epoch float) ordena por recência
+    for field_name, field_schema in (("user_id", PayloadSchemaType.KEYWORD), ("ts", PayloadSchemaType.FLOAT)):
+        try:
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=field_schema,
+            )
+        except Exception as e:
+            if "already exists" in str(e).lower():
+                continue
+            print(f"Qdrant index error: {e}")
 
 
 
@@ -77,12 +99,58 @@ def create_session_factory(database_url: Optional[str] = None) -> sessionmaker:
     if not db_url:
         raise ValueError("DATABASE_URL não definido para conexão com Postgres.")
 
-    engine = create_engine(db_url, future=True)
+    engine = create_engine(db_url, future=True, json_serializer=_json_dumps)
     return sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 
 # ==================== LOGS DA SVIM ====================
 
+metadata = MetaData()
+
+# JSONB no Postgres, JSON (texto) nos demais bancos (ex.: SQLite em testes)
+_JSONColumn = JSON().with_variant(JSONB(), "postgresql")
+
+interaction_logs = Table(
+    "interaction_logs",
+    metadata,
+    Column("id", BigInteger().with_variant(Integer(), "sqlite"), primary_key=True, autoincrement=True),
+    Column("user_id", Text),
+    Column("session_id", Text),
+    Column("intent", Text),
+    Column("request_json", _JSONColumn),
+    Column("response_json", _JSONColumn),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+def _json_dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def ensure_interaction_logs_table(engine: Engine) -> None:
+    """Cria `interaction_logs` se ainda não existir (em produção, prefira a migration)."""
+    metadata.create_all(engine, tables=[interaction_logs], checkfirst=True)
+
+
+def interaction_log_row(
+    *,
+    user_id: Optional[str],
+    session_id: Optional[str],
+    intent: Optional[str],
+    request: Dict[str, Any],
+    response: Dict[str, Any],
+) -> Dict[str, Any]:
+    # Os dicts vão direto para as colunas JSON/JSONB: o tipo da coluna serializa
+    # uma única vez (sem json.dumps manual, que gravaria uma string JSON).
+    return {
+        "user_id": user_id,
+        "session_id": session_id,
+        "intent": intent,
+        "request_json": request,
+        "response_json": response,
+    }
+
+
 def log_svim_interaction(
     session: Session,
     *,
@@ -93,7 +161,10 @@ def log_svim_interaction(
     response: Dict[str, Any],
 ) -> None:
     """
-    Loga uma interação da SVIM em uma tabela Postgres.
+    Loga uma interação da SVIM em uma tabela Postgres (um INSERT + COMMIT).
+
+    Caminho síncrono usado no modo one-shot; o servidor residente usa
+    `BatchedInteractionLogger`.
 
     Tabela sugerida (crie via migration/SQL):
     ------------------------------------------------
@@ -108,21 +179,162 @@ def log_svim_interaction(
     );
     ------------------------------------------------
     """
-    payload = {
-        "user_id": user_id,
-        "session_id": session_id,
-        "intent": intent,
-        "request_json": json.dumps(request),
-        "response_json": json.dumps(response),
-    }
-
     session.execute(
-    text("""
-        INSERT INTO interaction_logs
-            (user_id, session_id, intent, request_json, response_json, created_at)
-        VALUES
-            (:user_id, :session_id, :intent, :request_json, :response_json, NOW())
-        """),
-        payload,
+        interaction_logs.insert().values(
+            **interaction_log_row(
+                user_id=user_id,
+                session_id=session_id,
+                intent=intent,
+                request=request,
+                response=response,
+            )
+        )
     )
     session.commit()
+
+
+class BatchedInteractionLogger:
+    """
+    Acumula linhas de `interaction_logs` e grava em lote (INSERT multi-linha).
+
+    - Grava a cada `batch_size` linhas ou a cada `flush_interval_ms`, o que vier
+      primeiro: um COMMIT (um fsync) por lote em vez de um por mensagem.
+    - Com `max_pending` linhas aguardando, `log` espera um flush (backpressure).
+    - Se o banco falhar, o lote volta para o buffer e é tentado de novo no
+      próximo flush, até `max_retries` vezes; depois vai para `dead_letter`
+      (ex.: o journal do write-behind) ou é descartado, para o buffer não
+      crescer sem limite com o banco fora do ar.
+    - `aclose()` grava o que restou.
+
+    Linhas ainda no buffer se perdem num crash (no máximo ~`flush_interval_ms`).
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        batch_size: int = 200,
+        flush_interval_ms: float = 250,
+        max_pending: int = 10_000,
+        max_retries: int = 3,
+        dead_letter: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+        name: str = "interaction_log",
+    ) -> None:
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.dead_letter = dead_letter
+        self.name = name
+        self._rows: List[Dict[str, Any]] = []
+        # Falhas seguidas do lote da frente do buffer
+        self._failures = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    async def log(
+        self,
+        *,
+        user_id: Optional[str],
+        session_id: Optional[str],
+        intent: Optional[str],
+        request: Dict[str, Any],
+        response: Dict[str, Any],
+    ) -> None:
+        self._ensure_started()
+        if len(self._rows) >= self.max_pending:
+            metrics.incr(f"{self.name}.backpressure")
+            await self.flush()
+
+        self._rows.append(
+            interaction_log_row(
+                user_id=user_id,
+                session_id=session_id,
+                intent=intent,
+                request=request,
+                response=response,
+            )
+        )
+        if len(self._rows) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Grava tudo que está no buffer (em lotes de `batch_size`)."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            while self._rows:
+                batch = self._rows[: self.batch_size]
+                del self._rows[: self.batch_size]
+                started = time.perf_counter()
+                try:
+                    await asyncio.to_thread(self._insert, batch)
+                except Exception as e:
+                    metrics.incr(f"{self.name}.errors")
+                    self._failures += 1
+                    if self._failures > self.max_retries:
+                        self._failures = 0
+                        await self._give_up(batch, e)
+                        continue
+                    self._rows[:0] = batch
+                    raise
+                self._failures = 0
+                metrics.incr(f"{self.name}.rows", len(batch))
+                metrics.incr(f"{self.name}.batches")
+                metrics.observe(f"{self.name}.flush_ms", (time.perf_counter() - started) * 1000)
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def write(self, rows: List[Dict[str, Any]]) -> None:
+        """Grava `rows` num INSERT só, sem passar pelo buffer (replay do dead-letter)."""
+        await asyncio.to_thread(self._insert, rows)
+
+    @property
+    def pending(self) -> int:
+        return len(self._rows)
+
+    # ==================== Internos ====================
+
+    async def _give_up(self, batch: List[Dict[str, Any]], error: Exception) -> None:
+        if self.dead_letter is not None:
+            try:
+                await self.dead_letter(batch)
+                metrics.incr(f"{self.name}.dead_lettered", len(batch))
+                logger.warning(
+                    f"[SVIM] Interaction log batch of {len(batch)} row(s) failed "
+                    f"{self.max_retries + 1} time(s) ({error}); sent to dead-letter"
+                )
+                return
+            except Exception as e:
+                logger.error(f"[SVIM] Interaction log dead-letter failed: {e}")
+        metrics.incr(f"{self.name}.dropped", len(batch))
+        logger.error(
+            f"[SVIM] Dropping {len(batch)} interaction log row(s) after {self.max_retries + 1} failed flush(es): {error}"
+        )
+
+    def _ensure_started(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"[SVIM] Failed to flush interaction logs ({len(self._rows)} pending): {e}")
+
+    def _insert(self, batch: List[Dict[str, Any]]) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(interaction_logs.insert().values(batch))
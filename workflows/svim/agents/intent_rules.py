@@ -0,0 +1,191 @@
+"""
+Pré-classificador de intenção determinístico (sem LLM).
+
+Roda antes de `SVIMAgent._detect_intent` chamar o LLM. Mensagens óbvias
+("oi", "obrigada, tchau", "quero cortar o cabelo amanhã") são resolvidas aqui,
+com acentos removidos, por:
+
+1. vocabulário fechado de saudação/despedida (mensagem só com essas palavras);
+2. regras por palavra-chave/regex para agendar, remarcar, cancelar e dúvidas;
+3. similaridade de trigramas de caracteres com frases-protótipo (pega erros de
+   digitação de frases comuns).
+
+Cada previsão vem com uma confiança; abaixo do limiar o agente usa o LLM.
+Regras de intenções diferentes que disparam juntas derrubam a confiança.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from agents.resolvers.index import fold_text
+
+DEFAULT_THRESHOLD = 0.85
+
+# Mensagens longas costumam misturar assuntos: deixa para o LLM
+MAX_WORDS = 25
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+GREETING_WORDS = {
+    "oi", "oie", "oii", "oiii", "ola", "opa", "hey", "hi", "hello", "bom", "boa", "dia", "tarde",
+    "noite", "tudo", "bem", "e", "ai", "eai", "td", "blz", "beleza", "maria", "como", "vai", "voce",
+    "vc", "com", "tranquilo", "tudinho",
+}
+GREETING_ANCHORS = {"oi", "oie", "oii", "oiii", "ola", "opa", "hey", "hi", "hello", "eai", "dia", "tarde", "noite"}
+
+FAREWELL_WORDS = {
+    "obrigado", "obrigada", "obrigadao", "obrigadinha", "brigado", "brigada", "valeu", "vlw", "tchau",
+    "tchauzinho", "ate", "mais", "logo", "amanha", "breve", "bom", "boa", "descanso", "beijo", "beijos",
+    "bjs", "bj", "flw", "muito", "ok", "entao", "dia", "tarde", "noite", "semana", "maria", "e", "por",
+    "tudo", "otimo", "perfeito", "combinado",
+}
+FAREWELL_ANCHORS = {
+    "obrigado", "obrigada", "obrigadao", "obrigadinha", "brigado", "brigada", "valeu", "vlw", "tchau",
+    "tchauzinho", "ate", "descanso", "beijo", "beijos", "bjs", "bj", "flw",
+}
+
+SERVICE_RE = re.compile(
+    r"\b(cort(e|ar)|cabelo|escova|luzes|mechas|manicure|pedicure|unhas?|barba|sobrancelhas?|"
+    r"depila(cao|r)|colora(cao|r)|tintura|pintar|hidratacao|progressiva|maquiagem|massagem|limpeza de pele)\b"
+)
+TIME_RE = re.compile(
+    r"\b(hoje|amanha|depois de amanha|segunda|terca|quarta|quinta|sexta|sabado|domingo|"
+    r"semana que vem|proxima semana|\d{1,2}h\d{0,2}|\d{1,2}:\d{2}|as \d{1,2})\b"
+)
+# Verbo de agendar (não casa dentro de "desmarcar"/"remarcar")
+SCHEDULE_VERB_RE = re.compile(r"\b(marcar|agendar|reservar)\b")
+DESIRE_RE = re.compile(r"\b(quero|queria|gostaria|preciso|posso|da pra|tem como|vou querer|quer(o|ia) fazer)\b")
+
+RULES: List[Tuple[str, re.Pattern, float]] = [
+    ("cancel", re.compile(r"\b(cancel(ar|a|e|o|amento)|desmarcar|desmarca|nao vou (poder )?(ir|comparecer))\b"), 0.92),
+    (
+        "reschedule",
+        re.compile(
+            r"\b(remarcar|remarca|reagendar|reagenda|"
+            r"(mudar|trocar|alterar|passar|adiar) (o |meu |o meu |a |minha )?(horario|agendamento|dia|data|hora))\b"
+        ),
+        0.92,
+    ),
+    # Agendar só com verbo + objeto ("marcar um horario") ou pedido ("quero agendar")
+    (
+        "schedule",
+        re.compile(
+            r"\b((quero|queria|gostaria de|preciso|posso|pode|da pra|tem como|vou querer) "
+            r"(marcar|agendar|reservar)|"
+            r"(marcar|agendar|reservar|marca|agenda) (um |uma |o |a |meu |minha )?"
+            r"(horario|hora|vaga|atendimento|sessao|corte|escova|manicure|pedicure|barba|luzes|mechas)|"
+            r"horario (livre|disponivel))\b"
+        ),
+        0.9,
+    ),
+    # Palavra solta ("a marca do shampoo", "minha agenda ta cheia"): abaixo do limiar, decide o LLM
+    ("schedule", re.compile(r"\b(marcar|marca|agendar|agenda|agendamento|reservar)\b"), 0.6),
+    (
+        "info",
+        re.compile(
+            r"\b(quanto (custa|e|fica|sai)|qual (o |e o )?(valor|preco)|precos?|valores|"
+            r"(que|qual) horas? (abre|fecha|voces)|horario de (funcionamento|atendimento)|"
+            r"(abre|abrem|funciona|funcionam) (no |aos |de |hoje|amanha|domingo|sabado|feriado)|"
+            r"endereco|onde fica|aceita(m)?|estacionamento|forma(s)? de pagamento|parcela)\b"
+        ),
+        0.9,
+    ),
+]
+
+PROTOTYPES: Dict[str, List[str]] = {
+    "smalltalk": ["oi tudo bem", "ola bom dia", "boa tarde maria", "oi maria tudo bem com voce"],
+    "farewell": ["obrigada tchau", "valeu ate mais", "muito obrigado ate logo", "obrigada pela ajuda"],
+    "schedule": ["quero marcar um horario", "quero agendar um corte", "tem horario amanha", "gostaria de marcar"],
+    "reschedule": ["quero remarcar meu horario", "preciso mudar meu horario"],
+    "cancel": ["quero cancelar meu horario", "preciso desmarcar meu horario"],
+    "info": ["quanto custa o corte", "qual o horario de funcionamento", "voces abrem domingo"],
+}
+
+
+class IntentPrediction(NamedTuple):
+    intent: Optional[str]
+    confidence: float
+    rule: str
+
+
+def _char_ngrams(text: str, n: int = 3) -> Counter:
+    padded = f" {text} "
+    return Counter(padded[i : i + n] for i in range(len(padded) - n + 1))
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    dot = sum(count * b[gram] for gram, count in a.items() if gram in b)
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
+
+
+class RuleBasedIntentClassifier:
+    """Classificador local de intenção, com confiança por previsão."""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD) -> None:
+        self.threshold = threshold
+        self._prototypes = [
+            (intent, _char_ngrams(" ".join(_WORD_RE.findall(fold_text(phrase)))))
+            for intent, phrases in PROTOTYPES.items()
+            for phrase in phrases
+        ]
+
+    def classify(self, message: str) -> IntentPrediction:
+        text = fold_text(message)
+        words = _WORD_RE.findall(text)
+        if not words:
+            return IntentPrediction(None, 0.0, "empty")
+        if len(words) > MAX_WORDS:
+            return IntentPrediction(None, 0.0, "too_long")
+
+        # 1) Mensagem composta só por saudação ou só por despedida
+        word_set = set(words)
+        is_greeting = word_set <= GREETING_WORDS and bool(word_set & GREETING_ANCHORS)
+        is_farewell = word_set <= FAREWELL_WORDS and bool(word_set & FAREWELL_ANCHORS)
+        if is_greeting and not is_farewell:
+            return IntentPrediction("smalltalk", 0.95, "greeting_vocabulary")
+        if is_farewell and not is_greeting:
+            return IntentPrediction("farewell", 0.95, "farewell_vocabulary")
+
+        # 2) Regras por palavra-chave
+        normalized = " ".join(words)
+        matches: Dict[str, float] = {}
+        for intent, pattern, confidence in RULES:
+            if pattern.search(normalized):
+                matches[intent] = max(matches.get(intent, 0.0), confidence)
+
+        if SERVICE_RE.search(normalized) and (DESIRE_RE.search(normalized) or TIME_RE.search(normalized)):
+            matches["schedule"] = max(matches.get("schedule", 0.0), 0.88)
+
+        # Remarcar/cancelar também citam "agendamento"/"horário": a regra mais específica vence.
+        # Cancelar e marcar de novo ("desmarcar e marcar outro") é ambíguo: fica para o LLM.
+        if "schedule" in matches and ("reschedule" in matches or "cancel" in matches):
+            if not ("cancel" in matches and "reschedule" not in matches and SCHEDULE_VERB_RE.search(normalized)):
+                matches.pop("schedule")
+
+        if len(matches) == 1:
+            intent, confidence = next(iter(matches.items()))
+            return IntentPrediction(intent, confidence, "keyword")
+        if len(matches) > 1:
+            intent = max(matches, key=matches.get)
+            return IntentPrediction(intent, 0.5, "conflicting_keywords")
+
+        # 3) Similaridade com frases-protótipo
+        grams = _char_ngrams(normalized)
+        best: Dict[str, float] = {}
+        for intent, proto in self._prototypes:
+            best[intent] = max(best.get(intent, 0.0), _cosine(grams, proto))
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        intent, score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if score - runner_up < 0.1:
+            return IntentPrediction(intent, round(min(score, 0.5), 3), "ngram_ambiguous")
+        return IntentPrediction(intent, round(score, 3), "ngram")
+
+    def is_confident(self, prediction: IntentPrediction) -> bool:
+        return prediction.intent is not None and prediction.confidence >= self.threshold
+
+
+__all__ = ["IntentPrediction", "RuleBasedIntentClassifier"]
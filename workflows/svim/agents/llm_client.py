@@ -1,27 +1,31 @@
-import os
 import json
-from typing import Any, Dict, List, Optional, Union
-from openai import OpenAI
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from agents.metrics import record_llm_usage
+from agents.openai_client import OpenAIPool, get_openai_pool
+
+
+def _cached_tokens(usage: Any) -> int:
+    """Tokens do prompt servidos do cache de prefixo (`usage.prompt_tokens_details.cached_tokens`)."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+
 
 class LLMClient:
-    def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(self, pool: Optional[OpenAIPool] = None):
+        # Pool AsyncOpenAI compartilhado (conexões, concorrência e timeout)
+        self.pool = pool or get_openai_pool()
 
-    async def chat_completion(
+    def _build_request(
         self,
         messages: List[Dict[str, Any]],
-        system_prompt: str = "",
-        temperature: float = 0.4,
-        max_tokens: int = 350,
-        tools: Optional[List[Dict[str, Any]]] = None,
-        tool_choice: str | None = None,
-    ) -> Any:
-        """
-        Suporta:
-        - Resposta normal (string)
-        - Chamada de ferramenta (dict com {tool: {name, arguments}})
-        """
-
+        system_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        tools: Optional[List[Dict[str, Any]]],
+        tool_choice: str | None,
+        response_format: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
         # ============================
         # 🔧 Pré-processamento
         # ============================
@@ -44,18 +48,56 @@ class LLMClient:
                     }
                 })
 
+        # ============================
+        # 📦 Corpo da requisição
+        # ============================
+        request: Dict[str, Any] = {
+            "model": "gpt-4o-mini",
+            "messages": full_messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if tool_defs:
+            request["tools"] = tool_defs
+            request["tool_choice"] = tool_choice or "auto"
+        if response_format:
+            request["response_format"] = response_format
+        return request
+
+    async def chat_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        system_prompt: str = "",
+        temperature: float = 0.4,
+        max_tokens: int = 350,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: str | None = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """
+        Suporta:
+        - Resposta normal (string)
+        - Chamada de ferramenta (dict com {tool: {name, arguments}})
+        - Saída estruturada via `response_format` (ex.: {"type": "json_object"})
+        """
+        request = self._build_request(
+            messages, system_prompt, temperature, max_tokens, tools, tool_choice, response_format
+        )
+
         # ============================
         # 🚀 Chamada à API
         # ============================
-        resp = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=full_messages,
-            tools=tool_defs,
-            tool_choice=(tool_choice or "auto") if tool_defs else None,
-            temperature=temperature,
-            max_tokens=max_tokens,
+        resp = await self.pool.call(
+            lambda client: client.chat.completions.create(**request)
         )
 
+        if getattr(resp, "usage", None) is not None:
+            record_llm_usage(
+                prompt_tokens=resp.usage.prompt_tokens or 0,
+                completion_tokens=resp.usage.completion_tokens or 0,
+                cached_tokens=_cached_tokens(resp.usage),
+            )
+
         msg = resp.choices[0].message
 
         # ============================
@@ -82,3 +124,59 @@ class LLMClient:
         # 🛑 Nada retornado?
         # ============================
         return "Desculpe, não consegui entender sua solicitação."
+
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        system_prompt: str = "",
+        temperature: float = 0.4,
+        max_tokens: int = 350,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: str | None = None,
+    ) -> AsyncIterator[Union[str, Dict[str, Any]]]:
+        """
+        Versão em streaming de `chat_completion`.
+
+        Gera os trechos de texto (str) conforme chegam. Se o modelo chamar uma
+        ferramenta, gera no final um único dict {tool: {id, name, arguments}}.
+        """
+        request = self._build_request(messages, system_prompt, temperature, max_tokens, tools, tool_choice, None)
+        request["stream"] = True
+        request["stream_options"] = {"include_usage": True}
+
+        tool_call: Optional[Dict[str, str]] = None
+        async for chunk in self.pool.stream(lambda client: client.chat.completions.create(**request)):
+            if getattr(chunk, "usage", None) is not None:
+                record_llm_usage(
+                    prompt_tokens=chunk.usage.prompt_tokens or 0,
+                    completion_tokens=chunk.usage.completion_tokens or 0,
+                    cached_tokens=_cached_tokens(chunk.usage),
+                )
+            if not chunk.choices:
+                continue
+
+            delta = chunk.choices[0].delta
+            if delta.content:
+                yield delta.content
+
+            # Só a primeira tool call, como em chat_completion
+            for tc in delta.tool_calls or []:
+                if tc.index != 0:
+                    continue
+                if tool_call is None:
+                    tool_call = {"id": "", "name": "", "arguments": ""}
+                if tc.id:
+                    tool_call["id"] = tc.id
+                if tc.function and tc.function.name:
+                    tool_call["name"] += tc.function.name
+                if tc.function and tc.function.arguments:
+                    tool_call["arguments"] += tc.function.arguments
+
+        if tool_call is not None:
+            yield {
+                "tool": {
+                    "id": tool_call["id"],
+                    "name": tool_call["name"],
+                    "arguments": json.loads(tool_call["arguments"] or "{}"),
+                }
+            }
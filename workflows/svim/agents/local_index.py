@@ -0,0 +1,692 @@
+"""
+Índice vetorial local (em processo) para coleções pequenas.
+
+Para um salão com dezenas de profissionais e algumas centenas de serviços,
+ir ao Qdrant pela rede a cada busca custa mais que a busca em si. Aqui os
+vetores ficam numa matriz float32 NumPy com linhas normalizadas; a busca por
+cosseno é um produto matriz-vetor e um `argpartition` para o top-k.
+
+- `LocalVectorIndex`: uma coleção. Com `path`, os vetores ficam num arquivo
+  mapeado em memória (`np.memmap`, crescendo por dobra) e ids/payloads num log
+  JSONL só de acréscimo; novos pontos são gravados sem reescrever o índice.
+- `LocalVectorClient`: o subconjunto da API do `QdrantClient` que
+  `SVIMVectorStore` e `CatalogSync` usam (upsert, query_points, scroll com
+  filtro/ordenação, count, set_payload, delete), sobre um índice por coleção.
+- `VectorClientRouter`: manda cada coleção para o índice local ou para o
+  Qdrant; coleções espelhadas leem do local e gravam nos dois. Filtros que o
+  índice local não entende são repassados ao Qdrant.
+- `select_vector_client`: escolhe, por coleção, local ou Qdrant pelo tamanho.
+  Sem diretório de persistência, "auto" sempre espelha no Qdrant: o índice em
+  memória some a cada reinício e é recopiado do Qdrant na subida.
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from qdrant_client.http import models as rest
+
+from agents.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Tamanho máximo (em pontos) para uma coleção ir para o índice local no modo "auto"
+DEFAULT_LOCAL_MAX_POINTS = 20_000
+
+_INITIAL_CAPACITY = 64
+_VECTORS_FILE = "vectors.f32"
+_LOG_FILE = "points.jsonl"
+_META_FILE = "index.json"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _point_key(point_id: Any) -> Any:
+    return str(point_id) if isinstance(point_id, uuid.UUID) else point_id
+
+
+class LocalVectorIndex:
+    """Uma coleção: matriz float32 normalizada + ids e payloads por linha."""
+
+    def __init__(self, dim: int, path: Optional[str] = None):
+        self.dim = dim
+        self.path = path
+        self._lock = threading.RLock()
+        self._ids: List[Any] = []
+        self._payloads: List[Dict[str, Any]] = []
+        self._rows: Dict[Any, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._count = 0
+        # Índices de igualdade por campo do payload, montados no primeiro filtro
+        self._field_rows: Dict[str, Dict[Any, Set[int]]] = {}
+        self._log = None
+
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+        else:
+            self._vectors = np.zeros((_INITIAL_CAPACITY, dim), dtype=np.float32)
+            self._alive = np.zeros(_INITIAL_CAPACITY, dtype=bool)
+
+    # ==================== Persistência ====================
+
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, _VECTORS_FILE)
+
+    def _open_memmap(self, capacity: int) -> np.ndarray:
+        file_path = self._vectors_path()
+        size = capacity * self.dim * 4
+        with open(file_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(file_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _load(self) -> None:
+        meta_path = os.path.join(self.path, _META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                stored_dim = json.load(f)["dim"]
+            if stored_dim != self.dim:
+                raise ValueError(f"Local index at {self.path} has dim {stored_dim}, expected {self.dim}")
+        else:
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"dim": self.dim}, f)
+
+        # Replay do log: última operação de cada id vale
+        entries: List[Dict[str, Any]] = []
+        log_path = os.path.join(self.path, _LOG_FILE)
+        if os.path.exists(log_path):
+            with open(log_path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        entries.append(json.loads(line))
+        rows = max((entry["row"] + 1 for entry in entries if "row" in entry), default=0)
+        capacity = _INITIAL_CAPACITY
+        while capacity < rows:
+            capacity *= 2
+        self._vectors = self._open_memmap(capacity)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._ids = [None] * rows
+        self._payloads = [{} for _ in range(rows)]
+        self._count = rows
+        for entry in entries:
+            if entry["op"] == "upsert":
+                row = entry["row"]
+                self._ids[row] = entry["id"]
+                self._payloads[row] = entry["payload"]
+                self._rows[entry["id"]] = row
+                self._alive[row] = True
+            elif entry["op"] == "payload":
+                row = self._rows.get(entry["id"])
+                if row is not None:
+                    self._payloads[row] = entry["payload"]
+            elif entry["op"] == "delete":
+                row = self._rows.pop(entry["id"], None)
+                if row is not None:
+                    self._alive[row] = False
+        self._log = open(log_path, "a", encoding="utf-8")
+
+    def _append_log(self, entries: Iterable[Dict[str, Any]]) -> None:
+        if self._log is None:
+            return
+        self._log.write("".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in entries))
+        self._log.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if isinstance(self._vectors, np.memmap):
+                self._vectors.flush()
+            if self._log is not None:
+                self._log.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    # ==================== Escrita ====================
+
+    def _ensure_capacity(self, needed: int) -> None:
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        if self.path:
+            self._vectors.flush()
+            self._vectors = self._open_memmap(capacity)
+        else:
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[: self._count] = self._vectors[: self._count]
+            self._vectors = grown
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: self._alive.shape[0]] = self._alive
+        self._alive = alive
+
+    def _index_row(self, row: int, old_payload: Optional[Dict[str, Any]]) -> None:
+        for key, by_value in self._field_rows.items():
+            if old_payload is not None and _hashable(old_payload.get(key)):
+                by_value.get(old_payload.get(key), set()).discard(row)
+            value = self._payloads[row].get(key)
+            if _hashable(value):
+                by_value.setdefault(value, set()).add(row)
+
+    def upsert(
+        self,
+        ids: Sequence[Any],
+        vectors: Sequence[Sequence[float]],
+        payloads: Sequence[Optional[Dict[str, Any]]],
+    ) -> None:
+        """Insere/atualiza pontos; ids novos vão para o fim da matriz (sem reescrever o resto)."""
+        if not ids:
+            return
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim))
+        with self._lock:
+            self._ensure_capacity(self._count + len(ids))
+            log = []
+            for point_id, vector, payload in zip(ids, matrix, payloads):
+                point_id = _point_key(point_id)
+                row = self._rows.get(point_id)
+                old_payload = None
+                if row is None:
+                    row = self._count
+                    self._count += 1
+                    self._ids.append(point_id)
+                    self._payloads.append({})
+                    self._rows[point_id] = row
+                else:
+                    old_payload = self._payloads[row]
+                self._vectors[row] = vector
+                self._payloads[row] = dict(payload or {})
+                self._alive[row] = True
+                self._index_row(row, old_payload)
+                log.append({"op": "upsert", "id": point_id, "row": row, "payload": self._payloads[row]})
+            self._append_log(log)
+
+    def set_payload(self, ids: Sequence[Any], payload: Dict[str, Any]) -> None:
+        with self._lock:
+            log = []
+            for point_id in ids:
+                row = self._rows.get(_point_key(point_id))
+                if row is None:
+                    continue
+                old_payload = self._payloads[row]
+                self._payloads[row] = {**old_payload, **payload}
+                self._index_row(row, old_payload)
+                log.append({"op": "payload", "id": _point_key(point_id), "payload": self._payloads[row]})
+            self._append_log(log)
+
+    def delete(self, ids: Sequence[Any]) -> None:
+        with self._lock:
+            log = []
+            for point_id in ids:
+                row = self._rows.pop(_point_key(point_id), None)
+                if row is None:
+                    continue
+                self._alive[row] = False
+                for by_value in self._field_rows.values():
+                    for rows in by_value.values():
+                        rows.discard(row)
+                log.append({"op": "delete", "id": _point_key(point_id)})
+            self._append_log(log)
+
+    # ==================== Leitura ====================
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _rows_with(self, key: str, value: Any) -> Set[int]:
+        by_value = self._field_rows.get(key)
+        if by_value is None:
+            by_value = {}
+            for point_id, row in self._rows.items():
+                field = self._payloads[row].get(key)
+                if _hashable(field):
+                    by_value.setdefault(field, set()).add(row)
+            self._field_rows[key] = by_value
+        return by_value.get(value, set())
+
+    def _mask(self, where: Optional[Dict[str, Any]], predicate: Optional[Callable[[Dict[str, Any]], bool]]) -> np.ndarray:
+        mask = self._alive[: self._count].copy()
+        for key, value in (where or {}).items():
+            selected = np.zeros(self._count, dtype=bool)
+            rows = list(self._rows_with(key, value))
+            if rows:
+                selected[rows] = True
+            mask &= selected
+        if predicate is not None:
+            for row in np.flatnonzero(mask):
+                if not predicate(self._payloads[row]):
+                    mask[row] = False
+        return mask
+
+    def search(
+        self,
+        vector: Sequence[float],
+        k: int = 10,
+        score_threshold: Optional[float] = None,
+        where: Optional[Dict[str, Any]] = None,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> List[Tuple[Any, float, Dict[str, Any]]]:
+        """Top-k por cosseno: [(id, score, payload)], do mais parecido para o menos."""
+        query = _normalize(np.asarray(vector, dtype=np.float32).reshape(self.dim))
+        with self._lock:
+            if not self._count or k <= 0:
+                return []
+            scores = self._vectors[: self._count] @ query
+            mask = self._mask(where, predicate)
+            if score_threshold is not None:
+                mask &= scores >= score_threshold
+            candidates = np.flatnonzero(mask)
+            if not candidates.size:
+                return []
+            if candidates.size > k:
+                top = np.argpartition(-scores[candidates], k - 1)[:k]
+                candidates = candidates[top]
+            order = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [(self._ids[row], float(scores[row]), self._payloads[row]) for row in order]
+
+    def scan(
+        self,
+        where: Optional[Dict[str, Any]] = None,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+    ) -> List[int]:
+        """Linhas que passam no filtro, em ordem de inserção ou pelo campo `order_by`."""
+        with self._lock:
+            rows = np.flatnonzero(self._mask(where, predicate)).tolist()
+            if order_by is not None:
+                rows = [row for row in rows if isinstance(self._payloads[row].get(order_by), (int, float))]
+                rows.sort(key=lambda row: self._payloads[row][order_by], reverse=descending)
+            return rows
+
+    def point(self, row: int, with_vector: bool = False) -> Tuple[Any, Dict[str, Any], Optional[List[float]]]:
+        vector = self._vectors[row].tolist() if with_vector else None
+        return self._ids[row], self._payloads[row], vector
+
+
+def _hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return value is not None
+
+
+# ==================== Filtros do Qdrant ====================
+
+
+class UnsupportedFilterError(NotImplementedError):
+    """Condição de filtro do Qdrant que o índice local não implementa."""
+
+
+def _condition_matches(condition: Any, payload: Dict[str, Any]) -> bool:
+    if isinstance(condition, rest.FieldCondition) and isinstance(condition.match, rest.MatchValue):
+        return payload.get(condition.key) == condition.match.value
+    if isinstance(condition, rest.FieldCondition) and isinstance(condition.match, rest.MatchAny):
+        return payload.get(condition.key) in condition.match.any
+    if isinstance(condition, rest.IsEmptyCondition):
+        return payload.get(condition.is_empty.key) in (None, [], "")
+    if isinstance(condition, rest.Filter):
+        return _filter_matches(condition, payload)
+    raise UnsupportedFilterError(f"Filter condition not supported by the local index: {condition!r}")
+
+
+def _filter_matches(query_filter: rest.Filter, payload: Dict[str, Any]) -> bool:
+    must = query_filter.must or []
+    must_not = query_filter.must_not or []
+    should = query_filter.should or []
+    must = must if isinstance(must, list) else [must]
+    must_not = must_not if isinstance(must_not, list) else [must_not]
+    should = should if isinstance(should, list) else [should]
+    return (
+        all(_condition_matches(c, payload) for c in must)
+        and not any(_condition_matches(c, payload) for c in must_not)
+        and (not should or any(_condition_matches(c, payload) for c in should))
+    )
+
+
+def _split_filter(query_filter: Optional[rest.Filter]) -> Tuple[Dict[str, Any], Optional[Callable[[Dict[str, Any]], bool]]]:
+    """Igualdades simples em `must` viram índice por campo; o resto vira predicado."""
+    if query_filter is None:
+        return {}, None
+    must = query_filter.must or []
+    must = must if isinstance(must, list) else [must]
+    where: Dict[str, Any] = {}
+    for condition in must:
+        if (
+            isinstance(condition, rest.FieldCondition)
+            and isinstance(condition.match, rest.MatchValue)
+            and condition.key not in where
+        ):
+            where[condition.key] = condition.match.value
+    return where, lambda payload: _filter_matches(query_filter, payload)
+
+
+# ==================== Cliente compatível com o Qdrant ====================
+
+
+class LocalVectorClient:
+    """Subconjunto da API do `QdrantClient` sobre um `LocalVectorIndex` por coleção."""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._indexes: Dict[str, LocalVectorIndex] = {}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            for name in sorted(os.listdir(directory)):
+                meta_path = os.path.join(directory, name, _META_FILE)
+                if os.path.exists(meta_path):
+                    with open(meta_path, encoding="utf-8") as f:
+                        self._open(name, json.load(f)["dim"])
+
+    def _open(self, name: str, dim: int) -> LocalVectorIndex:
+        with self._lock:
+            index = self._indexes.get(name)
+            if index is None:
+                path = os.path.join(self.directory, name) if self.directory else None
+                index = LocalVectorIndex(dim, path=path)
+                self._indexes[name] = index
+            return index
+
+    def index(self, collection_name: str) -> Optional[LocalVectorIndex]:
+        return self._indexes.get(collection_name)
+
+    def _require(self, collection_name: str) -> LocalVectorIndex:
+        index = self._indexes.get(collection_name)
+        if index is None:
+            raise ValueError(f"Collection {collection_name} not found")
+        return index
+
+    def get_collections(self) -> rest.CollectionsResponse:
+        return rest.CollectionsResponse(
+            collections=[rest.CollectionDescription(name=name) for name in self._indexes]
+        )
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return collection_name in self._indexes
+
+    def create_collection(self, collection_name: str, vectors_config: rest.VectorParams, **kwargs) -> bool:
+        self._open(collection_name, vectors_config.size)
+        return True
+
+    def create_payload_index(self, *args, **kwargs) -> None:
+        # Índices por campo são montados sob demanda (ver `LocalVectorIndex._rows_with`)
+        return None
+
+    def upsert(self, collection_name: str, points: List[rest.PointStruct], **kwargs) -> None:
+        if not points:
+            return None
+        index = self._indexes.get(collection_name) or self._open(collection_name, len(points[0].vector))
+        index.upsert(
+            [point.id for point in points],
+            [point.vector for point in points],
+            [point.payload for point in points],
+        )
+        return None
+
+    def query_points(
+        self,
+        collection_name: str,
+        query: Sequence[float],
+        query_filter: Optional[rest.Filter] = None,
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        with_payload: bool = True,
+        **kwargs,
+    ) -> rest.QueryResponse:
+        where, predicate = _split_filter(query_filter)
+        hits = self._require(collection_name).search(query, limit, score_threshold, where, predicate)
+        return rest.QueryResponse(
+            points=[
+                rest.ScoredPoint(id=point_id, version=0, score=score, payload=payload if with_payload else None)
+                for point_id, score, payload in hits
+            ]
+        )
+
+    def scroll(
+        self,
+        collection_name: str,
+        scroll_filter: Optional[rest.Filter] = None,
+        limit: int = 10,
+        offset: Optional[int] = None,
+        with_payload: bool = True,
+        with_vectors: bool = False,
+        order_by: Optional[rest.OrderBy] = None,
+        **kwargs,
+    ) -> Tuple[List[rest.Record], Optional[int]]:
+        """`offset` é a posição no resultado (inteiro), devolvida como próximo offset."""
+        index = self._require(collection_name)
+        where, predicate = _split_filter(scroll_filter)
+        order_key = order_by.key if isinstance(order_by, rest.OrderBy) else order_by
+        descending = isinstance(order_by, rest.OrderBy) and order_by.direction == rest.Direction.DESC
+        rows = index.scan(where, predicate, order_by=order_key, descending=descending)
+        start = offset or 0
+        page = rows[start : start + limit]
+        records = []
+        for row in page:
+            point_id, payload, vector = index.point(row, with_vector=bool(with_vectors))
+            records.append(rest.Record(id=point_id, payload=payload if with_payload else None, vector=vector))
+        next_offset = start + limit if start + limit < len(rows) else None
+        return records, next_offset
+
+    def count(self, collection_name: str, count_filter: Optional[rest.Filter] = None, **kwargs) -> rest.CountResult:
+        index = self._indexes.get(collection_name)
+        if index is None:
+            return rest.CountResult(count=0)
+        where, predicate = _split_filter(count_filter)
+        return rest.CountResult(count=len(index.scan(where, predicate)))
+
+    def set_payload(self, collection_name: str, payload: Dict[str, Any], points: Sequence[Any], **kwargs) -> None:
+        self._require(collection_name).set_payload(points, payload)
+
+    def delete(self, collection_name: str, points_selector: Any, **kwargs) -> None:
+        ids = points_selector.points if isinstance(points_selector, rest.PointIdsList) else points_selector
+        self._require(collection_name).delete(list(ids))
+
+    def close(self) -> None:
+        for index in self._indexes.values():
+            index.close()
+
+
+class VectorClientRouter:
+    """
+    Cliente que manda cada coleção para o índice local ou para o Qdrant.
+
+    `local_collections`: leitura e escrita só no local (dados recriáveis, ex.: catálogo).
+    `mirrored_collections`: leitura no local, escrita nos dois (o Qdrant segue
+    completo, ex.: memória de conversas). O resto vai direto para o Qdrant.
+    """
+
+    def __init__(
+        self,
+        remote: Any,
+        local: LocalVectorClient,
+        local_collections: Iterable[str] = (),
+        mirrored_collections: Iterable[str] = (),
+    ):
+        self.remote = remote
+        self.local = local
+        self.local_collections = set(local_collections)
+        self.mirrored_collections = set(mirrored_collections)
+
+    def _reads_local(self, collection_name: str) -> bool:
+        return collection_name in self.local_collections or collection_name in self.mirrored_collections
+
+    def backend(self, collection_name: str) -> str:
+        if collection_name in self.local_collections:
+            return "local"
+        if collection_name in self.mirrored_collections:
+            return "local+qdrant"
+        return "qdrant"
+
+    def _write(self, method: str, collection_name: str, *args, **kwargs) -> Any:
+        result = None
+        if collection_name not in self.local_collections:
+            result = getattr(self.remote, method)(*args, collection_name=collection_name, **kwargs)
+        if self._reads_local(collection_name):
+            result = getattr(self.local, method)(*args, collection_name=collection_name, **kwargs)
+        return result
+
+    def _read(self, method: str, collection_name: str, *args, **kwargs) -> Any:
+        if not self._reads_local(collection_name):
+            return getattr(self.remote, method)(*args, collection_name=collection_name, **kwargs)
+        try:
+            return getattr(self.local, method)(*args, collection_name=collection_name, **kwargs)
+        except UnsupportedFilterError as e:
+            metrics.incr("local_index.remote_fallbacks")
+            logger.warning(f"[SVIM] {collection_name}: {e}; querying Qdrant instead")
+            return getattr(self.remote, method)(*args, collection_name=collection_name, **kwargs)
+
+    def get_collections(self) -> rest.CollectionsResponse:
+        names = {c.name for c in self.remote.get_collections().collections if c.name not in self.local_collections}
+        names |= {c.name for c in self.local.get_collections().collections}
+        return rest.CollectionsResponse(collections=[rest.CollectionDescription(name=name) for name in sorted(names)])
+
+    def create_collection(self, collection_name: str, **kwargs) -> Any:
+        return self._write("create_collection", collection_name, **kwargs)
+
+    def create_payload_index(self, collection_name: str, **kwargs) -> Any:
+        return self._write("create_payload_index", collection_name, **kwargs)
+
+    def upsert(self, collection_name: str, **kwargs) -> Any:
+        return self._write("upsert", collection_name, **kwargs)
+
+    def set_payload(self, collection_name: str, **kwargs) -> Any:
+        return self._write("set_payload", collection_name, **kwargs)
+
+    def delete(self, collection_name: str, **kwargs) -> Any:
+        return self._write("delete", collection_name, **kwargs)
+
+    def query_points(self, collection_name: str, **kwargs) -> Any:
+        return self._read("query_points", collection_name, **kwargs)
+
+    def scroll(self, collection_name: str, **kwargs) -> Any:
+        return self._read("scroll", collection_name, **kwargs)
+
+    def count(self, collection_name: str, **kwargs) -> Any:
+        return self._read("count", collection_name, **kwargs)
+
+    def close(self) -> None:
+        """Grava e fecha só o índice local; o cliente do Qdrant é de quem o criou."""
+        self.local.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.remote, name)
+
+
+def _remote_count(remote: Any, collection_name: str) -> Optional[int]:
+    try:
+        return remote.count(collection_name=collection_name, exact=True).count
+    except Exception as e:
+        logger.info(f"[SVIM] Could not count {collection_name} on Qdrant: {e}")
+        return None
+
+
+def seed_local_collection(remote: Any, local: LocalVectorClient, collection_name: str, dim: int, batch_size: int = 256) -> int:
+    """Copia a coleção do Qdrant para o índice local (vetores + payloads). Retorna quantos pontos."""
+    local.create_collection(collection_name, vectors_config=rest.VectorParams(size=dim, distance=rest.Distance.COSINE))
+    copied = 0
+    offset = None
+    while True:
+        records, offset = remote.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        points = [
+            rest.PointStruct(id=record.id, vector=record.vector, payload=record.payload or {})
+            for record in records
+            if record.vector is not None
+        ]
+        local.upsert(collection_name, points)
+        copied += len(points)
+        if offset is None:
+            break
+    return copied
+
+
+def select_vector_client(
+    remote: Any,
+    collections: Dict[str, Dict[str, Any]],
+    directory: Optional[str] = None,
+    max_local_points: int = DEFAULT_LOCAL_MAX_POINTS,
+) -> Any:
+    """
+    Escolhe local ou Qdrant por coleção.
+
+    `collections`: nome -> {"mode": "auto" | "local" | "qdrant", "dim": int,
+    "mirror": bool}. No modo "auto" a coleção vai para o índice local se o
+    tamanho conhecido (Qdrant ou índice local persistido) couber em
+    `max_local_points`. Coleções espelhadas (`mirror`) são copiadas do Qdrant
+    quando o índice local tem menos pontos. Sem `directory`, "auto" sempre
+    espelha (o Qdrant continua sendo a cópia durável). Sem coleção local
+    devolve `remote`.
+    """
+    local = LocalVectorClient(directory)
+    local_only: Set[str] = set()
+    mirrored: Set[str] = set()
+
+    for name, spec in collections.items():
+        mode = spec.get("mode", "auto")
+        if mode == "qdrant":
+            continue
+        # Índice só em memória: o Qdrant precisa continuar completo para o próximo processo
+        mirror = spec.get("mirror", False) or (mode == "auto" and not directory)
+        if mode == "local" and not mirror and not directory:
+            logger.warning(f"[SVIM] {name}: local-only index without SVIM_VECTOR_INDEX_DIR is lost on restart")
+        local_index = local.index(name)
+        local_size = len(local_index) if local_index is not None else 0
+        remote_size = _remote_count(remote, name) if mirror or mode == "auto" else None
+        if mode == "auto":
+            size = max(local_size, remote_size or 0)
+            if remote_size is None and mirror:
+                # Sem saber o tamanho da fonte, não arrisca ler de uma cópia incompleta
+                continue
+            if size > max_local_points:
+                logger.info(f"[SVIM] {name}: {size} points, using Qdrant")
+                continue
+        if mirror:
+            if remote_size and remote_size > local_size:
+                copied = seed_local_collection(remote, local, name, spec["dim"])
+                logger.info(f"[SVIM] {name}: copied {copied} point(s) from Qdrant to the local index")
+            elif local_index is None:
+                # Coleção vazia no Qdrant: o lado local também precisa existir para as escritas
+                local.create_collection(
+                    name, vectors_config=rest.VectorParams(size=spec["dim"], distance=rest.Distance.COSINE)
+                )
+            mirrored.add(name)
+        else:
+            local_only.add(name)
+        logger.info(f"[SVIM] {name}: using local vector index ({'mirrored' if mirror else 'local only'})")
+
+    if not local_only and not mirrored:
+        local.close()
+        return remote
+    return VectorClientRouter(remote, local, local_collections=local_only, mirrored_collections=mirrored)
+
+
+__all__ = [
+    "DEFAULT_LOCAL_MAX_POINTS",
+    "LocalVectorClient",
+    "LocalVectorIndex",
+    "UnsupportedFilterError",
+    "VectorClientRouter",
+    "seed_local_collection",
+    "select_vector_client",
+]
@@ -5,8 +5,7 @@ import traceback
 from typing import Any, Dict
 from kestra import Kestra
 
-from agents.maria import create_svim_agent
-from agents.infra import create_session_factory
+from agents.run_once import run_once as run_payload
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -33,24 +32,17 @@ async def run_once() -> Dict[str, Any]:
     if not message:
         raise ValueError("SVIM_MESSAGE não foi definido nas variáveis de ambiente")
 
-    SessionFactory = create_session_factory()
-    db_session = SessionFactory()
-
-    try:
-        agent = create_svim_agent(db_session=db_session)
-
-        result = await agent.process(
-            {
-                "message": message,
-                "session_id": session_id,
-                "customer_profile": customer_profile,
-                "policies_context": policies_context,
-            },
-            user_id=user_id,
-        )
-        return result
-    finally:
-        db_session.close()
+    # Encaminha para o servidor residente (SVIM_SERVER_URL) quando disponível;
+    # caso contrário, executa o agente neste processo.
+    return await run_payload(
+        {
+            "message": message,
+            "user_id": user_id,
+            "session_id": session_id,
+            "customer_profile": customer_profile,
+            "policies_context": policies_context,
+        }
+    )
 
 def main():
     try:
@@ -17,30 +17,51 @@ Arquitetura:
 """
 
 import os
-import re
 import json
+import time
+import uuid
+import asyncio
 import logging
 from typing import TypedDict
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 from qdrant_client import QdrantClient
 from agents.infra import (
+    BatchedInteractionLogger,
     create_qdrant_client,
     ensure_qdrant_collection,
     log_svim_interaction,
 )
 
 from agents.llm_client import LLMClient
+from agents.intent_rules import RuleBasedIntentClassifier
+from agents.supervisor import ResponseSupervisor, StreamingSupervisor
+from agents.metrics import metrics, start_turn
+from agents.session_store import SessionState, SessionStore, create_session_store, update_session
+from agents.tokens import count_tokens, fit_recent_messages, truncate_to_tokens
+from agents.prompt_builder import SUMMARY_HEADER
 from agents.vector_store import SVIMVectorStore
+from agents.write_behind import WriteBehindQueue
 from agents.base_agent import BaseAgent
+from agents.catalog import CatalogPrefetcher, CatalogSync
+from agents.catalog.sync import PROFESSIONALS_COLLECTION, SERVICES_COLLECTION
+from agents.local_index import DEFAULT_LOCAL_MAX_POINTS, select_vector_client
 from agents.tools.index import TOOLS
-from agents.resolvers.service import resolve_service, resolve_professional
+from agents.tools.cache import get_catalog_cache
+from agents.tools.pagination import llm_view
+from agents.resolvers.service import (
+    pick_candidate,
+    rank_professionals,
+    rank_services,
+    resolve_professional,
+    resolve_service,
+)
 from agents.resolvers.customer import resolve_cliente_id
 
 # Prompts da SVIM
@@ -62,6 +83,19 @@ class SVIMIntent(Enum):
     UNKNOWN = "unknown"         # Não identificado
 
 
+# Intenções que precisam do contexto de agendamento (draft, IDs resolvidos)
+SCHEDULING_INTENTS = {SVIMIntent.SCHEDULE, SVIMIntent.RESCHEDULE, SVIMIntent.CANCEL}
+
+# Intenção implícita numa tool call do modo single-pass
+TOOL_INTENTS = {
+    "listar_profissionais": SVIMIntent.INFO,
+    "listar_servicos_profissional": SVIMIntent.INFO,
+    "listar_servicos": SVIMIntent.INFO,
+    "listar_agendamentos": SVIMIntent.INFO,
+    "criar_agendamento": SVIMIntent.SCHEDULE,
+}
+
+
 class SVIMState(TypedDict):
     """
     Estado da conversa da SVIM dentro do LangGraph.
@@ -77,6 +111,8 @@ class SVIMState(TypedDict):
     finish_session: bool
     system_prompt: str
     tool_attempts: Dict[str, int]
+    # Estado lido do session store no início do turno (base do compare-and-set)
+    session_state: Optional[SessionState]
 
 
 # ==================== Agente Principal ====================
@@ -95,7 +131,12 @@ class SVIMAgent(BaseAgent):
     # Máximo de tentativas lógicas por ferramenta (para esta mensagem)
     MAX_TOOL_LOGICAL_RETRIES = 2
 
-    def __init__(self, config: Optional[Dict[str, Any]] = None, db_session: Optional[Session] = None):
+    def __init__(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        db_session: Optional[Session] = None,
+        session_factory: Optional[sessionmaker] = None,
+    ):
         # Config padrão
         config = config or {}
         config.setdefault("qdrant_url", os.getenv("QDRANT_URL", "http://localhost:6333"))
@@ -109,12 +150,14 @@ class SVIMAgent(BaseAgent):
             agent_type="svim_reception",
             config=config,
             enable_kg=False,
-            enable_memory=True,
+            enable_memory=config.get("enable_memory", True),
             enable_learning=False
         )
 
         self.config = config
         self.db_session = db_session
+        # Em modo residente (agents.server) cada interação abre sua própria sessão
+        self.session_factory = session_factory
 
         # LLM híbrido com fallback
         self.llm_client = LLMClient()
@@ -126,22 +169,137 @@ class SVIMAgent(BaseAgent):
             collection_name=config["qdrant_collection_name"],
             vector_size=config["qdrant_vector_size"],
         )
+        # Coleções pequenas ficam num índice NumPy em processo (ver agents/local_index.py).
+        # Sem vector_index_dir o índice é espelhado no Qdrant, que guarda os hashes do
+        # catálogo entre processos; a memória, se local, é sempre espelhada
+        self.vector_client = select_vector_client(
+            self.qdrant_client,
+            {
+                config["qdrant_collection_name"]: {
+                    "mode": config.get("memory_vector_backend", "qdrant"),
+                    "dim": config["qdrant_vector_size"],
+                    "mirror": True,
+                },
+                PROFESSIONALS_COLLECTION: {
+                    "mode": config.get("catalog_vector_backend", "auto"),
+                    "dim": config["qdrant_vector_size"],
+                },
+                SERVICES_COLLECTION: {
+                    "mode": config.get("catalog_vector_backend", "auto"),
+                    "dim": config["qdrant_vector_size"],
+                },
+            },
+            directory=config.get("vector_index_dir"),
+            max_local_points=config.get("local_index_max_points", DEFAULT_LOCAL_MAX_POINTS),
+        )
 
         self.vector_store = SVIMVectorStore(
-            client=self.qdrant_client,
-            collection=self.config["qdrant_collection_name"]
+            client=self.vector_client,
+            collection=self.config["qdrant_collection_name"],
+            legacy_fallback=config.get("memory_legacy_fallback"),
+        )
+
+        # Catálogo vetorizado: busca semântica de serviços quando nome/fuzzy não resolvem
+        self.catalog_sync = CatalogSync(
+            self.vector_client,
+            ttl_seconds=config.get("catalog_sync_ttl", 6 * 3600),
+            embedder=self.vector_store.embedder,
+            vector_size=config["qdrant_vector_size"],
+            batch_size=config.get("catalog_sync_batch_size", 64),
         )
+        self.catalog_search_enabled = config.get("catalog_search_enabled", True)
+        self.catalog_search_k = config.get("catalog_search_k", 3)
+        self.catalog_search_min_score = config.get("catalog_search_min_score", 0.5)
 
         # Prompts da SVIM
         self.prompts = SVIMPrompts()
 
+        # Pré-classificador local: evita a chamada de LLM de intenção nos casos óbvios
+        self.intent_rules = (
+            RuleBasedIntentClassifier(threshold=config.get("intent_rule_threshold", 0.85))
+            if config.get("intent_rules_enabled", True)
+            else None
+        )
+
+        # Correções locais da resposta antes de recorrer ao LLM de revisão
+        self.supervisor = ResponseSupervisor()
+
+        # Single-pass: intenção + resposta numa única chamada ao LLM
+        self.single_pass = config.get("single_pass", False)
+
         # Gestão de contexto
         self.max_context_messages = config.get("max_context_messages", 10)
+        # Busca semântica na memória: conversas antigas parecidas com a mensagem atual
+        self.memory_search_k = config.get("memory_search_k", 3)
+        self.memory_search_min_chars = config.get("memory_search_min_chars", 15)
+        # Orçamentos de tokens do contexto (histórico já inclui o resumo do cliente)
+        self.history_token_budget = config.get("history_token_budget", 600)
+        self.memory_token_budget = config.get("memory_token_budget", 250)
+        # Contexto do prompt de agendamento (cliente, draft, histórico) em tokens
+        self.scheduling_context_token_budget = config.get("scheduling_context_token_budget", 800)
+        # Resumo incremental por cliente: atualizado ao fim da sessão ou a cada N mensagens
+        self.summary_enabled = config.get("summary_enabled", True)
+        self.summary_every_messages = config.get("summary_every_messages", 20)
+        self.summary_token_budget = config.get("summary_token_budget", 200)
+        # Mensagens guardadas no session store (as ainda não resumidas ficam até o resumo)
+        self.session_max_messages = config.get("session_max_messages", 40)
+        # Score mínimo para aceitar um profissional/serviço pela busca fuzzy
+        self.fuzzy_min_score = config.get("fuzzy_min_score", 0.6)
         self.cache_ttl = config.get("cache_ttl", 300)
 
+        # Cache do catálogo (profissionais/serviços) usado pelas tools da Trinks
+        self.catalog_cache = get_catalog_cache()
+        self.catalog_cache.configure(
+            ttl_seconds=self.cache_ttl,
+            stale_ttl_seconds=config.get("cache_stale_ttl", 3600),
+            max_entries=config.get("cache_max_entries", 256),
+        )
+
         # Tools
         self.tools = TOOLS
 
+        # Pré-carga do catálogo em background; iniciada pelo servidor residente (`start_background`)
+        self.catalog_prefetcher: Optional[CatalogPrefetcher] = None
+        if config.get("catalog_prefetch_enabled", True):
+            # Resolvidas na chamada, como em `_prepare_appointment_context`
+            self.catalog_prefetcher = CatalogPrefetcher(
+                lambda: self.tools[0]["py_fn"](),
+                lambda **params: self.tools[1]["py_fn"](**params),
+                interval_seconds=config.get("catalog_prefetch_interval", 240),
+                concurrency=config.get("catalog_prefetch_concurrency", 8),
+            )
+
+        # Escritas fora do caminho crítico da resposta (memória no Qdrant, log no Postgres)
+        self.write_behind: Optional[WriteBehindQueue] = None
+        if config.get("write_behind", True):
+            self.write_behind = WriteBehindQueue(
+                max_size=config.get("write_behind_max_size", 1000),
+                workers=config.get("write_behind_workers", 2),
+                max_retries=config.get("write_behind_max_retries", 3),
+                journal_path=config.get("write_behind_journal"),
+            )
+            self.write_behind.register("memory", self._write_memory)
+            self.write_behind.register("interaction_log", self._write_interaction_log)
+            self.write_behind.register("summary", self._update_summary)
+            self.write_behind.register("interaction_log_rows", self._write_interaction_rows)
+        # Log de interações em lote (modo residente): um COMMIT por lote, não por mensagem
+        self.interaction_logger: Optional[BatchedInteractionLogger] = None
+        if session_factory is not None and config.get("interaction_log_batching", True):
+            self.interaction_logger = BatchedInteractionLogger(
+                session_factory.kw["bind"],
+                batch_size=config.get("interaction_log_batch_size", 200),
+                flush_interval_ms=config.get("interaction_log_flush_ms", 250),
+                max_retries=config.get("interaction_log_max_retries", 3),
+                # Lote que esgotou as tentativas vai para o journal do write-behind
+                dead_letter=self._spill_interaction_rows if self.write_behind is not None else None,
+            )
+
+        # Estado corrente da conversa por cliente (draft, últimas mensagens, intenção)
+        self.session_store: SessionStore = create_session_store(config.get("session_store_url"))
+
+        # Memória ainda na fila, por usuário: a próxima mensagem já enxerga o que foi salvo
+        self._pending_memory: Dict[str, Dict[str, Any]] = {}
+
         # Workflow LangGraph
         try:
             self.workflow = self._build_workflow()
@@ -160,6 +318,11 @@ class SVIMAgent(BaseAgent):
         2. detect_intent      -> Detecta intenção básica (agendar, info, etc.)
         3. generate_response  -> Gera resposta usando prompts específicos
         4. save_memory        -> Salva conversa em memória vetorial
+
+        Com `single_pass`, o passo 2 roda só as regras locais; se elas não
+        decidirem, `single_pass` classifica e responde numa única chamada. O
+        caminho em duas etapas continua como fallback (agendamentos, tools e
+        respostas fora do formato).
         """
         workflow = StateGraph(SVIMState)
 
@@ -170,13 +333,35 @@ class SVIMAgent(BaseAgent):
         workflow.add_node("save_memory", self._save_memory)
 
         workflow.set_entry_point("load_context")
-        workflow.add_edge("load_context", "detect_intent")
+        if self.single_pass:
+            workflow.add_node("detect_intent_rules", self._detect_intent_rules)
+            workflow.add_node("single_pass", self._single_pass)
+            workflow.add_edge("load_context", "detect_intent_rules")
+            workflow.add_conditional_edges(
+                "detect_intent_rules",
+                self._route_after_rules,
+                {"generate_response": "generate_response", "single_pass": "single_pass"},
+            )
+            workflow.add_conditional_edges(
+                "single_pass",
+                self._route_after_single_pass,
+                {
+                    "supervise_response": "supervise_response",
+                    "generate_response": "generate_response",
+                    "detect_intent": "detect_intent",
+                },
+            )
+        else:
+            workflow.add_edge("load_context", "detect_intent")
         workflow.add_edge("detect_intent", "generate_response")
         workflow.add_edge("generate_response", "supervise_response")
         workflow.add_edge("supervise_response", "save_memory")
         workflow.add_edge("save_memory", END)
 
-        return workflow.compile(checkpointer=MemorySaver())
+        # O estado completo é enviado a cada chamada; o checkpointer em memória só
+        # cresce num processo residente, então o servidor pode desligá-lo.
+        checkpointer = MemorySaver() if self.config.get("workflow_checkpointer", True) else None
+        return workflow.compile(checkpointer=checkpointer)
 
     # ==================== Nodes do Workflow ====================
 
@@ -185,46 +370,118 @@ class SVIMAgent(BaseAgent):
         Carrega contexto recente de conversas com esse cliente.
         Pode ser usado no prompt como 'context' da SVIM.
         """
+        # A busca semântica (embedding + Qdrant) corre em paralelo com o resto
+        memory_task = asyncio.create_task(self._search_related_memory(state))
         try:
             state.setdefault("appointment_context", {})
             state.setdefault("tool_attempts", {})
 
-            # Restaura o último appointment_context salvo (se backend não enviou nada)
-            if not state["appointment_context"]:
-                latest_meta = await self.vector_store.get_latest_metadata(
-                    user_id=state["user_id"]
+            stored = await self.session_store.get(state["user_id"])
+            if stored is not None:
+                # Caminho normal: uma busca por chave, sem tocar no Qdrant
+                metrics.incr("session_store.hits")
+                state["session_state"] = stored
+                user_context = stored.data.get("messages") or []
+                summary = stored.data.get("summary") or ""
+                latest_meta = stored.data
+            else:
+                # Cliente ainda sem estado salvo: reconstrói pela memória no Qdrant
+                metrics.incr("session_store.misses")
+                summary = ""
+                pending = self._pending_memory.get(state["user_id"])
+
+                # Mensagens recentes e último metadata numa única consulta ordenada
+                user_context, latest_meta = await self.vector_store.get_recent_context(
+                    user_id=state["user_id"],
+                    k=self.max_context_messages,
                 )
-                if latest_meta.get("appointment_context"):
-                    state["appointment_context"] = latest_meta.get(
-                        "appointment_context", {}
-                    )
+                if pending:
+                    latest_meta = pending["metadata"]
+                    user_context = (user_context + pending["messages"])[-self.max_context_messages:]
+                # Versão 0: a primeira gravação cria o estado a partir desse histórico
+                state["session_state"] = SessionState({"messages": user_context}, 0)
 
-            user_context = await self.vector_store.get_user_context(
-                user_id=state["user_id"],
-                k=self.max_context_messages,
-            )
+            # Restaura o último appointment_context salvo (se backend não enviou nada)
+            if not state["appointment_context"] and latest_meta.get("appointment_context"):
+                state["appointment_context"] = latest_meta.get(
+                    "appointment_context", {}
+                )
 
-            # Monta um texto simples de contexto
-            history_text = self._format_messages(user_context)
+            # Resumo do cliente + as mensagens mais recentes que couberem no orçamento
+            history_text = self._build_history(summary, user_context[-self.max_context_messages:])
             state["appointment_context"]["history"] = history_text
+            # À parte também: o prompt de agendamento corta turnos sem cortar o resumo
+            state["appointment_context"]["summary"] = summary
+
+            # Só o que ainda não está no histórico recente
+            recent = {(m.get("role"), m.get("content")) for m in user_context}
+            related = [
+                msg
+                for hit in await memory_task
+                for msg in hit["messages"]
+                if (msg.get("role"), msg.get("content")) not in recent
+            ]
+            if related:
+                metrics.incr("memory.related_turns")
+                state["appointment_context"]["memories"] = truncate_to_tokens(
+                    self._format_messages(related), self.memory_token_budget
+                )
 
-            logger.info(f"[SVIM] Context loaded for user {state['user_id']}: {len(user_context)} messages")
+            logger.info(
+                f"[SVIM] Context loaded for user {state['user_id']}: {len(user_context)} messages, "
+                f"{len(related)} related from memory"
+            )
         except Exception as e:
             logger.error(f"[SVIM] Error loading context: {e}")
+        finally:
+            if not memory_task.done():
+                memory_task.cancel()
 
         return state
 
+    def _build_history(self, summary: str, messages: List[Dict[str, Any]]) -> str:
+        """Texto de histórico dentro de `history_token_budget` (o resumo entra primeiro)."""
+        summary_text = f"{SUMMARY_HEADER}\n{summary}\n\n" if summary else ""
+        budget = self.history_token_budget - count_tokens(summary_text)
+        recent = fit_recent_messages(messages, budget, max_messages=self.max_context_messages)
+        history = summary_text + self._format_messages(recent)
+
+        # Antes: as últimas `max_context_messages` mensagens cruas, sem resumo nem orçamento
+        metrics.observe("context.history_tokens_raw", count_tokens(self._format_messages(messages)))
+        metrics.observe("context.history_tokens", count_tokens(history))
+        return history
+
+    async def _search_related_memory(self, state: SVIMState) -> List[Dict[str, Any]]:
+        """Conversas antigas do cliente semanticamente parecidas com a mensagem atual."""
+        query = self._last_user_message(state).strip()
+        # Saudações e respostas curtas ("oi", "ok", "sim") não trazem nada útil
+        if not self.enable_memory or len(query) < self.memory_search_min_chars:
+            return []
+        metrics.incr("memory.searches")
+        started = time.perf_counter()
+        hits = await self.search_memory(query=query, limit=self.memory_search_k, user_id=state["user_id"])
+        metrics.observe("memory.search_ms", (time.perf_counter() - started) * 1000)
+        return hits
+
     async def _detect_intent(self, state: SVIMState) -> SVIMState:
         """
-        Detecta a intenção básica do cliente usando uma chamada LLM de classificação.
+        Detecta a intenção básica do cliente.
+
+        Primeiro tenta o classificador local por regras; só usa a chamada LLM de
+        classificação quando ele não tem confiança suficiente.
         """
-        try:
-            last_message = ""
-            for msg in reversed(state["messages"]):
-                if msg.get("role") == "user":
-                    last_message = msg.get("content", "")
-                    break
+        # No modo single-pass as regras já rodaram antes de chegar aqui
+        if not self.single_pass:
+            state = await self._detect_intent_rules(state)
+            if state["intent"] != SVIMIntent.UNKNOWN:
+                return state
+        return await self._detect_intent_llm(state)
 
+    async def _detect_intent_llm(self, state: SVIMState) -> SVIMState:
+        """Classificação de intenção pelo LLM (quando as regras não decidiram)."""
+        metrics.incr("intent.llm_fallback")
+        try:
+            last_message = self._last_user_message(state)
             classifier_prompt = self.prompts.get_intent_classifier_prompt()
 
             response = await self.llm_client.chat_completion(
@@ -244,17 +501,7 @@ class SVIMAgent(BaseAgent):
                 except json.JSONDecodeError:
                     intent_value = response.strip().lower()
 
-            intent_map = {
-                "schedule": SVIMIntent.SCHEDULE,
-                "reschedule": SVIMIntent.RESCHEDULE,
-                "cancel": SVIMIntent.CANCEL,
-                "info": SVIMIntent.INFO,
-                "smalltalk": SVIMIntent.SMALLTALK,
-                "farewell": SVIMIntent.FAREWELL,
-                "unknown": SVIMIntent.UNKNOWN,
-            }
-
-            state["intent"] = intent_map.get(intent_value, SVIMIntent.UNKNOWN)
+            state["intent"] = self._parse_intent(intent_value)
             logger.info(f"[SVIM] Detected intent for user {state['user_id']}: {state['intent'].value}")
         except Exception as e:
             logger.error(f"[SVIM] Error detecting intent: {e}")
@@ -262,49 +509,97 @@ class SVIMAgent(BaseAgent):
 
         return state
 
-    async def _generate_response(self, state: SVIMState) -> SVIMState:
+    async def _detect_intent_rules(self, state: SVIMState) -> SVIMState:
+        """Só o classificador local (usado sozinho no modo single-pass e no streaming)."""
+        metrics.incr("intent.messages")
+        try:
+            self._classify_with_rules(state)
+        except Exception as e:
+            logger.error(f"[SVIM] Error detecting intent with rules: {e}")
+        return state
+
+    def _route_after_rules(self, state: SVIMState) -> str:
+        # As regras nunca produzem UNKNOWN: se mudou, já temos a intenção
+        return "generate_response" if state["intent"] != SVIMIntent.UNKNOWN else "single_pass"
+
+    async def _single_pass(self, state: SVIMState) -> SVIMState:
         """
-        Gera resposta da Maria usando os prompts da SVIM.
-        Suporta chamadas de ferramentas (tools).
+        Classifica a intenção e gera a resposta numa única chamada ao LLM.
+
+        O modelo devolve um JSON {"intent", "reply"} (ou uma tool call). A resposta
+        só é aproveitada para intenções que não dependem do contexto de
+        agendamento; nos demais casos a intenção já fica definida e o fluxo segue
+        para `generate_response`, sem a chamada extra de classificação.
         """
+        metrics.incr("single_pass.turns")
         try:
-            state.setdefault("tool_attempts", {})
+            system_prompt = self.prompts.get_single_pass_prompt(
+                self._base_context(state),
+                state["policies_context"].get("policies_text", ""),
+            )
+            self.prompts.check_prefix("single_pass", system_prompt)
+            response = await self.llm_client.chat_completion(
+                messages=state["messages"][-6:],
+                system_prompt=system_prompt,
+                tools=self.tools,
+                temperature=0.3,
+                max_tokens=500,
+                response_format={"type": "json_object"},
+            )
 
-            history = state["appointment_context"].get("history", "")
-            customer_name = state["customer_profile"].get("name") or "cliente"
-            base_context = f"Histórico recente:\n{history}\n\nCliente: {customer_name}"
-
-            # Escolher prompt conforme intenção
-            if state["intent"] in [SVIMIntent.SCHEDULE, SVIMIntent.RESCHEDULE, SVIMIntent.CANCEL]:
-                # tenta pegar o clienteId "real" vindo do backend
-                cliente_id_context = (
-                    state["customer_profile"].get("clienteId")  # ideal
-                    or state["customer_profile"].get("id")      # fallback, se você usar outro campo
-                    or state["user_id"]                         # último recurso
-                )
+            if isinstance(response, dict) and "tool" in response:
+                # Tools exigem o prompt completo da intenção: refaz pelo caminho normal
+                state["intent"] = TOOL_INTENTS.get(response["tool"]["name"], SVIMIntent.UNKNOWN)
+                metrics.incr("single_pass.fallback_tool")
+                return state
 
-                state = await self._prepare_appointment_context(state)
-                system_prompt = self.prompts.get_scheduling_prompt(
-                    context=state,
-                    cliente_id=cliente_id_context,
-                    cliente_nome=state["customer_profile"].get("name", "cliente"),
-                )
-            elif state["intent"] == SVIMIntent.INFO:
-                policies = state["policies_context"].get("policies_text", "")
-                system_prompt = self.prompts.get_policy_prompt(
-                    f"{base_context}\n\nPolíticas:\n{policies}"
-                )
-            else:
-                system_prompt = self.prompts.get_base_conversation_prompt(base_context)
+            parsed = json.loads(response) if isinstance(response, str) else response
+            intent = self._parse_intent(str(parsed.get("intent", "")).lower())
+            reply = str(parsed.get("reply") or "").strip()
+            state["intent"] = intent
 
-            recent_messages = state["messages"][-6:]
+            if intent in SCHEDULING_INTENTS:
+                metrics.incr("single_pass.fallback_scheduling")
+                return state
+            if not reply:
+                metrics.incr("single_pass.fallback_empty")
+                return state
 
-            # Guardar o system prompt para o passo de supervisão
             state["system_prompt"] = system_prompt
+            state["messages"].append({
+                "role": "assistant",
+                "content": reply,
+                "timestamp": datetime.now().isoformat(),
+            })
+            self._update_finish_session(state)
+            metrics.incr("single_pass.answered")
+            logger.info(f"[SVIM] Single-pass answer for user {state['user_id']}: {intent.value}")
+        except Exception as e:
+            # JSON inválido ou erro na chamada: volta para o fluxo em duas etapas
+            logger.error(f"[SVIM] Error in single-pass response: {e}")
+            metrics.incr("single_pass.fallback_error")
+            state["intent"] = SVIMIntent.UNKNOWN
+
+        return state
+
+    def _route_after_single_pass(self, state: SVIMState) -> str:
+        if state["messages"][-1].get("role") == "assistant":
+            return "supervise_response"
+        if state["intent"] != SVIMIntent.UNKNOWN:
+            return "generate_response"
+        return "detect_intent"
+
+    async def _generate_response(self, state: SVIMState) -> SVIMState:
+        """
+        Gera resposta da Maria usando os prompts da SVIM.
+        Suporta chamadas de ferramentas (tools).
+        """
+        try:
+            system_prompt = await self._select_system_prompt(state)
 
             # === 1. Chamada ao modelo com tools habilitadas ===
             response = await self.llm_client.chat_completion(
-                messages=recent_messages,
+                messages=state["messages"][-6:],
                 system_prompt=system_prompt,
                 tools=self.tools,
                 temperature=0.3,
@@ -318,96 +613,14 @@ class SVIMAgent(BaseAgent):
                     "content": response,
                     "timestamp": datetime.now().isoformat(),
                 })
+                self._update_finish_session(state)
                 return state
 
             # === 3. Caso seja tool call ===
             if "tool" in response:
-                tool_id = response["tool"]["id"]
-                tool_name = response["tool"]["name"]
-
-                # Normaliza arguments: pode vir como dict ou string JSON
-                raw_args = response["tool"]["arguments"]
-                if isinstance(raw_args, str):
-                    try:
-                        tool_args = json.loads(raw_args)
-                    except json.JSONDecodeError:
-                        print(f"[SVIM] Invalid JSON in tool arguments for '{tool_name}': {raw_args}")
-                        tool_args = {}
-                else:
-                    tool_args = raw_args or {}
-
-                # Atualiza contador de tentativas lógicas desta tool
-                attempts = state["tool_attempts"].get(tool_name, 0) + 1
-                state["tool_attempts"][tool_name] = attempts
-                print(f"[SVIM] Tool '{tool_name}' logical attempt #{attempts}")
-
-                # Descobre o clienteId canônico vindo do contexto
-                canonical_cliente_id = (
-                    state["customer_profile"].get("clienteId")
-                    or state["customer_profile"].get("id")
-                    or state["user_id"]
-                )
-
-                tool_data = next((t for t in self.tools if t["name"] == tool_name), None)
-                if not tool_data:
-                    raise ValueError(f"Tool '{tool_name}' não encontrada")
-
-                tool_fn = tool_data["py_fn"]
-
-                if tool_name == "criar_agendamento":
-                    draft = state.get("appointment_context", {}).get("appointment_draft", {})
-                    merged_args = {
-                        "servicoId": draft.get("serviceId"),
-                        "profissionalId": draft.get("professionalId"),
-                        "dataHoraInicio": draft.get("dateTimeIso") or tool_args.get("dataHoraInicio"),
-                        "duracaoEmMinutos": draft.get("durationMinutes") or tool_args.get("duracaoEmMinutos"),
-                        "valor": draft.get("price") or tool_args.get("valor"),
-                        "observacoes": draft.get("notes") or tool_args.get("observacoes", ""),
-                        "confirmado": tool_args.get("confirmado", False),
-                    }
-                    merged_args.update({k: v for k, v in tool_args.items() if k not in merged_args or merged_args[k] is None})
-                    print(f"[SVIM] Executing tool: {tool_name} with args: {merged_args}")
-                    tool_result = await tool_fn(merged_args, state)
-                    print(f"[SVIM] Tool result: {tool_result}")
-                else:
-                    print(f"[SVIM] Executing tool: {tool_name} with args: {tool_args}")
-                    tool_result = await tool_fn(**tool_args) if isinstance(tool_args, dict) else await tool_fn(tool_args)
-                    print(f"[SVIM] Tool result: {tool_result}")
-
-
-                # Inserir chamada na conversa (formato OpenAI)
-                state["messages"].append({
-                    "role": "assistant",
-                    "content": None,
-                    "tool_calls": [{
-                        "id": tool_id,
-                        "type": "function",
-                        "function": {
-                            "name": tool_name,
-                            "arguments": json.dumps(tool_args)
-                        }
-                    }]
-                })
-
-                # Inserir resultado da tool (formato OpenAI)
-                state["messages"].append({
-                    "role": "tool",
-                    "tool_call_id": tool_id,
-                    "name": tool_name,
-                    "content": json.dumps(tool_result),
-                })
+                final_system_prompt = await self._run_tool_call(state, response["tool"], system_prompt)
 
                 # === 4. Segunda chamada para resposta final ===
-                # Aqui acontece o "retry lógico": a LLM vê o erro/sucesso da tool
-                # e decide se explica o problema ou segue o fluxo.
-                # Não permitimos novas tool calls nesta etapa para evitar loop.
-                final_system_prompt = self.prompts.get_post_tool_prompt(
-                    base_system_prompt=system_prompt,
-                    tool_name=tool_name,
-                    attempts=attempts,
-                    max_attempts=self.MAX_TOOL_LOGICAL_RETRIES,
-                )
-
                 final_response = await self.llm_client.chat_completion(
                     messages=state["messages"],
                     system_prompt=final_system_prompt,
@@ -420,23 +633,7 @@ class SVIMAgent(BaseAgent):
                     "timestamp": datetime.now().isoformat(),
                 })
 
-            # Atualiza finish_session com base na última mensagem do usuário
-            last_user_msg = next(
-                m["content"] for m in reversed(state["messages"]) if m["role"] == "user"
-            ).lower()
-
-            farewell_tokens = [
-                "tchau",
-                "obrigado",
-                "obrigada",
-                "valeu",
-                "até mais",
-                "até logo",
-                "bom descanso",
-            ]
-
-            state["finish_session"] = any(tok in last_user_msg for tok in farewell_tokens)
-
+            self._update_finish_session(state)
             return state
 
         except Exception as e:
@@ -447,12 +644,143 @@ class SVIMAgent(BaseAgent):
             })
             return state
 
+    async def _select_system_prompt(self, state: SVIMState) -> str:
+        """Escolhe o prompt conforme a intenção (preparando o agendamento se for o caso)."""
+        state.setdefault("tool_attempts", {})
+        base_context = self._base_context(state)
+
+        if state["intent"] in SCHEDULING_INTENTS:
+            # tenta pegar o clienteId "real" vindo do backend
+            cliente_id_context = (
+                state["customer_profile"].get("clienteId")  # ideal
+                or state["customer_profile"].get("id")      # fallback, se você usar outro campo
+                or state["user_id"]                         # último recurso
+            )
+
+            await self._prepare_appointment_context(state)
+            system_prompt = self.prompts.get_scheduling_prompt(
+                context=state,
+                cliente_id=cliente_id_context,
+                cliente_nome=state["customer_profile"].get("name", "cliente"),
+                context_token_budget=self.scheduling_context_token_budget,
+            )
+            metrics.observe("prompt.scheduling_tokens", count_tokens(system_prompt))
+            prompt_kind = "scheduling"
+        elif state["intent"] == SVIMIntent.INFO:
+            policies = state["policies_context"].get("policies_text", "")
+            system_prompt = self.prompts.get_policy_prompt(
+                f"{base_context}\n\nPolíticas:\n{policies}"
+            )
+            prompt_kind = "policy"
+        else:
+            system_prompt = self.prompts.get_base_conversation_prompt(base_context)
+            prompt_kind = "base"
+        self.prompts.check_prefix(prompt_kind, system_prompt)
+
+        # Guardar o system prompt para o passo de supervisão
+        state["system_prompt"] = system_prompt
+        return system_prompt
+
+    async def _run_tool_call(self, state: SVIMState, tool: Dict[str, Any], system_prompt: str) -> str:
+        """
+        Executa a tool pedida pelo modelo e registra chamada + resultado nas mensagens.
+
+        Retorna o system prompt da segunda chamada (resposta final ao cliente).
+        """
+        tool_id = tool["id"]
+        tool_name = tool["name"]
+
+        # Normaliza arguments: pode vir como dict ou string JSON
+        raw_args = tool["arguments"]
+        if isinstance(raw_args, str):
+            try:
+                tool_args = json.loads(raw_args)
+            except json.JSONDecodeError:
+                print(f"[SVIM] Invalid JSON in tool arguments for '{tool_name}': {raw_args}")
+                tool_args = {}
+        else:
+            tool_args = raw_args or {}
+
+        # Atualiza contador de tentativas lógicas desta tool
+        attempts = state["tool_attempts"].get(tool_name, 0) + 1
+        state["tool_attempts"][tool_name] = attempts
+        print(f"[SVIM] Tool '{tool_name}' logical attempt #{attempts}")
+
+        # Descobre o clienteId canônico vindo do contexto
+        canonical_cliente_id = (
+            state["customer_profile"].get("clienteId")
+            or state["customer_profile"].get("id")
+            or state["user_id"]
+        )
+
+        tool_data = next((t for t in self.tools if t["name"] == tool_name), None)
+        if not tool_data:
+            raise ValueError(f"Tool '{tool_name}' não encontrada")
+
+        tool_fn = tool_data["py_fn"]
+
+        if tool_name == "criar_agendamento":
+            draft = state.get("appointment_context", {}).get("appointment_draft", {})
+            merged_args = {
+                "servicoId": draft.get("serviceId"),
+                "profissionalId": draft.get("professionalId"),
+                "dataHoraInicio": draft.get("dateTimeIso") or tool_args.get("dataHoraInicio"),
+                "duracaoEmMinutos": draft.get("durationMinutes") or tool_args.get("duracaoEmMinutos"),
+                "valor": draft.get("price") or tool_args.get("valor"),
+                "observacoes": draft.get("notes") or tool_args.get("observacoes", ""),
+                "confirmado": tool_args.get("confirmado", False),
+            }
+            merged_args.update({k: v for k, v in tool_args.items() if k not in merged_args or merged_args[k] is None})
+            print(f"[SVIM] Executing tool: {tool_name} with args: {merged_args}")
+            tool_result = await tool_fn(merged_args, state)
+            print(f"[SVIM] Tool result: {tool_result}")
+        else:
+            print(f"[SVIM] Executing tool: {tool_name} with args: {tool_args}")
+            tool_result = await tool_fn(**tool_args) if isinstance(tool_args, dict) else await tool_fn(tool_args)
+            print(f"[SVIM] Tool result: {tool_result}")
+
+
+        # Inserir chamada na conversa (formato OpenAI)
+        state["messages"].append({
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{
+                "id": tool_id,
+                "type": "function",
+                "function": {
+                    "name": tool_name,
+                    "arguments": json.dumps(tool_args)
+                }
+            }]
+        })
+
+        # Inserir resultado da tool (formato OpenAI); listagens vão cortadas ao LLM
+        if tool_data.get("llm_max_items"):
+            tool_result = llm_view(tool_result, tool_data["llm_max_items"])
+        state["messages"].append({
+            "role": "tool",
+            "tool_call_id": tool_id,
+            "name": tool_name,
+            "content": json.dumps(tool_result),
+        })
+
+        # Aqui acontece o "retry lógico": a LLM vê o erro/sucesso da tool
+        # e decide se explica o problema ou segue o fluxo.
+        # Não permitimos novas tool calls nesta etapa para evitar loop.
+        return self.prompts.get_post_tool_prompt(
+            base_system_prompt=system_prompt,
+            tool_name=tool_name,
+            attempts=attempts,
+            max_attempts=self.MAX_TOOL_LOGICAL_RETRIES,
+        )
+
     async def _supervise_response(self, state: SVIMState) -> SVIMState:
         """
         Passo supervisor que valida a última resposta antes de enviar ao cliente.
 
-        Se encontrar violações (promessas vazias, narração interna, segredos ou placeholders),
-        solicita uma nova versão ao LLM sem essas falhas.
+        Frases de espera, placeholders e segredos são corrigidos localmente
+        (`ResponseSupervisor`); só promessas vazias e narração interna pedem uma
+        nova versão ao LLM.
         """
         try:
             last_assistant_idx = next(
@@ -469,12 +797,21 @@ class SVIMAgent(BaseAgent):
             if not isinstance(assistant_content, str):
                 return state
 
-            supervision_flags = self._get_supervision_flags(assistant_content)
-            if not supervision_flags:
+            metrics.incr("supervisor.turns")
+            review = self.supervisor.review(assistant_content)
+            if not review.reasons:
+                return state
+
+            # Segredos mascarados / frases de espera removidas valem mesmo se o LLM reescrever
+            state["messages"][last_assistant_idx]["content"] = review.content
+            if not review.needs_llm:
+                metrics.incr("supervisor.local_rewrites")
+                logger.info(f"[SVIM] Response fixed locally: {', '.join(review.reasons)}")
                 return state
 
+            metrics.incr("supervisor.llm_rewrites")
             review_prompt = self.prompts.get_review_prompt(
-                supervision_flags,
+                review.reasons,
                 state.get('system_prompt', ''),
             )
 
@@ -495,102 +832,7 @@ class SVIMAgent(BaseAgent):
 
     def _get_supervision_flags(self, content: str) -> List[str]:
         """Identifica padrões de falha e retorna os motivos encontrados."""
-        text = content.lower()
-
-        # 1) Padrões literais mais óbvios
-        promise_patterns = [
-            "vou ver e te retorno",
-            "depois eu respondo",
-            "mais tarde te aviso",
-            "te retorno em breve",
-            "vou verificar e te aviso",
-            "já retorno",
-            "já te respondo",
-            "assim que possível te retorno",
-        ]
-
-        # 2) Padrões mais genéricos com regex
-        promise_regexes = [
-            # vou / vamos / iremos + verbo de checagem
-            re.compile(
-                r"\b(vou|vamos|iremos)\s+"
-                r"(verificar|checar|consultar|conferir|olhar|procurar|analisar|ver)\b",
-                re.IGNORECASE,
-            ),
-            # "vou fazer isso agora"
-            re.compile(
-                r"\b(vou|vamos|iremos)\s+fazer\s+isso\s+agora\b",
-                re.IGNORECASE,
-            ),
-            # opcional: "um momento, por favor"
-            re.compile(
-                r"\bum momento,?\s+por favor\b",
-                re.IGNORECASE,
-            ),
-        ]
-
-        internal_patterns = [
-            "como modelo de linguagem",
-            "processo interno",
-            "cadeia de pensamento",
-            "analisando tokens",
-            "chamando a ferramenta",
-            "uso da ferramenta",
-            "executando ferramenta",
-            "rodando comando",
-            "passo a passo interno",
-        ]
-
-        placeholder_tokens = [
-            "<preencher",
-            "<placeholder>",
-            "[preencher]",
-            "preencher depois",
-        ]
-
-        placeholder_regexes = [
-            re.compile(r"\bTODO\b:?", re.IGNORECASE),
-            re.compile(r"\bFIXME\b:?", re.IGNORECASE),
-            re.compile(r"\[TODO\]", re.IGNORECASE),
-        ]
-
-        secret_patterns = [
-            re.compile(r"sk-[a-z0-9]{8,}", re.IGNORECASE),
-            re.compile(r"bearer\s+[a-z0-9._-]{10,}", re.IGNORECASE),
-            re.compile(r"api[_-]?key", re.IGNORECASE),
-            re.compile(r"senha", re.IGNORECASE),
-            re.compile(r"token", re.IGNORECASE),
-            re.compile(
-                r"eyj[a-z0-9_\-]{10,}\.[a-z0-9_\-]{10,}\.[a-z0-9_\-]{10,}",
-                re.IGNORECASE,
-            ),  # JWT
-            re.compile(r"-----BEGIN [A-Z ]+-----", re.IGNORECASE),
-        ]
-
-        reasons: List[str] = []
-
-        # Promessas / ações futuras vagas
-        if (
-            any(pat in text for pat in promise_patterns)
-            or any(regex.search(content) for regex in promise_regexes)
-        ):
-            reasons.append("promessa de retorno ou ação futura vaga que pode não ser cumprida")
-
-        # Narração interna
-        if any(pat in text for pat in internal_patterns):
-            reasons.append("narração de passos internos")
-
-        # Placeholders
-        if any(pat in text for pat in placeholder_tokens) or any(
-            pattern.search(content) for pattern in placeholder_regexes
-        ):
-            reasons.append("placeholder ou campo não preenchido")
-
-        # Segredos / credenciais
-        if any(pattern.search(content) for pattern in secret_patterns):
-            reasons.append("possível exposição de segredo ou credencial")
-
-        return reasons
+        return self.supervisor.flags(content)
 
     async def _prepare_appointment_context(self, state: SVIMState) -> SVIMState:
         """Resolve IDs de profissional/serviço sem depender do LLM."""
@@ -611,10 +853,25 @@ class SVIMAgent(BaseAgent):
                 profs = await self.tools[0]["py_fn"]()
                 professionals_list = profs.get("data") or profs.get("profissionais") or profs.get("items") or []
                 resolved_prof = resolve_professional(last_user_message, professionals_list)
+                if not resolved_prof:
+                    # Tolerância a erros de digitação ("Beatriz" -> "Beatrice")
+                    candidates = rank_professionals(last_user_message, professionals_list, limit=3)
+                    resolved_prof = pick_candidate(candidates, self.fuzzy_min_score)
+                    if not resolved_prof and candidates:
+                        # Ambíguo: deixa as opções no draft para a Maria perguntar
+                        appointment_draft["professionalCandidates"] = [
+                            {
+                                "id": c.item.get("id"),
+                                "nome": c.item.get("nome") or c.item.get("name"),
+                                "score": c.score,
+                            }
+                            for c in candidates
+                        ]
                 if resolved_prof:
                     appointment_draft["professionalId"] = resolved_prof.get("id")
                     appointment_draft["professionalName"] = resolved_prof.get("nome") or resolved_prof.get("name")
                     appointment_draft["professional"] = resolved_prof
+                    appointment_draft.pop("professionalCandidates", None)
             except Exception as exc:
                 logger.error("Erro ao resolver profissional", exc_info=exc)
 
@@ -625,7 +882,24 @@ class SVIMAgent(BaseAgent):
                     profissionalId=appointment_draft["professionalId"]
                 )
                 services_list = services_result.get("data") or services_result.get("servicos") or services_result.get("items") or []
-                resolved_service = resolve_service(
+                # Serviço citado pelo nome (mesmo com erro de digitação) tem prioridade
+                resolved_service = pick_candidate(
+                    rank_services(
+                        last_user_message,
+                        appointment_draft.get("professionalId"),
+                        services_list,
+                        limit=3,
+                    ),
+                    self.fuzzy_min_score,
+                )
+                # Sem o nome: busca semântica no catálogo ("luzes" -> "Mechas")
+                if not resolved_service and self.catalog_search_enabled:
+                    resolved_service = await self._search_catalog_service(
+                        last_user_message,
+                        appointment_draft["professionalId"],
+                        services_list,
+                    )
+                resolved_service = resolved_service or resolve_service(
                     last_user_message,
                     appointment_draft.get("professionalId"),
                     services_list,
@@ -642,29 +916,280 @@ class SVIMAgent(BaseAgent):
         state["appointment_context"]["appointment_draft"] = appointment_draft
         return state
 
+    async def _search_catalog_service(
+        self,
+        query: str,
+        professional_id: Any,
+        services_list: List[Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Serviço pela busca semântica no catálogo ("quero fazer luzes" -> "Mechas").
+
+        Só roda quando nome/fuzzy não resolvem (antes da escolha padrão de
+        `resolve_service`). O catálogo do profissional é (re)indexado antes,
+        respeitando o TTL do `CatalogSync`; o item devolvido é o da lista atual
+        da tool, não o guardado no payload.
+        """
+        if not services_list or not query.strip():
+            return None
+        await self.catalog_sync.sync_services_catalog(professional_id, services_list)
+        candidates = await self.catalog_sync.search_services(
+            query,
+            professional_id=professional_id,
+            k=self.catalog_search_k,
+            score_threshold=self.catalog_search_min_score,
+        )
+        by_id = {svc.get("id"): svc for svc in services_list}
+        candidates = [c._replace(item=by_id[c.item.get("id")]) for c in candidates if c.item.get("id") in by_id]
+        resolved = pick_candidate(candidates, self.catalog_search_min_score)
+        metrics.incr("catalog_search.resolved" if resolved else "catalog_search.unresolved")
+        return resolved
+
     async def _save_memory(self, state: SVIMState) -> SVIMState:
         """
         Salva parte da conversa em memória vetorial.
+
+        Com write-behind, só enfileira: embedding e upsert rodam depois da resposta.
+        O estado da sessão (session store) é gravado antes, para o próximo turno.
         """
         try:
-            await self.vector_store.add_conversation(
-                user_id=state["user_id"],
-                session_id=state["session_id"],
-                messages=state["messages"][-2:],
-                metadata={
+            await self._save_session_state(state)
+        except Exception as e:
+            logger.error(f"[SVIM] Error saving session state: {e}")
+
+        try:
+            payload = {
+                "user_id": state["user_id"],
+                "session_id": state["session_id"],
+                "messages": state["messages"][-2:],
+                "metadata": {
                     "intent": state["intent"].value,
                     "finish_session": state["finish_session"],
                     "appointment_context": state.get("appointment_context", {}),
+                    "timestamp": datetime.now().isoformat(),
                 },
-            )
-            logger.info(f"[SVIM] Conversation saved to memory for user {state['user_id']}")
+                # id definido aqui: reexecutar o trabalho não duplica o ponto
+                "point_id": str(uuid.uuid4()),
+            }
+            if self.write_behind is not None:
+                self._pending_memory[state["user_id"]] = payload
+                await self.write_behind.submit("memory", payload)
+            else:
+                await self._write_memory(payload)
         except Exception as e:
             logger.error(f"[SVIM] Error saving conversation to memory: {e}")
 
         return state
 
+    async def _write_memory(self, payload: Dict[str, Any]) -> None:
+        await self.vector_store.add_conversation(
+            user_id=payload["user_id"],
+            session_id=payload["session_id"],
+            messages=payload["messages"],
+            metadata=payload["metadata"],
+            point_id=payload["point_id"],
+        )
+        pending = self._pending_memory.get(payload["user_id"])
+        if pending is not None and pending["point_id"] == payload["point_id"]:
+            self._pending_memory.pop(payload["user_id"], None)
+        logger.info(f"[SVIM] Conversation saved to memory for user {payload['user_id']}")
+
+    async def _save_session_state(self, state: SVIMState) -> None:
+        turn_messages = state["messages"][-2:]
+        appointment_context = {
+            key: value
+            for key, value in (state.get("appointment_context") or {}).items()
+            if key not in ("history", "memories", "summary")
+        }
+
+        def apply(previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            previous = previous or {}
+            # Em conflito, `previous` já traz o turno concorrente: as mensagens se somam
+            messages = (previous.get("messages") or []) + turn_messages
+            # message_count conta todas as mensagens já gravadas; summarized_count, as já resumidas
+            message_count = previous.get("message_count", len(messages) - len(turn_messages)) + len(turn_messages)
+            return {
+                "session_id": state["session_id"],
+                "messages": messages[-self.session_max_messages:],
+                "message_count": message_count,
+                "summary": previous.get("summary", ""),
+                "summarized_count": previous.get("summarized_count", 0),
+                "intent": state["intent"].value,
+                "finish_session": state["finish_session"],
+                "appointment_context": appointment_context,
+                "timestamp": datetime.now().isoformat(),
+            }
+
+        saved = await update_session(self.session_store, state["user_id"], state.get("session_state"), apply)
+        if saved is None:
+            return
+        state["session_state"] = saved
+
+        unsummarized = saved.data["message_count"] - saved.data["summarized_count"]
+        if self.summary_enabled and unsummarized and (
+            state["finish_session"] or unsummarized >= self.summary_every_messages
+        ):
+            payload = {"user_id": state["user_id"]}
+            if self.write_behind is not None:
+                await self.write_behind.submit("summary", payload)
+            else:
+                await self._update_summary(payload)
+
+    async def _update_summary(self, payload: Dict[str, Any]) -> None:
+        """
+        Atualiza o resumo incremental do cliente com as mensagens ainda não resumidas
+        e compacta o estado (as mensagens resumidas saem, ficando as mais recentes).
+        """
+        user_id = payload["user_id"]
+        stored = await self.session_store.get(user_id)
+        if stored is None:
+            return
+        messages = stored.data.get("messages") or []
+        message_count = stored.data.get("message_count", len(messages))
+        summarized_count = stored.data.get("summarized_count", 0)
+        # Índice (em `messages`) da primeira mensagem ainda fora do resumo
+        first_pending = max(0, summarized_count - (message_count - len(messages)))
+        pending = messages[first_pending:]
+        if not pending:
+            return
+
+        summary = await self.llm_client.chat_completion(
+            messages=[{"role": "user", "content": self._format_messages(pending)}],
+            system_prompt=self.prompts.get_summary_prompt(stored.data.get("summary", "")),
+            temperature=0.2,
+            max_tokens=300,
+        )
+        if not isinstance(summary, str) or not summary.strip():
+            raise ValueError("Resumo vazio")
+        summary = truncate_to_tokens(summary.strip(), self.summary_token_budget)
+
+        def apply(previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            data = dict(previous or {})
+            if data.get("summarized_count", 0) >= message_count:
+                # Outro resumo mais novo já foi gravado
+                return data
+            kept = data.get("messages") or []
+            first_index = data.get("message_count", len(kept)) - len(kept)
+            # Descarta o que foi resumido, mas nunca as últimas `max_context_messages`
+            drop = min(max(0, message_count - first_index), max(0, len(kept) - self.max_context_messages))
+            data.update(
+                summary=summary,
+                summarized_count=message_count,
+                messages=kept[drop:],
+            )
+            return data
+
+        await update_session(self.session_store, user_id, stored, apply)
+        metrics.incr("summary.updates")
+        logger.info(f"[SVIM] Summary updated for user {user_id} ({len(pending)} new messages)")
+
     # ==================== Helpers ====================
 
+    def _initial_state(
+        self,
+        user_id: str,
+        message: str,
+        session_id: Optional[str],
+        customer_profile: Optional[Dict[str, Any]],
+        appointment_context: Optional[Dict[str, Any]],
+        policies_context: Optional[Dict[str, Any]],
+    ) -> SVIMState:
+        return {
+            "messages": [
+                {
+                    "role": "user",
+                    "content": message,
+                    "timestamp": datetime.now().isoformat(),
+                }
+            ],
+            "user_id": user_id,
+            "session_id": session_id or f"svim_session_{user_id}_{int(datetime.now().timestamp())}",
+            "intent": SVIMIntent.UNKNOWN,
+            "customer_profile": customer_profile or {},
+            "appointment_context": appointment_context or {},
+            "policies_context": policies_context or {},
+            "needs_handoff": False,
+            "finish_session": False,
+            "system_prompt": "",
+            "tool_attempts": {},
+            "session_state": None,
+        }
+
+    def _observe_turn(self, usage: Dict[str, float], started: float) -> None:
+        metrics.observe("turn.latency_ms", (time.perf_counter() - started) * 1000)
+        metrics.observe("turn.llm_calls", usage["llm_calls"])
+        metrics.observe("turn.tokens", usage["prompt_tokens"] + usage["completion_tokens"])
+        metrics.observe("turn.prompt_tokens", usage["prompt_tokens"])
+
+    def _build_result(self, result: SVIMState, usage: Dict[str, float]) -> Dict[str, Any]:
+        assistant_message = next(
+            (msg for msg in reversed(result["messages"]) if msg.get("role") == "assistant"),
+            None,
+        )
+
+        return {
+            "success": True,
+            "response": assistant_message["content"] if assistant_message else "",
+            "metadata": {
+                "session_id": result["session_id"],
+                "intent": result["intent"].value,
+                "needs_handoff": result["needs_handoff"],
+                "finish_session": result["finish_session"],
+                "appointment_context": result.get("appointment_context", {}),
+                "llm_usage": dict(usage),
+            },
+        }
+
+    def _last_user_message(self, state: SVIMState) -> str:
+        return next(
+            (msg.get("content", "") for msg in reversed(state["messages"]) if msg.get("role") == "user"),
+            "",
+        )
+
+    def _base_context(self, state: SVIMState) -> str:
+        history = state["appointment_context"].get("history", "")
+        memories = state["appointment_context"].get("memories", "")
+        customer_name = state["customer_profile"].get("name") or "cliente"
+        related = f"Conversas anteriores relacionadas:\n{memories}\n\n" if memories else ""
+        return f"Histórico recente:\n{history}\n\n{related}Cliente: {customer_name}"
+
+    def _parse_intent(self, value: str) -> SVIMIntent:
+        try:
+            return SVIMIntent(value)
+        except ValueError:
+            return SVIMIntent.UNKNOWN
+
+    def _classify_with_rules(self, state: SVIMState) -> bool:
+        """Aplica o pré-classificador local; True se ele decidiu a intenção."""
+        if self.intent_rules is None:
+            return False
+        prediction = self.intent_rules.classify(self._last_user_message(state))
+        if not self.intent_rules.is_confident(prediction):
+            return False
+        state["intent"] = SVIMIntent(prediction.intent)
+        metrics.incr("intent.rule_short_circuit")
+        logger.info(
+            f"[SVIM] Intent for user {state['user_id']} resolved locally: "
+            f"{prediction.intent} ({prediction.rule}, {prediction.confidence:.2f})"
+        )
+        return True
+
+    def _update_finish_session(self, state: SVIMState) -> None:
+        """Atualiza finish_session com base na última mensagem do usuário."""
+        last_user_msg = self._last_user_message(state).lower()
+
+        farewell_tokens = [
+            "tchau",
+            "obrigado",
+            "obrigada",
+            "valeu",
+            "até mais",
+            "até logo",
+            "bom descanso",
+        ]
+
+        state["finish_session"] = any(tok in last_user_msg for tok in farewell_tokens)
+
     def _format_messages(self, messages: List[Dict[str, Any]]) -> str:
         """
         Formata lista de mensagens em texto simples para contexto.
@@ -714,58 +1239,160 @@ class SVIMAgent(BaseAgent):
                     "response": "Estou passando por uma instabilidade no momento. Pode tentar novamente em instantes?",
                 }
 
-            state: SVIMState = {
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": message,
-                        "timestamp": datetime.now().isoformat(),
-                    }
-                ],
-                "user_id": user_id,
-                "session_id": session_id or f"svim_session_{user_id}_{int(datetime.now().timestamp())}",
-                "intent": SVIMIntent.UNKNOWN,
-                "customer_profile": customer_profile or {},
-                "appointment_context": appointment_context or {},
-                "policies_context": policies_context or {},
-                "needs_handoff": False,
-                "finish_session": False,
-                "system_prompt": "",
-                "tool_attempts": {},
-            }
-
+            state = self._initial_state(
+                user_id, message, session_id, customer_profile, appointment_context, policies_context
+            )
             config = {"configurable": {"thread_id": state["session_id"]}}
 
             # Chama o workflow do LangGraph
+            usage = start_turn()
+            started = time.perf_counter()
             workflow_result = await self.workflow.ainvoke(state, config=config)
+            self._observe_turn(usage, started)
 
             result = workflow_result.get("state", workflow_result)
+            return self._build_result(result, usage)
 
-            assistant_message = next(
-                (msg for msg in reversed(result["messages"]) if msg.get("role") == "assistant"),
-                None,
-            )
-
+        except Exception as e:
+            logger.error(f"[SVIM] Error processing message: {e}")
             return {
-                "success": True,
-                "response": assistant_message["content"] if assistant_message else "",
-                "metadata": {
-                    "session_id": result["session_id"],
-                    "intent": result["intent"].value,
-                    "needs_handoff": result["needs_handoff"],
-                    "finish_session": result["finish_session"],
-                    "appointment_context": result.get("appointment_context", {}),
-                },
+                "success": False,
+                "error": str(e),
+                "response": "Tive um erro aqui do meu lado, mas quero te ajudar. Pode tentar novamente por favor?",
             }
 
+    async def process_message_stream(
+        self,
+        user_id: str,
+        message: str,
+        session_id: Optional[str] = None,
+        customer_profile: Optional[Dict[str, Any]] = None,
+        appointment_context: Optional[Dict[str, Any]] = None,
+        policies_context: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Variante em streaming de `process_message`.
+
+        Gera eventos `{"type": "delta", "text": ...}` com a resposta final já
+        supervisionada frase a frase, e termina com `{"type": "final", ...}` no
+        mesmo formato do retorno de `process_message`.
+
+        Contexto, intenção e tools rodam como no workflow; só a chamada que produz
+        o texto ao cliente é transmitida. O modo single-pass não se aplica aqui
+        (a saída JSON dele não é transmissível).
+        """
+        usage = start_turn()
+        started = time.perf_counter()
+        first_delta_at: Optional[float] = None
+
+        try:
+            state = self._initial_state(
+                user_id, message, session_id, customer_profile, appointment_context, policies_context
+            )
+            state = await self._load_context(state)
+            state = await self._detect_intent_rules(state)
+            if state["intent"] == SVIMIntent.UNKNOWN:
+                state = await self._detect_intent_llm(state)
+
+            system_prompt = await self._select_system_prompt(state)
+            stream_supervisor = StreamingSupervisor(self.supervisor)
+            raw_parts: List[str] = []
+            tool_calls: List[Dict[str, Any]] = []
+
+            async def relay(chunks: AsyncIterator[Any]) -> AsyncIterator[str]:
+                async for chunk in chunks:
+                    if isinstance(chunk, dict):
+                        tool_calls.append(chunk["tool"])
+                        continue
+                    raw_parts.append(chunk)
+                    for text in stream_supervisor.feed(chunk):
+                        yield text
+
+            streams = [
+                self.llm_client.stream_chat_completion(
+                    messages=state["messages"][-6:],
+                    system_prompt=system_prompt,
+                    tools=self.tools,
+                    temperature=0.3,
+                    max_tokens=500,
+                )
+            ]
+            while streams:
+                async for text in relay(streams.pop()):
+                    if first_delta_at is None:
+                        first_delta_at = time.perf_counter()
+                    yield {"type": "delta", "text": text}
+                if tool_calls:
+                    # Tool chamada: executa e transmite a segunda chamada (sem tools)
+                    final_system_prompt = await self._run_tool_call(state, tool_calls.pop(), system_prompt)
+                    streams.append(
+                        self.llm_client.stream_chat_completion(
+                            messages=state["messages"],
+                            system_prompt=final_system_prompt,
+                            temperature=0.3,
+                        )
+                    )
+            for text in stream_supervisor.flush():
+                if first_delta_at is None:
+                    first_delta_at = time.perf_counter()
+                yield {"type": "delta", "text": text}
+
+            metrics.incr("supervisor.turns")
+            content = stream_supervisor.text
+            raw_content = "".join(raw_parts).strip()
+            if not content and raw_content:
+                # Tudo foi descartado: só resta a revisão completa pelo LLM
+                state["messages"].append({"role": "assistant", "content": raw_content})
+                state = await self._supervise_response(state)
+                content = state["messages"].pop()["content"]
+                if first_delta_at is None:
+                    first_delta_at = time.perf_counter()
+                yield {"type": "delta", "text": content}
+            elif stream_supervisor.reasons:
+                metrics.incr("supervisor.local_rewrites")
+
+            state["messages"].append({
+                "role": "assistant",
+                "content": content,
+                "timestamp": datetime.now().isoformat(),
+            })
+            self._update_finish_session(state)
+            await self._save_memory(state)
+
+            if first_delta_at is not None:
+                metrics.observe("turn.ttfb_ms", (first_delta_at - started) * 1000)
+            self._observe_turn(usage, started)
+            yield {"type": "final", **self._build_result(state, usage)}
+
         except Exception as e:
-            logger.error(f"[SVIM] Error processing message: {e}")
-            return {
+            logger.error(f"[SVIM] Error streaming message: {e}")
+            yield {
+                "type": "final",
                 "success": False,
                 "error": str(e),
                 "response": "Tive um erro aqui do meu lado, mas quero te ajudar. Pode tentar novamente por favor?",
             }
 
+    async def process_stream(
+        self,
+        input_data: Dict[str, Any],
+        user_id: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Equivalente em streaming de `process` (mesmo `input_data`, eventos de `process_message_stream`)."""
+        async for event in self.process_message_stream(
+            user_id=user_id or "unknown_user",
+            message=input_data.get("message", ""),
+            session_id=input_data.get("session_id"),
+            customer_profile=input_data.get("customer_profile", {}),
+            appointment_context=input_data.get("appointment_context", {}),
+            policies_context=input_data.get("policies_context", {}),
+        ):
+            yield event
+            if event["type"] == "final":
+                # Depois de entregar a resposta: registro da interação
+                result = {key: value for key, value in event.items() if key != "type"}
+                await self._record_interaction(input_data, user_id, result)
+
     async def process(self, input_data: Dict[str, Any], user_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Método compatível com EnhancedAgentBase (mesmo estilo do ConversationAgent).
@@ -785,13 +1412,6 @@ class SVIMAgent(BaseAgent):
         appointment_context = input_data.get("appointment_context", {})
         policies_context = input_data.get("policies_context", {})
 
-        # Opcional: buscar conversas semelhantes via memória
-        await self.search_memory(
-            query=f"svim conversation about: {message[:100]}",
-            limit=3,
-            user_id=user_id,
-        )
-
         result = await self.process_message(
             user_id=user_id or "unknown_user",
             message=message,
@@ -801,6 +1421,15 @@ class SVIMAgent(BaseAgent):
             policies_context=policies_context,
         )
 
+        await self._record_interaction(input_data, user_id, result)
+        return result
+
+    async def _record_interaction(
+        self,
+        input_data: Dict[str, Any],
+        user_id: Optional[str],
+        result: Dict[str, Any],
+    ) -> None:
         # Armazenar interação na KG/memória do EnhancedAgentBase (se/quando você quiser usar)
         await self.store_interaction(
             user_id=user_id or "unknown_user",
@@ -810,20 +1439,93 @@ class SVIMAgent(BaseAgent):
         )
 
         # Log estruturado em Postgres (opcional)
+        if self.db_session is None and self.session_factory is None:
+            return
+        payload = {"user_id": user_id, "input_data": input_data, "result": result}
+        try:
+            if self.interaction_logger is not None:
+                # O logger em lote já grava em background
+                await self.interaction_logger.log(**self._interaction_fields(user_id, input_data, result))
+            elif self.write_behind is not None:
+                await self.write_behind.submit("interaction_log", payload)
+            else:
+                await self._write_interaction_log(payload)
+        except Exception as e:
+            logger.error(f"[SVIM] Failed to log interaction in Postgres: {e}")
+
+    async def _write_interaction_log(self, payload: Dict[str, Any]) -> None:
+        user_id, input_data, result = payload["user_id"], payload["input_data"], payload["result"]
         if self.db_session is not None:
             try:
-                log_svim_interaction(
-                    self.db_session,
-                    user_id=user_id,
-                    session_id=result["metadata"]["session_id"] if result.get("metadata") else None,
-                    intent=result["metadata"]["intent"] if result.get("metadata") else None,
-                    request=input_data,
-                    response=result,
-                )
-            except Exception as e:
-                logger.error(f"[SVIM] Failed to log interaction in Postgres: {e}")
+                self._log_interaction(self.db_session, user_id, input_data, result)
+            except Exception:
+                # Deixa a sessão utilizável para o retry
+                self.db_session.rollback()
+                raise
+        elif self.session_factory is not None:
+            await asyncio.to_thread(self._log_interaction_with_factory, user_id, input_data, result)
+
+    async def _spill_interaction_rows(self, rows: List[Dict[str, Any]]) -> None:
+        await self.write_behind.submit("interaction_log_rows", {"rows": rows})
+
+    async def _write_interaction_rows(self, payload: Dict[str, Any]) -> None:
+        await self.interaction_logger.write(payload["rows"])
+
+    async def start_background(self) -> None:
+        """Sobe os trabalhos de background do modo residente (write-behind e pré-carga do catálogo)."""
+        # Reexecuta já na subida o que ficou pendente no journal do write-behind
+        if self.write_behind is not None:
+            await self.write_behind.start()
+        if self.catalog_prefetcher is not None:
+            self.catalog_prefetcher.start()
+
+    async def aclose(self) -> None:
+        """Descarrega a fila write-behind e o log em lote; chamar antes de encerrar o processo."""
+        if self.catalog_prefetcher is not None:
+            await self.catalog_prefetcher.aclose()
+        # Antes do write-behind: um lote que falhar ainda cai no journal
+        if self.interaction_logger is not None:
+            await self.interaction_logger.aclose()
+        if self.write_behind is not None:
+            await self.write_behind.aclose()
+        await self.session_store.aclose()
+        if self.vector_client is not self.qdrant_client:
+            self.vector_client.close()
+
+    def _log_interaction(
+        self,
+        session: Session,
+        user_id: Optional[str],
+        input_data: Dict[str, Any],
+        result: Dict[str, Any],
+    ) -> None:
+        log_svim_interaction(session, **self._interaction_fields(user_id, input_data, result))
+
+    def _interaction_fields(
+        self,
+        user_id: Optional[str],
+        input_data: Dict[str, Any],
+        result: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        return {
+            "user_id": user_id,
+            "session_id": result["metadata"]["session_id"] if result.get("metadata") else None,
+            "intent": result["metadata"]["intent"] if result.get("metadata") else None,
+            "request": input_data,
+            "response": result,
+        }
 
-        return result
+    def _log_interaction_with_factory(
+        self,
+        user_id: Optional[str],
+        input_data: Dict[str, Any],
+        result: Dict[str, Any],
+    ) -> None:
+        session = self.session_factory()
+        try:
+            self._log_interaction(session, user_id, input_data, result)
+        finally:
+            session.close()
 
 
 # ==================== Factory Function ====================
@@ -831,6 +1533,7 @@ class SVIMAgent(BaseAgent):
 def create_svim_agent(
     config: Optional[Dict[str, Any]] = None,
     db_session: Optional[Session] = None,
+    session_factory: Optional[sessionmaker] = None,
 ) -> SVIMAgent:
     """
     Factory para criar a instância do agente SVIM.
@@ -840,9 +1543,56 @@ def create_svim_agent(
         "fallback_threshold": 3,
         "circuit_breaker_timeout": 60,
         "cache_ttl": 300,
+        "cache_stale_ttl": 3600,
+        "cache_max_entries": 256,
+        "intent_rules_enabled": True,
+        "intent_rule_threshold": 0.85,
+        "single_pass": os.getenv("SVIM_SINGLE_PASS", "").lower() in ("1", "true", "yes"),
+        "write_behind": True,
+        "write_behind_max_size": 1000,
+        "write_behind_workers": 2,
+        "write_behind_max_retries": 3,
+        "write_behind_journal": os.getenv("SVIM_WRITE_BEHIND_JOURNAL") or None,
+        "interaction_log_batching": True,
+        "interaction_log_batch_size": 200,
+        "interaction_log_flush_ms": 250,
+        "interaction_log_max_retries": 3,
+        # Vazio/"memory": em memória; URL SQLAlchemy (sqlite:///..., postgresql://...) para persistir
+        "session_store_url": os.getenv("SVIM_SESSION_STORE_URL") or None,
+        "memory_search_k": 3,
+        "memory_score_threshold": 0.4,
+        "memory_search_min_chars": 15,
+        "history_token_budget": 600,
+        "memory_token_budget": 250,
+        "scheduling_context_token_budget": 800,
+        "summary_enabled": True,
+        "summary_every_messages": 20,
+        "summary_token_budget": 200,
+        "session_max_messages": 40,
+        # Sem a env: detecta uma vez se a coleção ainda tem pontos sem `ts` (ver `backfill_ts`)
+        "memory_legacy_fallback": (
+            os.getenv("SVIM_MEMORY_LEGACY_FALLBACK").lower() in ("1", "true", "yes")
+            if os.getenv("SVIM_MEMORY_LEGACY_FALLBACK")
+            else None
+        ),
+        "catalog_search_enabled": True,
+        "catalog_search_k": 3,
+        "catalog_search_min_score": 0.5,
+        "catalog_sync_ttl": 6 * 3600,
+        "catalog_sync_batch_size": 64,
+        # "auto": índice local se a coleção tiver até local_index_max_points; "local" | "qdrant"
+        "catalog_vector_backend": os.getenv("SVIM_CATALOG_VECTOR_BACKEND", "auto"),
+        "memory_vector_backend": os.getenv("SVIM_MEMORY_VECTOR_BACKEND", "qdrant"),
+        "local_index_max_points": 20_000,
+        # Diretório do índice local (memmap); vazio: só em memória
+        "vector_index_dir": os.getenv("SVIM_VECTOR_INDEX_DIR") or None,
+        "catalog_prefetch_enabled": os.getenv("SVIM_CATALOG_PREFETCH", "1").lower() in ("1", "true", "yes"),
+        # Menor que cache_ttl: o catálogo é atualizado antes de a entrada vencer
+        "catalog_prefetch_interval": 240,
+        "catalog_prefetch_concurrency": 8,
     }
 
     if config:
         default_config.update(config)
 
-    return SVIMAgent(default_config, db_session=db_session)
+    return SVIMAgent(default_config, db_session=db_session, session_factory=session_factory)
@@ -0,0 +1,111 @@
+"""
+Métricas simples em memória do agente SVIM.
+
+Contadores e observações (latências, tamanhos) por processo, expostos pelo
+servidor residente em GET /metrics. Não substitui um Prometheus, mas basta para
+acompanhar hit rate de caches, chamadas de LLM evitadas, etc.
+"""
+
+import threading
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Optional
+
+# Quantas observações recentes guardar por métrica para percentis
+_RESERVOIR_SIZE = 1024
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._observations: Dict[str, Deque[float]] = {}
+        self._totals: Dict[str, Dict[str, float]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            reservoir = self._observations.get(name)
+            if reservoir is None:
+                reservoir = self._observations[name] = deque(maxlen=_RESERVOIR_SIZE)
+                self._totals[name] = {"count": 0, "sum": 0.0}
+            reservoir.append(value)
+            self._totals[name]["count"] += 1
+            self._totals[name]["sum"] += value
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def ratio(self, numerator: str, denominator: str) -> float:
+        with self._lock:
+            den = self._counters.get(denominator, 0)
+            return self._counters.get(numerator, 0) / den if den else 0.0
+
+    def summary(self, name: str) -> Dict[str, float]:
+        with self._lock:
+            values = sorted(self._observations.get(name) or [])
+            totals = dict(self._totals.get(name) or {"count": 0, "sum": 0.0})
+        if not values:
+            return {**totals, "avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        return {
+            **totals,
+            "avg": totals["sum"] / totals["count"],
+            "p50": _percentile(values, 0.50),
+            "p95": _percentile(values, 0.95),
+            "max": values[-1],
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            names = list(self._observations)
+        return {
+            "counters": counters,
+            "observations": {name: self.summary(name) for name in names},
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._observations.clear()
+            self._totals.clear()
+
+
+def _percentile(sorted_values, q: float) -> float:
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+metrics = Metrics()
+
+# Uso de LLM acumulado no turno (mensagem) corrente; ver `start_turn`
+_turn_usage: ContextVar[Optional[Dict[str, float]]] = ContextVar("svim_turn_usage", default=None)
+
+
+def start_turn() -> Dict[str, float]:
+    """Começa a contabilizar chamadas/tokens de LLM do turno no contexto atual."""
+    usage = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+    _turn_usage.set(usage)
+    return usage
+
+
+def record_llm_usage(prompt_tokens: int = 0, completion_tokens: int = 0, cached_tokens: int = 0) -> None:
+    """`cached_tokens`: parte de `prompt_tokens` servida pelo cache de prefixo do provedor."""
+    metrics.incr("llm.calls")
+    metrics.incr("llm.prompt_tokens", prompt_tokens)
+    metrics.incr("llm.completion_tokens", completion_tokens)
+    metrics.incr("llm.cached_tokens", cached_tokens)
+
+    usage = _turn_usage.get()
+    if usage is not None:
+        usage["llm_calls"] += 1
+        usage["prompt_tokens"] += prompt_tokens
+        usage["completion_tokens"] += completion_tokens
+        usage["cached_tokens"] += cached_tokens
+
+
+__all__ = ["Metrics", "metrics", "record_llm_usage", "start_turn"]
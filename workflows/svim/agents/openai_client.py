@@ -0,0 +1,152 @@
+"""
+Pool assíncrono compartilhado para chamadas à API da OpenAI.
+
+LLMClient e EmbeddingClient usam o mesmo `AsyncOpenAI` (e o mesmo pool de
+conexões httpx), com um limite de chamadas simultâneas e timeout por chamada.
+Assim um único worker mantém dezenas de conversas em andamento sem bloquear o
+event loop.
+
+Configuração (variáveis de ambiente):
+- OPENAI_API_KEY / OPENAI_BASE_URL   -> lidos pelo próprio AsyncOpenAI
+- OPENAI_MAX_CONCURRENCY             -> chamadas simultâneas por processo (default 32)
+- OPENAI_TIMEOUT                     -> timeout por chamada em segundos (default 30)
+- OPENAI_MAX_CONNECTIONS             -> tamanho do pool de conexões (default 64)
+"""
+
+import asyncio
+import os
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+import httpx
+from openai import AsyncOpenAI
+
+T = TypeVar("T")
+
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MAX_CONNECTIONS = 64
+
+
+class _LoopState:
+    """Cliente e semáforo ligados a um event loop específico."""
+
+    def __init__(self, client: AsyncOpenAI, semaphore: asyncio.Semaphore) -> None:
+        self.client = client
+        self.semaphore = semaphore
+
+
+class OpenAIPool:
+    """Cliente AsyncOpenAI compartilhado com limite de concorrência e timeout."""
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.api_key = api_key
+        self.base_url = base_url
+        # httpx.AsyncClient e asyncio.Semaphore ficam presos ao loop em que são usados
+        self._states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=self.timeout,
+            )
+            client = AsyncOpenAI(
+                api_key=self.api_key or os.getenv("OPENAI_API_KEY"),
+                base_url=self.base_url or os.getenv("OPENAI_BASE_URL") or None,
+                http_client=http_client,
+                timeout=self.timeout,
+            )
+            state = _LoopState(client, asyncio.Semaphore(self.max_concurrency))
+            self._states[loop] = state
+        return state
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        return self._state().client
+
+    async def call(
+        self,
+        fn: Callable[[AsyncOpenAI], Awaitable[T]],
+        timeout: Optional[float] = None,
+    ) -> T:
+        """
+        Executa `fn(client)` respeitando o limite de concorrência e o timeout.
+
+        O timeout cobre a chamada inteira (inclusive retries internos do SDK),
+        mas não o tempo de espera na fila do semáforo.
+        """
+        state = self._state()
+        async with state.semaphore:
+            return await asyncio.wait_for(fn(state.client), timeout or self.timeout)
+
+    async def stream(
+        self,
+        fn: Callable[[AsyncOpenAI], Awaitable[Any]],
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Any]:
+        """
+        Como `call`, para respostas em streaming (`stream=True`).
+
+        O slot do semáforo fica ocupado até o fim do stream; o timeout vale para
+        abrir o stream e para o intervalo entre dois chunks.
+        """
+        timeout = timeout or self.timeout
+        state = self._state()
+        async with state.semaphore:
+            response = await asyncio.wait_for(fn(state.client), timeout)
+            chunks = response.__aiter__()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        break
+                    yield chunk
+            finally:
+                await response.close()
+
+    async def aclose(self) -> None:
+        state = self._states.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state.client.close()
+
+
+_default_pool: Optional[OpenAIPool] = None
+
+
+def get_openai_pool() -> OpenAIPool:
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = OpenAIPool(
+            max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+            timeout=float(os.getenv("OPENAI_TIMEOUT", DEFAULT_TIMEOUT)),
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+        )
+    return _default_pool
+
+
+def reset_openai_pool() -> None:
+    """Descarta o pool padrão (útil em testes que trocam OPENAI_BASE_URL)."""
+    global _default_pool
+    _default_pool = None
+
+
+__all__ = ["OpenAIPool", "get_openai_pool", "reset_openai_pool"]
@@ -0,0 +1,173 @@
+"""
+Montagem compacta do contexto do prompt de agendamento.
+
+`get_scheduling_prompt` serializava o `SVIMState` inteiro com
+`json.dumps(indent=2)`: mensagens que já vão como `messages` na chamada,
+histórico, dicts completos de profissional/serviço dentro do
+`appointment_draft`, estado interno (tool_attempts, system_prompt...).
+
+Aqui entram só os campos que o modelo usa, em JSON compacto, por ordem de
+prioridade, dentro de um orçamento de tokens (`agents.tokens`):
+
+1. cliente, intenção e `appointment_draft` (sempre);
+2. dados extras do backend em `appointment_context` e políticas;
+3. resumo do cliente, como seção própria, e histórico recente (sem as mensagens
+   já enviadas na chamada), cortado pelo início: o corte come turnos antigos,
+   não o resumo;
+4. conversas anteriores relacionadas (memória semântica).
+
+A contagem de tokens usa o tiktoken quando instalado; sem ele, a estimativa de
+~4 caracteres por token de `agents.tokens` basta para respeitar o orçamento.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from agents.tokens import count_tokens, truncate_to_tokens
+
+# Campos do appointment_draft que o prompt de agendamento usa
+DRAFT_FIELDS = (
+    "serviceId",
+    "serviceName",
+    "professionalId",
+    "professionalName",
+    "date",
+    "time",
+    "dateTimeIso",
+    "durationMinutes",
+    "price",
+    "notes",
+    "isComplete",
+    "isBooked",
+    "professionalCandidates",
+)
+
+CUSTOMER_FIELDS = ("clienteId", "id", "name", "nome", "phone", "telefone", "email")
+
+# Chaves de appointment_context tratadas à parte (ou internas)
+_CONTEXT_RESERVED = {"appointment_draft", "history", "memories", "summary"}
+
+# Cabeçalho do resumo no início do histórico (ver SVIMAgent._build_history)
+SUMMARY_HEADER = "Resumo do cliente:"
+
+DEFAULT_TOKEN_BUDGET = 800
+
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _present(value: Any) -> bool:
+    return value not in (None, "", [], {})
+
+
+def _pick(source: Dict[str, Any], fields) -> Dict[str, Any]:
+    return {key: source[key] for key in fields if _present(source.get(key))}
+
+
+def _tail_lines(text: str, budget: int) -> str:
+    """Mantém as últimas linhas de `text` que cabem em `budget` tokens."""
+    kept: List[str] = []
+    used = 0
+    for line in reversed(text.splitlines()):
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(reversed(kept))
+
+
+def split_summary(history: str, summary: str) -> Tuple[str, str]:
+    """Separa o bloco do resumo (`SUMMARY_HEADER` + `summary`) do início do histórico."""
+    block = f"{SUMMARY_HEADER}\n{summary}"
+    if summary and history.startswith(block):
+        return block, history[len(block):].lstrip("\n")
+    return "", history
+
+
+def _dedupe_lines(text: str, seen: set) -> str:
+    """Remove linhas vazias e as já vistas (atualiza `seen`)."""
+    lines = []
+    for line in text.splitlines():
+        key = line.strip()
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def build_scheduling_context(state: Dict[str, Any], token_budget: Optional[int] = None) -> str:
+    """Contexto do prompt de agendamento a partir do estado, dentro de `token_budget` tokens."""
+    budget = token_budget or DEFAULT_TOKEN_BUDGET
+    appointment_context = state.get("appointment_context") or {}
+
+    # 1) Essencial: sempre entra
+    sections: List[str] = []
+    customer = _pick(state.get("customer_profile") or {}, CUSTOMER_FIELDS)
+    if customer:
+        sections.append(f"cliente: {compact_json(customer)}")
+    intent = state.get("intent")
+    if intent is not None:
+        sections.append(f"intencao: {getattr(intent, 'value', intent)}")
+    draft = _pick(appointment_context.get("appointment_draft") or {}, DRAFT_FIELDS)
+    sections.append(f"appointment_draft: {compact_json(draft)}")
+    remaining = budget - count_tokens("\n".join(sections))
+
+    # 2) Extras do backend e políticas
+    extras = {
+        key: value
+        for key, value in appointment_context.items()
+        if key not in _CONTEXT_RESERVED and _present(value)
+    }
+    if extras:
+        line = truncate_to_tokens(f"contexto: {compact_json(extras)}", max(0, remaining // 3))
+        if line:
+            sections.append(line)
+            remaining -= count_tokens(line)
+    policies = (state.get("policies_context") or {}).get("policies_text") or ""
+    if policies and remaining > 0:
+        line = truncate_to_tokens(f"politicas: {policies}", max(0, remaining // 3))
+        if line:
+            sections.append(line)
+            remaining -= count_tokens(line)
+
+    # 3) Histórico sem o que já vai nas mensagens da chamada; o mais recente fica
+    seen = {
+        f"{m.get('role', 'user')}: {m.get('content', '')}".strip()
+        for m in state.get("messages") or []
+        if isinstance(m.get("content"), str)
+    }
+    summary, history = split_summary(
+        appointment_context.get("history") or "", appointment_context.get("summary") or ""
+    )
+    history = _dedupe_lines(history, seen)
+    memories = _dedupe_lines(appointment_context.get("memories") or "", seen)
+    # Reserva até 1/4 do que sobrou para a memória semântica, se houver
+    memory_share = remaining // 4 if memories else 0
+    history_budget = remaining - memory_share
+    # O resumo condensa turnos que já saíram do histórico: entra antes dos recentes
+    if summary and history_budget > 0:
+        summary = truncate_to_tokens(summary, history_budget)
+        if summary:
+            sections.append(summary)
+            remaining -= count_tokens(summary)
+            history_budget -= count_tokens(summary)
+    if history and history_budget > 0:
+        history = _tail_lines(history, history_budget - count_tokens("historico:\n"))
+        if history:
+            block = f"historico:\n{history}"
+            sections.append(block)
+            remaining -= count_tokens(block)
+
+    # 4) Memória semântica com o que restar
+    if memories and remaining > 0:
+        block = truncate_to_tokens(f"conversas_relacionadas:\n{memories}", remaining)
+        if block:
+            sections.append(block)
+
+    return "\n".join(sections)
+
+
+__all__ = ["DRAFT_FIELDS", "SUMMARY_HEADER", "build_scheduling_context", "compact_json", "split_summary"]
@@ -0,0 +1,428 @@
+"""
+Índice pré-compilado do catálogo (profissionais e serviços) para os resolvers.
+
+Montado uma vez por snapshot do catálogo (a mesma lista devolvida pelo cache
+das tools), em vez de normalizar nomes com regex e varrer as listas a cada
+mensagem:
+
+- nomes/apelidos já normalizados e sem acento;
+- autômato Aho-Corasick com nomes completos, apelidos e palavras dos nomes
+  (índice invertido padrão -> itens), percorrido uma única vez por mensagem;
+- bitmaps (ints) de categorias excluídas, serviços de corte/cabelo e serviços
+  por profissional.
+
+Com isso a resolução custa ~O(tamanho da mensagem), independente do catálogo,
+e mantém exatamente a mesma ordem de preferência de `resolve_professional` /
+`resolve_service`.
+
+Para nomes com erro de digitação ("Beatriz" -> "Beatrice") há também um índice
+de trigramas das palavras do catálogo (`rank_professionals` / `rank_services`),
+que devolve candidatos ordenados por similaridade (coeficiente de Dice).
+"""
+
+import re
+import unicodedata
+from collections import Counter, OrderedDict, deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+EXCLUDED_CATEGORIES = {"depil", "manicure", "podologia", "unha"}
+CORTE_TOKENS = ["corte", "cortar", "cabelo", "haircut", "barba e cabelo"]
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Quantos snapshots de catálogo manter indexados (ver `reserve_snapshots`)
+_SNAPSHOT_CACHE_SIZE = 32
+_snapshot_capacity = _SNAPSHOT_CACHE_SIZE
+
+# Similaridade mínima para um candidato aparecer no ranking fuzzy
+FUZZY_MIN_SCORE = 0.5
+# Diferença mínima entre os dois melhores candidatos para não ser ambíguo
+FUZZY_AMBIGUITY_MARGIN = 0.05
+
+# Palavras comuns em pedidos de agendamento que nunca devem casar com nomes
+FUZZY_STOPWORDS = {
+    "com", "para", "pra", "por", "uma", "uns", "umas", "que", "quero", "queria",
+    "gostaria", "pode", "poderia", "ser", "marcar", "agendar", "remarcar", "cancelar",
+    "horario", "hora", "horas", "dia", "hoje", "amanha", "semana", "manha", "tarde",
+    "noite", "segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo",
+    "ela", "ele", "dela", "dele", "mesma", "mesmo", "outra", "outro", "qualquer",
+    "obrigada", "obrigado", "sim", "nao", "tudo", "bem", "confirmar", "meu", "minha",
+}
+
+
+def fold_text(text: Optional[str]) -> str:
+    """Minúsculas, sem acentos e com espaços colapsados."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _WHITESPACE_RE.sub(" ", stripped).strip().lower()
+
+
+class SubstringMatcher:
+    """Autômato Aho-Corasick: diz quais padrões aparecem no texto numa só passada."""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Set[str]] = [set()]
+
+        for pattern in patterns:
+            if pattern:
+                self._insert(pattern)
+        self._build()
+
+    def _insert(self, pattern: str) -> None:
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(set())
+            node = nxt
+        self._out[node].add(pattern)
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] |= self._out[self._fail[child]]
+
+    def find(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found |= out[node]
+        return found
+
+
+class Candidate(NamedTuple):
+    """Item do catálogo ranqueado pela busca fuzzy."""
+
+    item: Dict[str, Any]
+    score: float
+    matched: str
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f" {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _bits(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class TrigramIndex:
+    """Índice de trigramas das palavras do catálogo (busca tolerante a erros)."""
+
+    def __init__(self) -> None:
+        self._token_masks: Dict[str, int] = {}
+        self._token_grams: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def _indexable(token: str) -> bool:
+        return len(token) >= 3 and token not in FUZZY_STOPWORDS
+
+    def add(self, position: int, text: str) -> None:
+        for token in text.split():
+            if not self._indexable(token):
+                continue
+            self._token_masks[token] = self._token_masks.get(token, 0) | (1 << position)
+            if token not in self._token_grams:
+                grams = _trigrams(token)
+                self._token_grams[token] = grams
+                for gram in grams:
+                    self._postings.setdefault(gram, set()).add(token)
+
+    def scores(self, query: str) -> Dict[int, Tuple[float, str]]:
+        """Melhor similaridade (Dice) por item para as palavras da mensagem."""
+        best: Dict[int, Tuple[float, str]] = {}
+        for qtoken in set(query.split()):
+            if not self._indexable(qtoken):
+                continue
+            qgrams = _trigrams(qtoken)
+            shared: Counter = Counter()
+            for gram in qgrams:
+                for token in self._postings.get(gram, ()):
+                    shared[token] += 1
+            for token, count in shared.items():
+                score = 2 * count / (len(qgrams) + len(self._token_grams[token]))
+                for position in _bits(self._token_masks[token]):
+                    if score > best.get(position, (0.0, ""))[0]:
+                        best[position] = (score, token)
+        return best
+
+
+def is_ambiguous(candidates: List[Candidate], margin: float = FUZZY_AMBIGUITY_MARGIN) -> bool:
+    """Verdadeiro se os dois melhores candidatos estão praticamente empatados."""
+    return len(candidates) >= 2 and candidates[0].score - candidates[1].score < margin
+
+
+def _lowest(mask: int) -> int:
+    """Índice do menor bit ligado (= primeiro item na ordem original)."""
+    return (mask & -mask).bit_length() - 1
+
+
+def _add(masks: Dict[str, int], pattern: str, bit: int) -> None:
+    masks[pattern] = masks.get(pattern, 0) | bit
+
+
+class CatalogIndex:
+    """Índice de um snapshot do catálogo. Listas são tratadas como imutáveis."""
+
+    def __init__(
+        self,
+        professionals: Optional[List[Dict[str, Any]]] = None,
+        services: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        self.professionals = professionals or []
+        self.services = services or []
+        self._build_professionals()
+        self._build_services()
+
+    # ==================== Profissionais ====================
+
+    def _build_professionals(self) -> None:
+        self._prof_names: List[str] = []
+        direct: Dict[str, int] = {}
+        tokens: Dict[str, int] = {}
+        # Nome/apelido vazio "aparece" em qualquer mensagem (mesma regra de `in`)
+        always = 0
+
+        for i, prof in enumerate(self.professionals):
+            bit = 1 << i
+            name = fold_text(prof.get("nome") or prof.get("name"))
+            self._prof_names.append(name)
+
+            if name:
+                _add(direct, name, bit)
+            else:
+                always |= bit
+
+            apelido = prof.get("apelido")
+            if apelido:
+                folded = fold_text(apelido)
+                if folded:
+                    _add(direct, folded, bit)
+                else:
+                    always |= bit
+
+            for tok in name.split():
+                _add(tokens, tok, bit)
+
+        self._prof_direct_masks = direct
+        self._prof_token_masks = tokens
+        self._prof_always_mask = always
+        self._prof_matcher = SubstringMatcher(list(direct) + list(tokens))
+
+        self._prof_fuzzy = TrigramIndex()
+        for i, prof in enumerate(self.professionals):
+            self._prof_fuzzy.add(i, f"{self._prof_names[i]} {fold_text(prof.get('apelido'))}")
+
+    def resolve_professional(self, query: str) -> Optional[Dict[str, Any]]:
+        normalized_query = fold_text(query)
+        if not normalized_query or not self.professionals:
+            return None
+
+        found = self._prof_matcher.find(normalized_query)
+
+        # match direto (nome completo ou apelido)
+        mask = self._prof_always_mask
+        for pattern in found:
+            mask |= self._prof_direct_masks.get(pattern, 0)
+        if mask:
+            return self.professionals[_lowest(mask)]
+
+        # match parcial por palavras do nome
+        mask = 0
+        for pattern in found:
+            mask |= self._prof_token_masks.get(pattern, 0)
+        if mask:
+            return self.professionals[_lowest(mask)]
+
+        return None
+
+    def rank_professionals(
+        self,
+        query: str,
+        limit: int = 5,
+        min_score: float = FUZZY_MIN_SCORE,
+    ) -> List[Candidate]:
+        """Candidatos ordenados por similaridade com as palavras da mensagem."""
+        scored = self._prof_fuzzy.scores(fold_text(query))
+        ranked = sorted(
+            (pos for pos, (score, _) in scored.items() if score >= min_score),
+            key=lambda pos: (-scored[pos][0], pos),
+        )
+        return [
+            Candidate(self.professionals[pos], round(scored[pos][0], 3), scored[pos][1])
+            for pos in ranked[:limit]
+        ]
+
+    # ==================== Serviços ====================
+
+    def _build_services(self) -> None:
+        self._svc_all_mask = (1 << len(self.services)) - 1
+        self._svc_excluded_mask = 0
+        self._svc_corte_mask = 0
+        self._svc_cabelo_mask = 0
+        self._svc_by_professional: Dict[Any, int] = {}
+        self._svc_names: List[str] = []
+
+        for i, svc in enumerate(self.services):
+            bit = 1 << i
+            name = fold_text(svc.get("nome") or svc.get("name"))
+            categoria = fold_text(svc.get("categoria") or "")
+            self._svc_names.append(name)
+
+            if any(cat in categoria for cat in EXCLUDED_CATEGORIES):
+                self._svc_excluded_mask |= bit
+            if "corte" in name:
+                self._svc_corte_mask |= bit
+            if "cabelo" in name:
+                self._svc_cabelo_mask |= bit
+
+            prof_id = svc.get("profissionalId")
+            try:
+                self._svc_by_professional[prof_id] = self._svc_by_professional.get(prof_id, 0) | bit
+            except TypeError:  # id não-hasheável: nunca casa por igualdade simples
+                pass
+
+        self._svc_fuzzy = TrigramIndex()
+        for i, name in enumerate(self._svc_names):
+            if not (self._svc_excluded_mask >> i) & 1:
+                self._svc_fuzzy.add(i, name)
+
+    def resolve_service(self, query: str, professional_id: Optional[Any]) -> Optional[Dict[str, Any]]:
+        intent = intent_from_query(query)
+
+        valid = self._svc_all_mask & ~self._svc_excluded_mask
+        if intent == "CORTE":
+            valid &= self._svc_corte_mask | self._svc_cabelo_mask
+        if not valid:
+            return None
+
+        # Com intenção de corte, serviços com "corte" no nome vêm primeiro
+        tiers: Tuple[int, ...] = (
+            (valid & self._svc_corte_mask, valid) if intent == "CORTE" else (valid,)
+        )
+
+        # se profissionalId informado, prioriza serviços vinculados
+        if professional_id is not None:
+            try:
+                prof_mask = self._svc_by_professional.get(professional_id, 0)
+            except TypeError:
+                prof_mask = 0
+            for tier in tiers:
+                if tier & prof_mask:
+                    return self.services[_lowest(tier & prof_mask)]
+
+        for tier in tiers:
+            if tier:
+                return self.services[_lowest(tier)]
+        return None
+
+    def rank_services(
+        self,
+        query: str,
+        professional_id: Optional[Any] = None,
+        limit: int = 5,
+        min_score: float = FUZZY_MIN_SCORE,
+    ) -> List[Candidate]:
+        """
+        Serviços (fora das categorias excluídas) ordenados por similaridade.
+
+        Em caso de empate, serviços vinculados ao `professional_id` vêm primeiro.
+        """
+        scored = self._svc_fuzzy.scores(fold_text(query))
+        try:
+            prof_mask = self._svc_by_professional.get(professional_id, 0) if professional_id is not None else 0
+        except TypeError:
+            prof_mask = 0
+        ranked = sorted(
+            (pos for pos, (score, _) in scored.items() if score >= min_score),
+            key=lambda pos: (-scored[pos][0], not (prof_mask >> pos) & 1, pos),
+        )
+        return [
+            Candidate(self.services[pos], round(scored[pos][0], 3), scored[pos][1])
+            for pos in ranked[:limit]
+        ]
+
+    # ==================== Snapshots ====================
+
+    @classmethod
+    def for_snapshot(
+        cls,
+        professionals: Optional[List[Dict[str, Any]]] = None,
+        services: Optional[List[Dict[str, Any]]] = None,
+    ) -> "CatalogIndex":
+        """
+        Devolve o índice do snapshot, montando-o só na primeira vez.
+
+        O snapshot é identificado pela identidade (e tamanho) das listas, que o
+        cache do catálogo reaproveita enquanto a resposta da API não muda.
+        """
+        key = (
+            id(professionals), len(professionals or ()),
+            id(services), len(services or ()),
+        )
+        entry = _snapshots.get(key)
+        # Confere a identidade: um id() pode ser reaproveitado após o GC
+        if entry is not None and entry[0] is professionals and entry[1] is services:
+            _snapshots.move_to_end(key)
+            return entry[2]
+
+        index = cls(professionals, services)
+        _snapshots[key] = (professionals, services, index)
+        while len(_snapshots) > _snapshot_capacity:
+            _snapshots.popitem(last=False)
+        return index
+
+
+_snapshots: "OrderedDict[Tuple[int, int, int, int], Tuple[Any, Any, CatalogIndex]]" = OrderedDict()
+
+
+def reserve_snapshots(count: int) -> None:
+    """Garante espaço para `count` snapshots (ex.: a lista de serviços de cada profissional)."""
+    global _snapshot_capacity
+    _snapshot_capacity = max(_snapshot_capacity, count)
+
+_CORTE_RE = re.compile("|".join(re.escape(tok) for tok in CORTE_TOKENS))
+
+
+def intent_from_query(query: str) -> Optional[str]:
+    if _CORTE_RE.search(fold_text(query)):
+        return "CORTE"
+    return None
+
+
+__all__ = [
+    "Candidate",
+    "CatalogIndex",
+    "EXCLUDED_CATEGORIES",
+    "SubstringMatcher",
+    "TrigramIndex",
+    "fold_text",
+    "intent_from_query",
+    "is_ambiguous",
+]
@@ -1,20 +1,11 @@
-import re
 from typing import Any, Dict, List, Optional
 
-
-EXCLUDED_CATEGORIES = {"depil", "manicure", "podologia", "unha"}
-
-
-def _normalize(text: str) -> str:
-    return re.sub(r"\s+", " ", text or "").strip().lower()
-
-
-def _intent_from_query(query: str) -> Optional[str]:
-    q = _normalize(query)
-    corte_tokens = ["corte", "cortar", "cabelo", "haircut", "barba e cabelo"]
-    if any(tok in q for tok in corte_tokens):
-        return "CORTE"
-    return None
+from agents.resolvers.index import (
+    EXCLUDED_CATEGORIES,
+    Candidate,
+    CatalogIndex,
+    is_ambiguous,
+)
 
 
 def resolve_service(query: str, professional_id: Optional[int], services_list: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
@@ -23,56 +14,34 @@ def resolve_service(query: str, professional_id: Optional[int], services_list: L
     1) Detecta intenção básica (ex: CORTE)
     2) Filtra serviços por tokens/intent
     3) Exclui categorias incompatíveis
-    """
 
-    intent = _intent_from_query(query)
-    normalized_query = _normalize(query)
-
-    def is_valid(service: Dict[str, Any]) -> bool:
-        name = _normalize(service.get("nome") or service.get("name"))
-        categoria = _normalize(service.get("categoria") or "")
-        if any(cat in categoria for cat in EXCLUDED_CATEGORIES):
-            return False
-        if intent == "CORTE":
-            return "corte" in name or "cabelo" in name
-        return True
-
-    candidates = [s for s in services_list if is_valid(s)]
-
-    if not candidates:
-        return None
-
-    # ordena por similaridade simples ao termo "corte" quando aplicável
-    if intent == "CORTE":
-        candidates.sort(key=lambda s: 0 if "corte" in _normalize(s.get("nome") or s.get("name")) else 1)
+    Usa o `CatalogIndex` do snapshot (montado uma vez por lista de serviços).
+    """
+    return CatalogIndex.for_snapshot(services=services_list).resolve_service(query, professional_id)
 
-    # se profissionalId informado, prioriza serviços vinculados
-    if professional_id is not None:
-        for svc in candidates:
-            if svc.get("profissionalId") == professional_id:
-                return svc
 
-    return candidates[0]
+def resolve_professional(query: str, professionals_list: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Resolve o profissional citado na mensagem (nome completo/apelido, depois palavras do nome)."""
+    return CatalogIndex.for_snapshot(professionals=professionals_list).resolve_professional(query)
 
 
-def resolve_professional(query: str, professionals_list: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
-    normalized_query = _normalize(query)
-    if not normalized_query:
-        return None
+def rank_professionals(query: str, professionals_list: List[Dict[str, Any]], limit: int = 5) -> List[Candidate]:
+    """Busca fuzzy (tolerante a erros de digitação) de profissionais, com score."""
+    return CatalogIndex.for_snapshot(professionals=professionals_list).rank_professionals(query, limit=limit)
 
-    def normalize_name(prof: Dict[str, Any]) -> str:
-        return _normalize(prof.get("nome") or prof.get("name"))
 
-    # match direto
-    for prof in professionals_list:
-        if normalize_name(prof) in normalized_query or prof.get("apelido") and _normalize(prof.get("apelido")) in normalized_query:
-            return prof
+def rank_services(
+    query: str,
+    professional_id: Optional[int],
+    services_list: List[Dict[str, Any]],
+    limit: int = 5,
+) -> List[Candidate]:
+    """Busca fuzzy de serviços, com score; prioriza os do profissional em empates."""
+    return CatalogIndex.for_snapshot(services=services_list).rank_services(query, professional_id, limit=limit)
 
-    # match parcial por palavras
-    for prof in professionals_list:
-        name = normalize_name(prof)
-        tokens = name.split()
-        if any(tok and tok in normalized_query for tok in tokens):
-            return prof
 
+def pick_candidate(candidates: List[Candidate], min_score: float) -> Optional[Dict[str, Any]]:
+    """Melhor candidato, se for confiável (score suficiente e sem empate)."""
+    if candidates and candidates[0].score >= min_score and not is_ambiguous(candidates):
+        return candidates[0].item
     return None
@@ -1,46 +1,188 @@
 import asyncio
 import json
+import logging
+import os
+import socket
 import sys
-from typing import Any, Dict
+import urllib.error
+import urllib.request
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
 
-from agents.maria import create_svim_agent
-from agents.infra import create_session_factory
+logger = logging.getLogger(__name__)
 
 
-async def run_once(payload: Dict[str, Any]) -> Dict[str, Any]:
+def _is_connect_failure(exc: BaseException) -> bool:
     """
-    Executa o SVIMAgent uma única vez com o payload informado.
+    True só quando a requisição certamente não chegou ao servidor (conexão recusada, DNS).
+
+    Timeout de leitura ou conexão derrubada no meio não contam: o servidor pode já
+    ter processado a mensagem (ex.: criado o agendamento), e rodar localmente a
+    executaria de novo.
+    """
+    reason = exc.reason if isinstance(exc, urllib.error.URLError) else exc
+    return isinstance(reason, (ConnectionRefusedError, socket.gaierror))
+
+
+def _server_error(server_url: str, exc: BaseException) -> Dict[str, Any]:
+    logger.error(f"[SVIM] Server at {server_url} failed after accepting the request: {exc}")
+    return {"success": False, "error": f"SERVER_UNREACHABLE: {exc}"}
+
+
+def forward_to_server(payload: Dict[str, Any], server_url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Encaminha o payload para o servidor residente (agents.server), se houver.
+
+    Usa SVIM_SERVER_URL (ex.: http://127.0.0.1:8765). Retorna None quando a URL
+    não está configurada ou o servidor não está no ar (conexão recusada), para
+    que o chamador processe localmente. Timeout depois de conectar devolve erro,
+    sem reprocessar a mensagem.
+    """
+    server_url = server_url or os.getenv("SVIM_SERVER_URL")
+    if not server_url:
+        return None
+
+    request = urllib.request.Request(
+        f"{server_url.rstrip('/')}/process",
+        data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    timeout = float(os.getenv("SVIM_SERVER_TIMEOUT", 120))
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except urllib.error.HTTPError as exc:
+        # Servidor no ar mas recusou o payload: devolve o erro dele
+        try:
+            return json.loads(exc.read().decode("utf-8"))
+        except ValueError:
+            return {"success": False, "error": f"HTTP {exc.code}"}
+    except (urllib.error.URLError, OSError) as exc:
+        if not _is_connect_failure(exc):
+            return _server_error(server_url, exc)
+        logger.warning(f"[SVIM] Server unavailable at {server_url}, running locally: {exc}")
+        return None
+
+
+def forward_stream_to_server(
+    payload: Dict[str, Any],
+    server_url: Optional[str] = None,
+) -> Optional[Iterator[Dict[str, Any]]]:
+    """
+    Como `forward_to_server`, mas em modo streaming (/process?stream=1).
+
+    Retorna um iterador de eventos NDJSON, ou None se não houver servidor.
+    """
+    server_url = server_url or os.getenv("SVIM_SERVER_URL")
+    if not server_url:
+        return None
+
+    request = urllib.request.Request(
+        f"{server_url.rstrip('/')}/process?stream=1",
+        data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    timeout = float(os.getenv("SVIM_SERVER_TIMEOUT", 120))
+    try:
+        resp = urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as exc:
+        try:
+            error = json.loads(exc.read().decode("utf-8"))
+        except ValueError:
+            error = {"success": False, "error": f"HTTP {exc.code}"}
+        return iter([{"type": "final", **error}])
+    except (urllib.error.URLError, OSError) as exc:
+        if not _is_connect_failure(exc):
+            return iter([{"type": "final", **_server_error(server_url, exc)}])
+        logger.warning(f"[SVIM] Server unavailable at {server_url}, running locally: {exc}")
+        return None
+
+    def events() -> Iterator[Dict[str, Any]]:
+        with resp:
+            for line in resp:
+                if line.strip():
+                    yield json.loads(line.decode("utf-8"))
+
+    return events()
+
+
+async def run_locally(payload: Dict[str, Any]) -> Dict[str, Any]:
     """
-    message = payload["message"]
-    user_id = payload.get("user_id", "anonymous")
-    session_id = payload.get("session_id")
-    customer_profile = payload.get("customer_profile", {})
-    appointment_context = payload.get("appointment_context", {})
-    policies_context = payload.get("policies_context", {})
+    Executa o SVIMAgent uma única vez neste processo (cold start completo).
+    """
+    # Imports tardios: o caminho via servidor não precisa carregar LangGraph/OpenAI/Qdrant
+    from agents.maria import create_svim_agent
+    from agents.infra import create_session_factory
+    from agents.server import build_process_input
+
+    input_data, user_id = build_process_input(payload)
 
     # cria sessão de DB (usa DATABASE_URL do ambiente)
     SessionFactory = create_session_factory()
     db_session = SessionFactory()
 
+    agent = None
     try:
         agent = create_svim_agent(db_session=db_session)
+        return await agent.process(input_data, user_id=user_id)
+    finally:
+        # Processo de uma mensagem só: descarrega o write-behind antes de sair
+        if agent is not None:
+            await agent.aclose()
+        db_session.close()
 
-        result = await agent.process(
-            {
-                "message": message,
-                "session_id": session_id,
-                "customer_profile": customer_profile,
-                "appointment_context": appointment_context,
-                "policies_context": policies_context,
-            },
-            user_id=user_id,
-        )
 
-        return result
+async def run_locally_stream(payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """Versão em streaming de `run_locally`."""
+    from agents.maria import create_svim_agent
+    from agents.infra import create_session_factory
+    from agents.server import build_process_input
+
+    input_data, user_id = build_process_input(payload)
+
+    SessionFactory = create_session_factory()
+    db_session = SessionFactory()
+
+    agent = None
+    try:
+        agent = create_svim_agent(db_session=db_session)
+        async for event in agent.process_stream(input_data, user_id=user_id):
+            yield event
     finally:
+        if agent is not None:
+            await agent.aclose()
         db_session.close()
 
 
+async def run_once_stream(payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """Executa o agente em modo streaming (via servidor residente, se houver)."""
+    events = await asyncio.to_thread(forward_stream_to_server, payload)
+    if events is None:
+        async for event in run_locally_stream(payload):
+            yield event
+        return
+
+    while True:
+        event = await asyncio.to_thread(next, events, None)
+        if event is None:
+            break
+        yield event
+
+
+async def run_once(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Executa o SVIMAgent uma única vez com o payload informado.
+
+    Se houver um servidor residente configurado e disponível, apenas encaminha
+    o payload para ele; caso contrário, executa localmente.
+    """
+    result = await asyncio.to_thread(forward_to_server, payload)
+    if result is not None:
+        return result
+    return await run_locally(payload)
+
+
 async def main():
     # lê JSON da stdin (enviado pelo Kestra)
     raw = sys.stdin.read()
@@ -49,6 +191,12 @@ async def main():
 
     payload = json.loads(raw)
 
+    # Streaming: um evento JSON por linha, conforme a resposta é gerada
+    if payload.get("stream") or os.getenv("SVIM_STREAM", "").lower() in ("1", "true", "yes"):
+        async for event in run_once_stream(payload):
+            print(json.dumps(event, ensure_ascii=False, default=str), flush=True)
+        return
+
     result = await run_once(payload)
 
     # devolve resultado em JSON (stdout)
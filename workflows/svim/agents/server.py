@@ -0,0 +1,340 @@
+"""
+Servidor residente do agente SVIM.
+
+Em vez de subir um processo novo (clientes OpenAI/Qdrant, grafo LangGraph,
+engine SQLAlchemy) a cada mensagem do webhook, este módulo constrói o
+`SVIMAgent` uma única vez e atende várias chamadas a `process()` em paralelo.
+
+Protocolos suportados:
+- HTTP (padrão):  POST /process  -> JSON de resposta do agente
+                  POST /process?stream=1 (ou "stream": true no payload)
+                                 -> eventos NDJSON: {"type": "delta", "text"} ... {"type": "final", ...}
+                  GET  /health   -> {"status": "ok"}
+                  GET  /metrics  -> métricas em memória (caches, LLM, ...)
+- stdin/stdout (--stdio): uma requisição JSON por linha, uma resposta JSON por linha
+  (ou uma linha por evento, com "stream": true).
+  Se a requisição trouxer "id", ele é devolvido na resposta.
+
+Uso:
+    python -m agents.server --host 0.0.0.0 --port 8765
+    python -m agents.server --stdio
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from agents.embedding_cache import get_embedding_cache
+from agents.infra import create_session_factory
+from agents.maria import SVIMAgent, create_svim_agent
+from agents.metrics import metrics
+from agents.prompts import prefix_fingerprints
+from agents.tools.cache import get_catalog_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_CONCURRENCY = 32
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+
+def build_process_input(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    """
+    Converte o payload do webhook/Kestra no `input_data` esperado por `SVIMAgent.process`.
+
+    Returns:
+        (input_data, user_id)
+    """
+    message = (payload.get("message") or "").strip()
+    if not message:
+        raise ValueError("Payload sem 'message'")
+
+    input_data = {
+        "message": message,
+        "session_id": payload.get("session_id") or None,
+        "customer_profile": payload.get("customer_profile") or {},
+        "appointment_context": payload.get("appointment_context") or {},
+        "policies_context": payload.get("policies_context") or {},
+    }
+    return input_data, payload.get("user_id") or "anonymous"
+
+
+class SVIMServer:
+    """Mantém um `SVIMAgent` vivo e atende requisições concorrentes."""
+
+    def __init__(
+        self,
+        agent: SVIMAgent,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ) -> None:
+        self.agent = agent
+        self.host = host
+        self.port = port
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def handle_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        input_data, user_id = build_process_input(payload)
+        async with self._semaphore:
+            return await self.agent.process(input_data, user_id=user_id)
+
+    def handle_payload_stream(self, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Eventos de `SVIMAgent.process_stream`; payload inválido levanta ValueError na hora."""
+        input_data, user_id = build_process_input(payload)
+
+        async def events() -> AsyncIterator[Dict[str, Any]]:
+            async with self._semaphore:
+                async for event in self.agent.process_stream(input_data, user_id=user_id):
+                    yield event
+
+        return events()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **metrics.snapshot(),
+            "catalog_cache": get_catalog_cache().stats(),
+            "embedding_cache": get_embedding_cache().stats(),
+            "llm_cached_token_ratio": metrics.ratio("llm.cached_tokens", "llm.prompt_tokens"),
+            "prompt_prefixes": prefix_fingerprints(),
+            "intent_short_circuit_ratio": metrics.ratio("intent.rule_short_circuit", "intent.messages"),
+            "supervisor_llm_ratio": metrics.ratio("supervisor.llm_rewrites", "supervisor.turns"),
+            "write_behind": self.agent.write_behind.stats() if getattr(self.agent, "write_behind", None) else None,
+            "catalog_prefetch": (
+                self.agent.catalog_prefetcher.stats() if getattr(self.agent, "catalog_prefetcher", None) else None
+            ),
+            "interaction_log_pending": (
+                self.agent.interaction_logger.pending if getattr(self.agent, "interaction_logger", None) else 0
+            ),
+        }
+
+    # ==================== HTTP ====================
+
+    async def start_http(self) -> asyncio.AbstractServer:
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        # port=0 escolhe uma porta livre; guarda a porta efetiva
+        self.port = server.sockets[0].getsockname()[1]
+        logger.info(f"[SVIM] Server listening on http://{self.host}:{self.port}")
+        return server
+
+    async def serve_http(self, stop_event: Optional[asyncio.Event] = None) -> None:
+        stop_event = stop_event or asyncio.Event()
+        server = await self.start_http()
+        async with server:
+            await stop_event.wait()
+        logger.info("[SVIM] Server stopped")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await _read_http_request(reader)
+            if request is None:
+                return
+            method, path, query, body = request
+
+            if path == "/health":
+                _write_json(writer, 200, {"status": "ok"})
+            elif path == "/metrics":
+                _write_json(writer, 200, self.metrics())
+            elif path != "/process":
+                _write_json(writer, 404, {"success": False, "error": "NOT_FOUND"})
+            elif method != "POST":
+                _write_json(writer, 405, {"success": False, "error": "METHOD_NOT_ALLOWED"})
+            else:
+                try:
+                    payload = json.loads(body or b"{}")
+                    if _wants_stream(payload, query):
+                        events = self.handle_payload_stream(payload)
+                        writer.write(_stream_head())
+                        async for event in events:
+                            writer.write(_ndjson_line(event))
+                            await writer.drain()
+                    else:
+                        result = await self.handle_payload(payload)
+                        _write_json(writer, 200, result)
+                except (ValueError, json.JSONDecodeError) as exc:
+                    _write_json(writer, 400, {"success": False, "error": str(exc)})
+
+            await writer.drain()
+        except Exception as exc:
+            logger.error(f"[SVIM] Error handling HTTP request: {exc}")
+            try:
+                _write_json(writer, 500, {"success": False, "error": str(exc)})
+                await writer.drain()
+            except Exception:
+                pass
+        finally:
+            writer.close()
+
+    # ==================== STDIO ====================
+
+    async def serve_stdio(self) -> None:
+        """Lê uma requisição JSON por linha da stdin e responde na stdout."""
+        write_lock = asyncio.Lock()
+        pending = set()
+
+        async def emit(result: Dict[str, Any], request_id: Any) -> None:
+            if request_id is not None:
+                result = {"id": request_id, **result}
+            async with write_lock:
+                sys.stdout.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+                sys.stdout.flush()
+
+        async def handle_line(line: str) -> None:
+            request_id = None
+            try:
+                payload = json.loads(line)
+                request_id = payload.get("id")
+                if payload.get("stream"):
+                    async for event in self.handle_payload_stream(payload):
+                        await emit(event, request_id)
+                    return
+                result = await self.handle_payload(payload)
+            except Exception as exc:
+                result = {"success": False, "error": str(exc)}
+            await emit(result, request_id)
+
+        while True:
+            line = await asyncio.to_thread(sys.stdin.readline)
+            if not line:
+                break
+            if not line.strip():
+                continue
+            task = asyncio.create_task(handle_line(line))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending)
+
+
+async def _read_http_request(
+    reader: asyncio.StreamReader,
+) -> Optional[Tuple[str, str, Dict[str, list], bytes]]:
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+
+    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length") or 0)
+    body = await reader.readexactly(length) if length else b""
+    path, _, query = target.partition("?")
+    return method.upper(), path, parse_qs(query), body
+
+
+def _wants_stream(payload: Dict[str, Any], query: Dict[str, list]) -> bool:
+    flag = (query.get("stream") or [""])[0].lower()
+    return flag in ("1", "true", "yes") or payload.get("stream") is True
+
+
+def _stream_head() -> bytes:
+    # Sem Content-Length: o corpo termina quando a conexão fecha
+    return (
+        "HTTP/1.1 200 OK\r\n"
+        "Content-Type: application/x-ndjson; charset=utf-8\r\n"
+        "Cache-Control: no-cache\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode("latin-1")
+
+
+def _ndjson_line(event: Dict[str, Any]) -> bytes:
+    return (json.dumps(event, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+def _write_json(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]) -> None:
+    body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+
+
+def create_server_agent() -> SVIMAgent:
+    """
+    Cria o agente para uso residente.
+
+    - Sem checkpointer em memória (cada chamada já envia o estado completo e o
+      MemorySaver cresceria indefinidamente num processo de longa duração).
+    - Uma sessão de banco por interação, via session_factory, em vez de uma
+      sessão compartilhada entre requisições concorrentes.
+    """
+    session_factory = create_session_factory() if os.getenv("DATABASE_URL") else None
+    return create_svim_agent(
+        config={"workflow_checkpointer": False},
+        session_factory=session_factory,
+    )
+
+
+async def serve(args: argparse.Namespace) -> None:
+    agent = create_server_agent()
+    server = SVIMServer(
+        agent,
+        host=args.host,
+        port=args.port,
+        max_concurrency=args.max_concurrency,
+    )
+
+    # Journal do write-behind e pré-carga do catálogo
+    await agent.start_background()
+
+    try:
+        if args.stdio:
+            await server.serve_stdio()
+            return
+
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except NotImplementedError:  # pragma: no cover - Windows
+                pass
+        await server.serve_http(stop_event)
+    finally:
+        await agent.aclose()
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
+    parser = argparse.ArgumentParser(description="Servidor residente do agente SVIM")
+    parser.add_argument("--host", default=os.getenv("SVIM_SERVER_HOST", DEFAULT_HOST))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SVIM_SERVER_PORT", DEFAULT_PORT)))
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=int(os.getenv("SVIM_SERVER_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+    )
+    parser.add_argument("--stdio", action="store_true", help="Usa protocolo JSON por linha em stdin/stdout")
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
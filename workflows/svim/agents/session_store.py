@@ -0,0 +1,171 @@
+"""
+Estado de sessão por cliente do agente SVIM.
+
+Antes cada turno reconstruía `appointment_context` e o histórico varrendo
+payloads no Qdrant. Aqui fica o estado corrente da conversa de cada `user_id`
+(session_id, últimas N mensagens, intenção e `appointment_context`, incluindo o
+`appointment_draft`), lido com uma busca por chave primária e gravado com
+compare-and-set versionado: uma escrita só vale se a versão lida ainda for a
+atual, então dois turnos simultâneos do mesmo cliente não se sobrescrevem.
+
+Implementações:
+- `InMemorySessionStore`: dict no processo (servidor residente, testes);
+- `SQLSessionStore`: tabela `svim_sessions` via SQLAlchemy (SQLite, Postgres).
+
+`create_session_store(url)` escolhe pela URL (config `session_store_url`, env
+SVIM_SESSION_STORE_URL): vazio ou "memory" -> memória; senão URL SQLAlchemy.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from sqlalchemy import JSON, Column, Integer, MetaData, Table, Text, create_engine, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from agents.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SessionState(NamedTuple):
+    data: Dict[str, Any]
+    version: int
+
+
+class SessionStore:
+    """Interface: `get` por user_id e `compare_and_set` pela versão lida (0 = ainda não existe)."""
+
+    async def get(self, user_id: str) -> Optional[SessionState]:
+        raise NotImplementedError
+
+    async def compare_and_set(self, user_id: str, data: Dict[str, Any], expected_version: int) -> bool:
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        return None
+
+
+class InMemorySessionStore(SessionStore):
+    def __init__(self) -> None:
+        self._sessions: Dict[str, SessionState] = {}
+
+    async def get(self, user_id: str) -> Optional[SessionState]:
+        state = self._sessions.get(user_id)
+        # Cópia: quem lê não altera o estado guardado
+        return SessionState(json.loads(json.dumps(state.data, default=str)), state.version) if state else None
+
+    async def compare_and_set(self, user_id: str, data: Dict[str, Any], expected_version: int) -> bool:
+        current = self._sessions.get(user_id)
+        if (current.version if current else 0) != expected_version:
+            return False
+        self._sessions[user_id] = SessionState(json.loads(json.dumps(data, default=str)), expected_version + 1)
+        return True
+
+
+session_metadata = MetaData()
+
+svim_sessions = Table(
+    "svim_sessions",
+    session_metadata,
+    Column("user_id", Text, primary_key=True),
+    Column("session_id", Text),
+    Column("version", Integer, nullable=False),
+    Column("data", JSON().with_variant(JSONB(), "postgresql"), nullable=False),
+    Column("updated_at", Integer, nullable=False),
+)
+
+
+class SQLSessionStore(SessionStore):
+    """`svim_sessions` via SQLAlchemy Core; as chamadas bloqueantes rodam em thread."""
+
+    def __init__(self, engine: Engine, create_table: bool = True) -> None:
+        self.engine = engine
+        if create_table:
+            session_metadata.create_all(engine, tables=[svim_sessions], checkfirst=True)
+
+    async def get(self, user_id: str) -> Optional[SessionState]:
+        return await asyncio.to_thread(self._get, user_id)
+
+    async def compare_and_set(self, user_id: str, data: Dict[str, Any], expected_version: int) -> bool:
+        return await asyncio.to_thread(self._compare_and_set, user_id, data, expected_version)
+
+    async def aclose(self) -> None:
+        self.engine.dispose()
+
+    def _get(self, user_id: str) -> Optional[SessionState]:
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(svim_sessions.c.data, svim_sessions.c.version).where(svim_sessions.c.user_id == user_id)
+            ).first()
+        return SessionState(row.data, row.version) if row else None
+
+    def _compare_and_set(self, user_id: str, data: Dict[str, Any], expected_version: int) -> bool:
+        values = {
+            "session_id": data.get("session_id"),
+            "version": expected_version + 1,
+            "data": data,
+            "updated_at": int(time.time()),
+        }
+        with self.engine.begin() as conn:
+            if expected_version == 0:
+                try:
+                    conn.execute(svim_sessions.insert().values(user_id=user_id, **values))
+                except IntegrityError:
+                    return False
+                return True
+            result = conn.execute(
+                svim_sessions.update()
+                .where(svim_sessions.c.user_id == user_id, svim_sessions.c.version == expected_version)
+                .values(**values)
+            )
+            return result.rowcount == 1
+
+
+def create_session_store(url: Optional[str] = None) -> SessionStore:
+    if not url or url == "memory":
+        return InMemorySessionStore()
+    engine = create_engine(url, future=True, json_serializer=lambda value: json.dumps(value, ensure_ascii=False, default=str))
+    logger.info(f"[SVIM] Session store on {engine.dialect.name}")
+    return SQLSessionStore(engine)
+
+
+async def update_session(
+    store: SessionStore,
+    user_id: str,
+    base: Optional[SessionState],
+    apply: Callable[[Optional[Dict[str, Any]]], Dict[str, Any]],
+    max_attempts: int = 3,
+) -> Optional[SessionState]:
+    """
+    Grava `apply(data_lida) -> data_nova` com compare-and-set sobre `base` (o estado lido no início do turno).
+
+    Em conflito relê o estado e reaplica `apply` (até `max_attempts`). Retorna o
+    estado gravado, ou None se todas as tentativas conflitaram.
+    """
+    current = base
+    for attempt in range(max_attempts):
+        if attempt:
+            metrics.incr("session_store.conflicts")
+            current = await store.get(user_id)
+        version = current.version if current else 0
+        data = apply(current.data if current else None)
+        if await store.compare_and_set(user_id, data, version):
+            metrics.incr("session_store.writes")
+            return SessionState(data, version + 1)
+    logger.warning(f"[SVIM] Session state for {user_id} not saved: {max_attempts} conflicting writes")
+    return None
+
+
+__all__ = [
+    "InMemorySessionStore",
+    "SQLSessionStore",
+    "SessionState",
+    "SessionStore",
+    "create_session_store",
+    "update_session",
+]
@@ -0,0 +1,337 @@
+"""
+Supervisão local das respostas da Maria.
+
+`SVIMAgent._supervise_response` antes chamava o LLM de revisão sempre que algum
+padrão casava (inclusive palavras soltas como "senha" ou "token"). Aqui os
+casos simples são corrigidos sem LLM:
+
+- frases de espera ("um momento, por favor") são removidas, só quando são a
+  frase inteira;
+- frases com placeholders (TODO, FIXME, <preencher>) são descartadas;
+- segredos (chaves, bearer, JWT, "senha: x9K#2mPq") são mascarados, só quando o
+  valor tem cara de segredo (letras e dígitos/símbolos, 8+ caracteres).
+
+Só escalam para o LLM problemas que exigem reescrever a mensagem: promessas de
+retorno, narração de processos internos, um "senha é ..." ambíguo, um valor com
+cara de segredo perto de "senha"/"token" que o mascaramento não cobriu, ou uma
+correção local que deixaria a resposta vazia.
+"""
+
+import re
+from typing import List, NamedTuple, Optional
+
+REASON_PROMISE = "promessa de retorno ou ação futura vaga que pode não ser cumprida"
+REASON_INTERNAL = "narração de passos internos"
+REASON_PLACEHOLDER = "placeholder ou campo não preenchido"
+REASON_SECRET = "possível exposição de segredo ou credencial"
+REASON_WAITING = "frase de espera"
+
+REDACTED = "[removido]"
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?…])\s+")
+
+
+class SupervisionResult(NamedTuple):
+    content: str
+    reasons: List[str]
+    needs_llm: bool
+
+
+class ResponseSupervisor:
+    """Detecta e, quando possível, corrige localmente falhas na resposta do assistente."""
+
+    # 1) Promessas / ações futuras vagas (exigem reescrita)
+    PROMISE_PATTERNS = [
+        "vou ver e te retorno",
+        "depois eu respondo",
+        "mais tarde te aviso",
+        "te retorno em breve",
+        "vou verificar e te aviso",
+        "já retorno",
+        "já te respondo",
+        "assim que possível te retorno",
+    ]
+    PROMISE_REGEXES = [
+        # vou / vamos / iremos + verbo de checagem
+        re.compile(
+            r"\b(vou|vamos|iremos)\s+"
+            r"(verificar|checar|consultar|conferir|olhar|procurar|analisar|ver)\b",
+            re.IGNORECASE,
+        ),
+        # "vou fazer isso agora"
+        re.compile(r"\b(vou|vamos|iremos)\s+fazer\s+isso\s+agora\b", re.IGNORECASE),
+    ]
+
+    # 2) Frases de espera (removíveis só quando são a frase inteira)
+    WAITING_REGEXES = [
+        re.compile(r"^\s*(s[óo]\s+)?um\s+(momento|instante|minutinho),?\s+por\s+favor\s*[.!…]*\s*$", re.IGNORECASE),
+        re.compile(
+            r"^\s*aguarde\s+(s[óo]\s+)?um\s+(momento|instante|pouquinho)(,?\s+por\s+favor)?\s*[.!…]*\s*$",
+            re.IGNORECASE,
+        ),
+    ]
+
+    # 3) Narração interna (exige reescrita)
+    INTERNAL_PATTERNS = [
+        "como modelo de linguagem",
+        "processo interno",
+        "cadeia de pensamento",
+        "analisando tokens",
+        "chamando a ferramenta",
+        "uso da ferramenta",
+        "executando ferramenta",
+        "rodando comando",
+        "passo a passo interno",
+    ]
+
+    # 4) Placeholders (frase descartável)
+    PLACEHOLDER_REGEXES = [
+        re.compile(r"<\s*preencher[^>]*>|<placeholder>|\[preencher\]|preencher depois", re.IGNORECASE),
+        re.compile(r"\[TODO\]|\bTODO\b:?|\bFIXME\b:?", re.IGNORECASE),
+    ]
+
+    # 5) Segredos / credenciais (mascarados). "senha"/"token" soltos não contam:
+    # só quando seguidos de um valor.
+    SECRET_REGEXES = [
+        re.compile(r"sk-[a-z0-9_\-]{8,}", re.IGNORECASE),
+        re.compile(r"bearer\s+[a-z0-9._\-]{10,}", re.IGNORECASE),
+        re.compile(r"eyj[a-z0-9_\-]{10,}\.[a-z0-9_\-]{10,}\.[a-z0-9_\-]{10,}", re.IGNORECASE),  # JWT
+        re.compile(r"-----BEGIN [A-Z ]+-----.*?(-----END [A-Z ]+-----|$)", re.IGNORECASE | re.DOTALL),
+    ]
+    # "senha: x", "senha é: x", "senha provisória é x": até duas palavras entre a
+    # palavra-chave e o separador, que pode se repetir
+    SECRET_ASSIGNMENT_RE = re.compile(
+        r"\b(senha|password|token|api[_\s-]?key|secret)"
+        r"((?:\s+[^\s,;:=]+){0,2}?(?:\s*[:=]|\s+(?:é|eh)\b)+\s*)"
+        r"([^\s,;]{4,})",
+        re.IGNORECASE,
+    )
+    SECRET_KEYWORD_RE = re.compile(r"\b(senha|password|token|api[_\s-]?key|secret)\b", re.IGNORECASE)
+    # Palavras depois da palavra-chave em que ainda se procura um valor solto
+    SECRET_NEARBY_WORDS = 5
+    # Valor mascarado localmente: letras e dígitos/símbolos, a partir deste tamanho
+    SECRET_MIN_LENGTH = 8
+    # Palavras comuns depois de "senha é" que não são a senha ("a senha é minha")
+    SECRET_COMMON_WORDS = {
+        "minha", "sua", "seu", "meu", "dela", "dele", "nossa", "pessoal", "forte", "fraca",
+        "nova", "antiga", "mesma", "igual", "diferente", "outra", "errada", "correta",
+        "obrigatória", "obrigatoria", "necessária", "necessaria", "enviada", "válida",
+        "valida", "inválida", "invalida", "expirada", "secreta", "aquela", "essa", "esta",
+    }
+    # "o token é enviado", "a senha é alterável": particípios/adjetivos em minúsculas
+    SECRET_WORD_SUFFIXES = ("ado", "ada", "ido", "ida", "vel")
+
+    def flags(self, content: str) -> List[str]:
+        """Motivos encontrados (mesmos textos usados no prompt de revisão)."""
+        text = content.lower()
+        reasons: List[str] = []
+
+        if any(pat in text for pat in self.PROMISE_PATTERNS) or any(
+            regex.search(content) for regex in self.PROMISE_REGEXES
+        ):
+            reasons.append(REASON_PROMISE)
+        if any(pat in text for pat in self.INTERNAL_PATTERNS):
+            reasons.append(REASON_INTERNAL)
+        if any(regex.search(content) for regex in self.PLACEHOLDER_REGEXES):
+            reasons.append(REASON_PLACEHOLDER)
+        if self._has_secret(content):
+            reasons.append(REASON_SECRET)
+        if any(self._is_waiting(sentence) for sentence in self._sentences(content)):
+            reasons.append(REASON_WAITING)
+
+        return reasons
+
+    def review(self, content: str) -> SupervisionResult:
+        """
+        Aplica as correções locais e diz se ainda é preciso reescrever com o LLM.
+
+        `content` do resultado já vem com segredos mascarados e frases de
+        espera/placeholder removidas, mesmo quando `needs_llm` é True.
+        """
+        reasons = self.flags(content)
+        if not reasons:
+            return SupervisionResult(content, [], False)
+
+        rewritten = content
+        if REASON_SECRET in reasons:
+            rewritten = self._redact(rewritten)
+        if REASON_WAITING in reasons or REASON_PLACEHOLDER in reasons:
+            rewritten = self._drop_sentences(rewritten)
+
+        needs_llm = (
+            REASON_PROMISE in reasons
+            or REASON_INTERNAL in reasons
+            # "senha é Bolinha": não dá para saber localmente se é o valor
+            or (REASON_SECRET in reasons and self._has_ambiguous_secret(content))
+            # Valor com cara de segredo perto de "senha"/"token" que o mascaramento não pegou
+            or self._has_unhandled_secret(rewritten)
+            or not rewritten.strip()
+        )
+        return SupervisionResult(rewritten if rewritten.strip() else content, reasons, needs_llm)
+
+    # ==================== Internos ====================
+
+    def _secret_value_kind(self, value: str) -> str:
+        """
+        "secret" (mascarar), "ambiguous" (revisão pelo LLM) ou "word" (texto comum).
+
+        Só letras é tratado como palavra; só as palavras conhecidas (ou com cara de
+        particípio) são ignoradas.
+        """
+        value = value.rstrip(".!?…:)\"'")
+        if value.isalpha():
+            if value.lower() in self.SECRET_COMMON_WORDS or (
+                value.islower() and value.endswith(self.SECRET_WORD_SUFFIXES)
+            ):
+                return "word"
+            return "ambiguous"
+        has_letter = any(ch.isalpha() for ch in value)
+        has_other = any(not ch.isalpha() for ch in value)
+        if has_letter and has_other and len(value) >= self.SECRET_MIN_LENGTH:
+            return "secret"
+        return "ambiguous"
+
+    def _assignment_kinds(self, content: str) -> List[str]:
+        return [self._secret_value_kind(m.group(3)) for m in self.SECRET_ASSIGNMENT_RE.finditer(content)]
+
+    def _has_secret(self, content: str) -> bool:
+        return (
+            any(kind != "word" for kind in self._assignment_kinds(content))
+            or any(regex.search(content) for regex in self.SECRET_REGEXES)
+            or self._has_unhandled_secret(content)
+        )
+
+    def _has_unhandled_secret(self, content: str) -> bool:
+        """Palavra-chave seguida, a poucas palavras, de um valor com letras e dígitos/símbolos."""
+        for match in self.SECRET_KEYWORD_RE.finditer(content):
+            for word in content[match.end():].split()[: self.SECRET_NEARBY_WORDS]:
+                value = word.strip(".,;!?…:()\"'")
+                if (
+                    len(value) >= 6
+                    and any(ch.isalpha() for ch in value)
+                    and any(not ch.isalpha() for ch in value)
+                    and REDACTED not in word
+                ):
+                    return True
+        return False
+
+    def _has_ambiguous_secret(self, content: str) -> bool:
+        return "ambiguous" in self._assignment_kinds(content)
+
+    def _redact(self, content: str) -> str:
+        content = self.SECRET_ASSIGNMENT_RE.sub(
+            lambda m: (
+                f"{m.group(1)}{m.group(2)}{REDACTED}"
+                if self._secret_value_kind(m.group(3)) == "secret"
+                else m.group(0)
+            ),
+            content,
+        )
+        for regex in self.SECRET_REGEXES:
+            content = regex.sub(REDACTED, content)
+        return content
+
+    @staticmethod
+    def _sentences(content: str) -> List[str]:
+        return [sentence for line in content.split("\n") for sentence in _SENTENCE_SPLIT_RE.split(line)]
+
+    def _is_waiting(self, sentence: str) -> bool:
+        return any(regex.match(sentence) for regex in self.WAITING_REGEXES)
+
+    def _drop_sentences(self, content: str) -> str:
+        """Remove frases de espera e frases com placeholder, preservando as linhas restantes."""
+        lines: List[str] = []
+        for line in content.split("\n"):
+            if not line.strip():
+                lines.append(line)
+                continue
+
+            kept: List[str] = []
+            for sentence in _SENTENCE_SPLIT_RE.split(line):
+                if any(regex.search(sentence) for regex in self.PLACEHOLDER_REGEXES):
+                    continue
+                if self._is_waiting(sentence):
+                    continue
+                kept.append(sentence.strip())
+            if kept:
+                lines.append(" ".join(kept))
+
+        return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+class StreamingSupervisor:
+    """
+    Aplica `ResponseSupervisor` a uma resposta em streaming, frase a frase.
+
+    Cada frase completa é revisada antes de sair; correções locais valem como
+    no modo normal. Frases que pediriam reescrita pelo LLM (promessas,
+    narração interna) já não podem ser "desditas" e por isso são descartadas.
+    Um bloco `-----BEGIN ...` fica retido até o `-----END ...` (ou o fim do
+    stream) e é revisado inteiro: linha a linha o corpo da chave passaria.
+    """
+
+    _BOUNDARY_RE = re.compile(r"[.!?…]+\s+|\n+")
+    _PEM_BEGIN_RE = re.compile(r"-----BEGIN [A-Z ]+-----", re.IGNORECASE)
+    _PEM_END_RE = re.compile(r"-----END [A-Z ]+-----", re.IGNORECASE)
+
+    def __init__(self, supervisor: ResponseSupervisor) -> None:
+        self.supervisor = supervisor
+        self.reasons: List[str] = []
+        self.dropped = 0
+        self._buffer = ""
+        self._emitted: List[str] = []
+
+    @property
+    def text(self) -> str:
+        return "".join(self._emitted).strip()
+
+    def feed(self, delta: str) -> List[str]:
+        """Recebe um trecho do modelo e devolve os trechos liberados para o cliente."""
+        self._buffer += delta
+        released: List[str] = []
+        while True:
+            match = self._next_boundary()
+            if match is None:
+                break
+            sentence, self._buffer = self._buffer[: match.end()], self._buffer[match.end():]
+            released.extend(self._review(sentence))
+        return released
+
+    def flush(self) -> List[str]:
+        sentence, self._buffer = self._buffer, ""
+        return self._review(sentence)
+
+    def _next_boundary(self) -> Optional[re.Match]:
+        begin = self._PEM_BEGIN_RE.search(self._buffer)
+        if begin is None:
+            return self._BOUNDARY_RE.search(self._buffer)
+        # Libera o que vem antes do bloco; o bloco só sai depois do END
+        match = self._BOUNDARY_RE.search(self._buffer, 0, begin.start())
+        if match is not None:
+            return match
+        end = self._PEM_END_RE.search(self._buffer, begin.end())
+        if end is None:
+            return None
+        return self._BOUNDARY_RE.search(self._buffer, end.end())
+
+    def _review(self, sentence: str) -> List[str]:
+        body = sentence.strip()
+        if not body:
+            # Quebras de linha entre frases já liberadas
+            return self._emit(sentence) if self._emitted else []
+
+        review = self.supervisor.review(body)
+        for reason in review.reasons:
+            if reason not in self.reasons:
+                self.reasons.append(reason)
+        if review.needs_llm:
+            self.dropped += 1
+            return []
+        return self._emit(review.content + sentence[len(sentence.rstrip()):])
+
+    def _emit(self, text: str) -> List[str]:
+        self._emitted.append(text)
+        return [text]
+
+
+__all__ = ["ResponseSupervisor", "StreamingSupervisor", "SupervisionResult"]
@@ -0,0 +1,81 @@
+"""
+Contagem de tokens e montagem de contexto dentro de um orçamento.
+
+Usa o tokenizer do tiktoken (o200k_base, dos modelos gpt-4o/4.1) quando
+instalado; sem ele, estima ~4 caracteres por token, que é suficiente para
+orçamento de prompt.
+"""
+
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Custo fixo aproximado de cada mensagem no formato de chat (papel, separadores)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        logger.info("[SVIM] tiktoken not installed; estimating tokens as len/4")
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"[SVIM] tiktoken encoding unavailable ({e}); estimating tokens as len/4")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, (len(text) + 3) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    return MESSAGE_OVERHEAD_TOKENS + count_tokens(str(message.get("content") or ""))
+
+
+def truncate_to_tokens(text: str, budget: int, marker: str = "…") -> str:
+    """Corta `text` para caber em `budget` tokens (mantendo o começo)."""
+    if count_tokens(text) <= budget:
+        return text
+    if budget <= 0:
+        return ""
+    encoding = _encoding()
+    if encoding is None:
+        return text[: max(0, budget * 4 - len(marker))] + marker
+    return encoding.decode(encoding.encode(text, disallowed_special=())[: max(0, budget - 1)]) + marker
+
+
+def fit_recent_messages(
+    messages: List[Dict[str, Any]],
+    budget: int,
+    max_messages: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    As mensagens mais recentes que cabem em `budget` tokens (e em `max_messages`),
+    em ordem cronológica. Para na primeira que não cabe, para não deixar buracos.
+    """
+    selected: List[Dict[str, Any]] = []
+    used = 0
+    for message in reversed(messages):
+        if max_messages is not None and len(selected) >= max_messages:
+            break
+        cost = message_tokens(message)
+        if used + cost > budget:
+            break
+        selected.append(message)
+        used += cost
+    selected.reverse()
+    return selected
+
+
+__all__ = ["count_tokens", "fit_recent_messages", "message_tokens", "truncate_to_tokens"]
@@ -0,0 +1,197 @@
+"""
+Cache do catálogo (profissionais / serviços) consultado nas tools da Trinks.
+
+O catálogo muda raramente, mas `_prepare_appointment_context` consulta a API a
+cada mensagem de agendamento. Este cache:
+- usa TTL: dentro do TTL a resposta é servida direto da memória;
+- faz stale-while-revalidate: depois do TTL (até `stale_ttl_seconds`) devolve o
+  valor antigo na hora e atualiza em background;
+- é limitado por LRU (`max_entries`);
+- agrupa chamadas simultâneas para a mesma chave (uma única ida à API);
+- conta hits/misses em `agents.metrics`.
+
+Dentro de `refreshing()` (pré-carga em background) as consultas ignoram o valor
+em cache e sempre vão à API, regravando a entrada.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Optional, Set
+
+from agents.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Ligado por `refreshing()`: busca na API mesmo com a entrada ainda válida
+_force_refresh: ContextVar[bool] = ContextVar("svim_catalog_force_refresh", default=False)
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value: Any, fresh_until: float, stale_until: float) -> None:
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class CatalogCache:
+    def __init__(
+        self,
+        ttl_seconds: float = 300,
+        stale_ttl_seconds: float = 3600,
+        max_entries: int = 256,
+        name: str = "catalog_cache",
+    ) -> None:
+        self.name = name
+        self.configure(ttl_seconds, stale_ttl_seconds, max_entries)
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def configure(
+        self,
+        ttl_seconds: Optional[float] = None,
+        stale_ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ) -> None:
+        if ttl_seconds is not None:
+            self.ttl_seconds = float(ttl_seconds)
+        if stale_ttl_seconds is not None:
+            self.stale_ttl_seconds = float(stale_ttl_seconds)
+        if max_entries is not None:
+            self.max_entries = int(max_entries)
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        if _force_refresh.get():
+            self._count("refreshes")
+            task = self._inflight.get(key) or self._start_fetch(key, fetch)
+            return await asyncio.shield(task)
+
+        now = time.monotonic()
+        entry = self._entries.get(key)
+
+        if entry is not None and now < entry.fresh_until:
+            self._entries.move_to_end(key)
+            self._count("hits")
+            return entry.value
+
+        if entry is not None and now < entry.stale_until:
+            self._entries.move_to_end(key)
+            self._count("stale_hits")
+            if key not in self._inflight:
+                task = self._start_fetch(key, fetch)
+                self._background.add(task)
+                task.add_done_callback(self._on_background_done)
+            return entry.value
+
+        self._count("misses")
+        task = self._inflight.get(key) or self._start_fetch(key, fetch)
+        return await asyncio.shield(task)
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Valor em cache (mesmo que vencido), sem contar hit/miss nem buscar na API."""
+        entry = self._entries.get(key)
+        return entry.value if entry is not None else None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        self._entries[key] = _Entry(
+            value,
+            fresh_until=now + self.ttl_seconds,
+            stale_until=now + max(self.ttl_seconds, self.stale_ttl_seconds),
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            metrics.incr(f"{self.name}.evictions")
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
+
+    # ==================== Internos ====================
+
+    def _count(self, kind: str) -> None:
+        setattr(self, kind, getattr(self, kind) + 1)
+        metrics.incr(f"{self.name}.{kind}")
+
+    def _start_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        async def run() -> Any:
+            try:
+                value = await fetch()
+                if _is_cacheable(value):
+                    self.set(key, value)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.ensure_future(run())
+        self._inflight[key] = task
+        return task
+
+    def _on_background_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            metrics.incr(f"{self.name}.refresh_errors")
+            logger.warning(f"[SVIM] Falha ao revalidar cache do catálogo: {task.exception()}")
+
+
+def _is_cacheable(value: Any) -> bool:
+    # Não guarda respostas de erro da API
+    return not (isinstance(value, dict) and value.get("error"))
+
+
+@contextmanager
+def refreshing() -> Iterator[None]:
+    """Consultas ao catálogo neste contexto sempre vão à API e atualizam o cache."""
+    token = _force_refresh.set(True)
+    try:
+        yield
+    finally:
+        _force_refresh.reset(token)
+
+
+def catalog_key(estabelecimento_id: Any, path: str, params: Optional[Dict[str, Any]] = None) -> str:
+    return f"{estabelecimento_id}:{path}:{json.dumps(params or {}, sort_keys=True, default=str)}"
+
+
+_default_cache: Optional[CatalogCache] = None
+
+
+def get_catalog_cache() -> CatalogCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CatalogCache()
+    return _default_cache
+
+
+async def cached_get(client: Any, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """GET no cliente Trinks passando pelo cache do catálogo."""
+    key = catalog_key(client.headers.get("estabelecimentoId"), path, params)
+    return await get_catalog_cache().get_or_fetch(key, lambda: client.get(path, params=params))
+
+
+__all__ = ["CatalogCache", "cached_get", "catalog_key", "get_catalog_cache", "refreshing"]
@@ -1,6 +1,7 @@
 from .professionals import listar_profissionais_tool, listar_servicos_profissional_tool
 from .services import listar_servicos_tool
 from .schedule import criar_agendamento_tool, listar_agendamentos_tool
+from .pagination import DEFAULT_LLM_MAX_ITEMS
 
 TOOLS = [
     {
@@ -10,9 +11,8 @@ TOOLS = [
             "type": "object",
             "properties": {
                 "page": {
-                    "type": "integer",
-                    "description": "Número da página (1 em diante).",
-                    "default": 1,
+                    "type": ["integer", "null"],
+                    "description": "Número da página (1 em diante). Omitido: os primeiros itens e o total.",
                 },
                 "pageSize": {
                     "type": "integer",
@@ -23,6 +23,7 @@ TOOLS = [
             "required": [],
         },
         "py_fn": listar_profissionais_tool,
+        "llm_max_items": DEFAULT_LLM_MAX_ITEMS,
     },
     {
         "name": "listar_servicos_profissional",
@@ -35,9 +36,8 @@ TOOLS = [
                     "description": "ID do profissional no Trinks.",
                 },
                 "page": {
-                    "type": "integer",
-                    "description": "Número da página (1 em diante).",
-                    "default": 1,
+                    "type": ["integer", "null"],
+                    "description": "Número da página (1 em diante). Omitido: os primeiros itens e o total.",
                 },
                 "pageSize": {
                     "type": "integer",
@@ -48,6 +48,7 @@ TOOLS = [
             "required": ["profissionalId"],
         },
         "py_fn": listar_servicos_profissional_tool,
+        "llm_max_items": DEFAULT_LLM_MAX_ITEMS,
     },
     {
         "name": "listar_servicos",
@@ -71,6 +72,7 @@ TOOLS = [
             "required": [],
         },
         "py_fn": listar_servicos_tool,
+        "llm_max_items": DEFAULT_LLM_MAX_ITEMS,
     },
     {
         "name": "criar_agendamento",
@@ -135,5 +137,6 @@ TOOLS = [
             "required": ["dataInicio", "dataFim"],
         },
         "py_fn": listar_agendamentos_tool,
+        "llm_max_items": DEFAULT_LLM_MAX_ITEMS,
     },
 ]
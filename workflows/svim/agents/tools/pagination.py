@@ -0,0 +1,227 @@
+"""
+Paginação automática das listagens da Trinks.
+
+As tools de listagem pediam só a página 1 (`pageSize` 50); em estabelecimentos
+maiores o resto do catálogo/agenda sumia sem aviso. Aqui:
+
+- `iter_pages` busca a página 1, lê o total (`totalPages` ou total de registros)
+  e busca as demais em paralelo, com no máximo `concurrency` requisições
+  adiantadas, devolvendo as páginas em ordem;
+- `fetch_all` junta tudo numa resposta no formato da página 1;
+- `cached_get_all` faz o mesmo passando pelo cache do catálogo (uma entrada
+  para a listagem completa, então o snapshot dos resolvers se mantém);
+- `llm_view` corta a listagem completa para o que vai ao LLM numa tool call
+  (primeiros itens + total): pré-carga e resolvers continuam com tudo.
+
+Sem total na resposta, as páginas são buscadas uma a uma até vir uma página
+incompleta.
+
+Não há iterador de itens com parada antecipada: os resolvers ranqueiam a lista
+inteira (fuzzy, ambiguidade) sobre o snapshot cacheado, então parar no primeiro
+item que casa mudaria o resultado e faria uma busca fora do cache. Quem precisar
+parar no meio usa `iter_pages` dentro de `contextlib.aclosing(...)`, que cancela
+as páginas em voo.
+"""
+
+import asyncio
+import logging
+import math
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Sequence
+
+from agents.metrics import metrics
+from agents.tools.cache import catalog_key, get_catalog_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_PAGE_CONCURRENCY = 4
+# Teto de segurança contra totais inconsistentes da API
+DEFAULT_MAX_PAGES = 100
+# Itens de uma listagem que o LLM vê no resultado da tool (uma página); as tools de
+# listagem declaram `llm_max_items` em TOOLS e o resto só entra no total
+DEFAULT_LLM_MAX_ITEMS = 50
+
+ITEM_KEYS = ("data", "items")
+LIST_KEYS = ("data", "profissionais", "servicos", "items")
+_TOTAL_PAGES_KEYS = ("totalPages", "totalPaginas")
+_TOTAL_RECORDS_KEYS = ("totalRecords", "totalRegistros", "totalItems", "totalItens", "total")
+
+PageFetcher = Callable[[int], Awaitable[Dict[str, Any]]]
+
+
+def page_items(response: Any, keys: Sequence[str] = ITEM_KEYS) -> List[Dict[str, Any]]:
+    """Itens de uma página (primeira chave de `keys` com lista)."""
+    if isinstance(response, dict):
+        for key in keys:
+            if isinstance(response.get(key), list):
+                return response[key]
+    return []
+
+
+def total_pages(response: Dict[str, Any], page_size: int) -> Optional[int]:
+    """Total de páginas informado pela API (direto ou pelo total de registros), se houver."""
+    for key in _TOTAL_PAGES_KEYS:
+        if isinstance(response.get(key), int):
+            return max(1, response[key])
+    for key in _TOTAL_RECORDS_KEYS:
+        if isinstance(response.get(key), int):
+            return max(1, math.ceil(response[key] / page_size))
+    return None
+
+
+def _is_error(response: Any) -> bool:
+    return not isinstance(response, dict) or bool(response.get("error"))
+
+
+async def iter_pages(
+    fetch_page: PageFetcher,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    keys: Sequence[str] = ITEM_KEYS,
+    concurrency: int = DEFAULT_PAGE_CONCURRENCY,
+    max_pages: int = DEFAULT_MAX_PAGES,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Páginas da listagem, em ordem, a partir da 1.
+
+    Uma resposta de erro na página 1 é devolvida como está e encerra a
+    iteração; erro numa página seguinte levanta `RuntimeError`.
+    """
+    first = await fetch_page(1)
+    yield first
+    if _is_error(first):
+        return
+
+    known = total_pages(first, page_size)
+    if known is None:
+        # Sem total: sequencial até uma página incompleta
+        page, response = 1, first
+        while len(page_items(response, keys)) >= page_size and page < max_pages:
+            page += 1
+            response = await fetch_page(page)
+            _raise_for_page(response, page)
+            yield response
+        return
+
+    last = min(known, max_pages)
+    if known > max_pages:
+        logger.warning(f"[SVIM] Pagination capped at {max_pages} of {known} pages")
+
+    window: Deque[asyncio.Task] = deque()
+    next_page = 2
+    try:
+        while next_page <= last or window:
+            while next_page <= last and len(window) < max(1, concurrency):
+                window.append(asyncio.ensure_future(fetch_page(next_page)))
+                next_page += 1
+            page = next_page - len(window)
+            response = await window.popleft()
+            _raise_for_page(response, page)
+            yield response
+    finally:
+        # Consumidor parou antes do fim (ou erro): descarta as páginas em voo
+        for task in window:
+            task.cancel()
+        if window:
+            metrics.incr("pagination.cancelled_pages", len(window))
+            await asyncio.gather(*window, return_exceptions=True)
+
+
+def _raise_for_page(response: Any, page: int) -> None:
+    if _is_error(response):
+        error = response.get("error") if isinstance(response, dict) else response
+        raise RuntimeError(f"Erro na página {page}: {error}")
+
+
+async def fetch_all(
+    fetch_page: PageFetcher,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    keys: Sequence[str] = ITEM_KEYS,
+    concurrency: int = DEFAULT_PAGE_CONCURRENCY,
+    max_pages: int = DEFAULT_MAX_PAGES,
+) -> Dict[str, Any]:
+    """
+    Todas as páginas numa resposta só: a da página 1 com a lista completa.
+
+    Erro na página 1 volta como está; erro numa página seguinte vira
+    `{"error": "PAGINATION_ERROR", ...}` (nada parcial entra no cache).
+    """
+    responses: List[Dict[str, Any]] = []
+    try:
+        async for response in iter_pages(fetch_page, page_size, keys, concurrency, max_pages):
+            responses.append(response)
+    except RuntimeError as e:
+        logger.warning(f"[SVIM] Paginated fetch failed: {e}")
+        return {"error": "PAGINATION_ERROR", "detail": str(e)}
+
+    first = responses[0]
+    if _is_error(first):
+        return first
+    metrics.incr("pagination.fetches")
+    metrics.incr("pagination.pages", len(responses))
+    key = next((k for k in keys if isinstance(first.get(k), list)), keys[0])
+    items = [item for response in responses for item in page_items(response, keys)]
+    return {**first, key: items, "pagesFetched": len(responses)}
+
+
+def llm_view(
+    response: Any,
+    max_items: int = DEFAULT_LLM_MAX_ITEMS,
+    keys: Sequence[str] = LIST_KEYS,
+) -> Any:
+    """
+    Listagem como o LLM deve vê-la: os primeiros `max_items` itens e o total.
+
+    Com 100 páginas de catálogo o resultado da tool estouraria o contexto; para
+    achar um item específico o modelo filtra (`nome`, `categoria`) ou pede `page`.
+    """
+    if _is_error(response):
+        return response
+    key = next((k for k in keys if isinstance(response.get(k), list)), None)
+    if key is None or len(response[key]) <= max_items:
+        return response
+    items = response[key]
+    metrics.incr("pagination.llm_truncated")
+    return {
+        **{k: v for k, v in response.items() if k != "pagesFetched"},
+        key: items[:max_items],
+        "totalItens": len(items),
+        "itensOmitidos": len(items) - max_items,
+    }
+
+
+def client_page_fetcher(client: Any, path: str, params: Optional[Dict[str, Any]] = None) -> PageFetcher:
+    """`fetch_page(n)` que faz GET de `path` com `page=n` nos parâmetros."""
+
+    async def fetch_page(page: int) -> Dict[str, Any]:
+        return await client.get(path, params={**(params or {}), "page": page})
+
+    return fetch_page
+
+
+async def cached_get_all(
+    client: Any,
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    keys: Sequence[str] = ITEM_KEYS,
+    concurrency: int = DEFAULT_PAGE_CONCURRENCY,
+) -> Dict[str, Any]:
+    """Listagem completa (todas as páginas) passando pelo cache do catálogo."""
+    params = {k: v for k, v in (params or {}).items() if k != "page"}
+    page_size = params.get("pageSize", DEFAULT_PAGE_SIZE)
+    key = catalog_key(client.headers.get("estabelecimentoId"), path, {**params, "page": "all"})
+    return await get_catalog_cache().get_or_fetch(
+        key,
+        lambda: fetch_all(client_page_fetcher(client, path, params), page_size, keys, concurrency),
+    )
+
+
+__all__ = [
+    "cached_get_all",
+    "client_page_fetcher",
+    "fetch_all",
+    "iter_pages",
+    "llm_view",
+    "page_items",
+    "total_pages",
+]
@@ -1,26 +1,37 @@
 from langchain.tools import tool
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from agents.http_client import get_http_client
+from agents.tools.cache import cached_get
+from agents.tools.pagination import cached_get_all
 
 
-async def listar_profissionais_tool(page: int = 1, pageSize: int = 50) -> dict:
+async def listar_profissionais_tool(page: Optional[int] = None, pageSize: int = 50) -> dict:
+    """Sem `page`, devolve todas as páginas (buscadas em paralelo e cacheadas juntas)."""
+    client = get_http_client()
+    if page is None:
+        return await cached_get_all(
+            client, "/profissionais", {"pageSize": pageSize}, keys=("data", "profissionais", "items")
+        )
     params = {
         "page": page,
         "pageSize": pageSize,
     }
-    client = get_http_client()
-    return client.get("/profissionais", params=params)
+    return await cached_get(client, "/profissionais", params)
 
 
 async def listar_servicos_profissional_tool(
     profissionalId: int,
-    page: int = 1,
+    page: Optional[int] = None,
     pageSize: int = 50,
 ) -> dict:
+    """Sem `page`, devolve todas as páginas (buscadas em paralelo e cacheadas juntas)."""
+    client = get_http_client()
+    path = f"/profissionais/{profissionalId}/servicos"
+    if page is None:
+        return await cached_get_all(client, path, {"pageSize": pageSize}, keys=("data", "servicos", "items"))
     params = {
         "page": page,
         "pageSize": pageSize,
     }
-    client = get_http_client()
-    return client.get(f"/profissionais/{profissionalId}/servicos", params=params)
+    return await cached_get(client, path, params)
@@ -1,8 +1,8 @@
-import requests
 from typing import Any, Dict, Optional
 
 from agents.http_client import get_http_client
 from agents.resolvers.customer import resolve_cliente_id
+from agents.tools.pagination import client_page_fetcher, fetch_all
 
 
 async def criar_agendamento_tool(args: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
@@ -35,12 +35,11 @@ async def criar_agendamento_tool(args: Dict[str, Any], state: Dict[str, Any]) ->
     }
 
     client = get_http_client()
-    return client.post("/agendamentos", json=payload)
+    return await client.post("/agendamentos", json=payload)
 
 
 async def listar_agendamentos_tool(args: Dict[str, Any], state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     params: Dict[str, Any] = {
-        "page": 1,
         "pageSize": 50,
         "dataInicio": args.get("dataInicio"),
         "dataFim": args.get("dataFim"),
@@ -49,4 +48,5 @@ async def listar_agendamentos_tool(args: Dict[str, Any], state: Optional[Dict[st
         params["clienteId"] = args.get("clienteId")
 
     client = get_http_client()
-    return client.get("/agendamentos", params=params)
+    # Todas as páginas do período; agenda não passa pelo cache do catálogo
+    return await fetch_all(client_page_fetcher(client, "/agendamentos", params), params["pageSize"])
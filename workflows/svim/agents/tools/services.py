@@ -1,6 +1,7 @@
 from typing import Any, Dict
 
 from agents.http_client import get_http_client
+from agents.tools.pagination import cached_get_all
 
 
 async def listar_servicos_tool(
@@ -9,7 +10,6 @@ async def listar_servicos_tool(
     somenteVisiveisCliente: bool | None = None,
 ) -> dict:
     params: Dict[str, Any] = {
-        "page": 1,
         "pageSize": 50,
     }
 
@@ -23,4 +23,5 @@ async def listar_servicos_tool(
         params["somenteVisiveisCliente"] = bool(somenteVisiveisCliente)
 
     client = get_http_client()
-    return client.get("/servicos", params=params)
+    # Todas as páginas, não só a primeira
+    return await cached_get_all(client, "/servicos", params, keys=("data", "servicos", "items"))
@@ -1,17 +1,43 @@
 import hashlib
+import logging
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from qdrant_client import QdrantClient
-from qdrant_client.models import PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client.models import (
+    Direction,
+    FieldCondition,
+    Filter,
+    IsEmptyCondition,
+    MatchValue,
+    OrderBy,
+    PayloadField,
+    PointStruct,
+)
 
 from agents.embeddings import EmbeddingClient
+from agents.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Pontos lidos no scroll sem ordenação (coleções sem `ts`)
+LEGACY_SCROLL_LIMIT = 50
+
 
 class SVIMVectorStore:
-    def __init__(self, client: QdrantClient, collection: str):
+    def __init__(
+        self,
+        client: QdrantClient,
+        collection: str,
+        embedder: Optional[EmbeddingClient] = None,
+        legacy_fallback: Optional[bool] = None,
+    ):
         self.client = client
         self.collection = collection
-        self.embedder = EmbeddingClient()  # usa text-embedding-3-small, por exemplo
+        self.embedder = embedder or EmbeddingClient()  # usa text-embedding-3-small, por exemplo
+        # Consulta também pontos gravados antes do campo `ts` existir. None: descobre
+        # na primeira vez que precisar se a coleção ainda tem pontos sem `ts`
+        self.legacy_fallback = legacy_fallback
 
     async def add_conversation(
         self,
@@ -19,48 +45,134 @@ class SVIMVectorStore:
         session_id: str,
         messages: List[Dict[str, Any]],
         metadata: Optional[Dict[str, Any]] = None,
+        point_id: Optional[str] = None,
     ):
+        # point_id fixo torna a escrita idempotente (reexecução pela fila write-behind)
         # junta conteúdo das mensagens para gerar o embedding
         text = "\n".join(
             f"{m.get('role','user')}: {m.get('content','')}" for m in messages
         )
-        vector = await self.embedder.embed(text)
+        # Conversas salvas ao mesmo tempo saem numa única requisição de embeddings
+        [vector] = await self.embedder.embed_many([text])
 
         enriched_metadata = metadata or {}
         enriched_metadata.setdefault("timestamp", datetime.now().isoformat())
+        ts = _timestamp_ts(enriched_metadata["timestamp"]) or datetime.now().timestamp()
 
         point = PointStruct(
-            id=str(uuid.uuid4()),
+            id=point_id or str(uuid.uuid4()),
             vector=vector,
             payload={
                 "user_id": user_id,
                 "session_id": session_id,
                 "messages": messages,
                 "metadata": enriched_metadata,
+                # Epoch em segundos, indexado como float para o scroll ordenado
+                "ts": ts,
             },
         )
 
         self.client.upsert(collection_name=self.collection, points=[point])
 
-    async def get_user_context(self, user_id: str, k: int = 10) -> List[Dict[str, Any]]:
+    async def get_recent_context(self, user_id: str, k: int = 10) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
         """
-        Retorna até k blocos de mensagens anteriores desse user_id.
-        Aqui eu uso filtro por payload user_id em vez de busca semântica.
+        Mensagens mais recentes (até k, em ordem cronológica) e o metadata mais
+        recente desse usuário, numa única consulta.
+
+        Usa scroll ordenado por `ts` (índice float no payload), então o custo não
+        depende do tamanho do histórico. Pontos antigos sem `ts` não aparecem no
+        scroll ordenado; para esses (ou se o índice não existir) cai no scroll
+        antigo, ordenando em Python — ver `backfill_ts`. Numa coleção sem pontos
+        antigos, usuário novo não paga esse segundo scroll.
         """
-        result, _ = self.client.scroll(
+        user_filter = Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=user_id))])
+        points = None
+        try:
+            # Cada ponto tem ao menos uma mensagem: k pontos bastam para k mensagens
+            points, _ = self.client.scroll(
+                collection_name=self.collection,
+                scroll_filter=user_filter,
+                order_by=OrderBy(key="ts", direction=Direction.DESC),
+                limit=k,
+            )
+        except Exception as e:
+            logger.warning(f"[SVIM] Ordered scroll failed on {self.collection}, using legacy scroll: {e}")
+
+        if not points and self._has_legacy_points():
+            metrics.incr("vector_store.legacy_scroll")
+            points, _ = self.client.scroll(
+                collection_name=self.collection,
+                scroll_filter=user_filter,
+                limit=LEGACY_SCROLL_LIMIT,
+            )
+            points = sorted(points, key=_point_ts, reverse=True)[:k]
+
+        points = points or []
+        messages: List[Dict[str, Any]] = []
+        for point in reversed(points):
+            messages.extend(point.payload.get("messages") or [])
+        latest = (points[0].payload.get("metadata") or {}) if points else {}
+        return messages[-k:], latest
+
+    def _has_legacy_points(self) -> bool:
+        """`legacy_fallback`, ou (em None) se a coleção tem algum ponto sem `ts`; a resposta fica guardada."""
+        if self.legacy_fallback is None:
+            try:
+                points, _ = self.client.scroll(
+                    collection_name=self.collection,
+                    scroll_filter=Filter(must=[IsEmptyCondition(is_empty=PayloadField(key="ts"))]),
+                    limit=1,
+                    with_payload=False,
+                )
+            except Exception as e:
+                logger.warning(f"[SVIM] Could not check {self.collection} for points without ts: {e}")
+                return True
+            self.legacy_fallback = bool(points)
+            logger.info(f"[SVIM] Legacy scroll on {self.collection}: {'on' if self.legacy_fallback else 'off'}")
+        return self.legacy_fallback
+
+    async def search(
+        self,
+        query: str,
+        user_id: Optional[str] = None,
+        k: int = 3,
+        score_threshold: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca semântica: conversas mais parecidas com `query` (do user_id, se dado).
+
+        Retorna até k itens {"score", "session_id", "messages", "metadata"},
+        do mais parecido para o menos, só com score >= score_threshold.
+        """
+        vector = await self.embedder.embed(query)
+        query_filter = (
+            Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=user_id))]) if user_id else None
+        )
+        response = self.client.query_points(
             collection_name=self.collection,
-            scroll_filter=Filter(
-                must=[FieldCondition(key="user_id", match=MatchValue(value=user_id))]
-            ),
+            query=vector,
+            query_filter=query_filter,
             limit=k,
+            score_threshold=score_threshold,
+            with_payload=True,
         )
+        return [
+            {
+                "score": point.score,
+                "session_id": point.payload.get("session_id"),
+                "messages": point.payload.get("messages") or [],
+                "metadata": point.payload.get("metadata") or {},
+            }
+            for point in response.points
+        ]
 
-        context_messages: List[Dict[str, Any]] = []
-        for point in result:
-            msgs = point.payload.get("messages") or []
-            context_messages.extend(msgs)
-
-        return context_messages[-k:]  # só os k mais recentes
+    async def get_user_context(self, user_id: str, k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Retorna as k mensagens mais recentes desse user_id (ordem cronológica).
+        Aqui eu uso filtro por payload user_id em vez de busca semântica.
+        """
+        messages, _ = await self.get_recent_context(user_id, k)
+        return messages
 
     async def get_latest_metadata(self, user_id: str) -> Dict[str, Any]:
         """
@@ -69,31 +181,51 @@ class SVIMVectorStore:
         Útil para restaurar `appointment_context` (ex.: appointment_draft) em cenários
         one-shot onde o backend ainda não persistiu manualmente.
         """
-        result, _ = self.client.scroll(
-            collection_name=self.collection,
-            scroll_filter=Filter(
-                must=[FieldCondition(key="user_id", match=MatchValue(value=user_id))]
-            ),
-            limit=50,
-        )
-
-        latest = {}
-        latest_ts = None
-        for point in result:
-            metadata = point.payload.get("metadata") or {}
-            ts_raw = metadata.get("timestamp")
-            ts = None
-            try:
-                ts = datetime.fromisoformat(ts_raw) if ts_raw else None
-            except Exception:
-                ts = None
-
-            if ts is not None and (latest_ts is None or ts > latest_ts):
-                latest_ts = ts
-                latest = metadata
-
+        _, latest = await self.get_recent_context(user_id, k=1)
         return latest
 
+    def backfill_ts(self, batch_size: int = 256) -> int:
+        """
+        Grava `ts` nos pontos antigos que só têm `metadata.timestamp` e desliga
+        `legacy_fallback`. Retorna quantos pontos mudaram.
+        """
+        updated = 0
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection,
+                scroll_filter=Filter(must=[IsEmptyCondition(is_empty=PayloadField(key="ts"))]),
+                limit=batch_size,
+                offset=offset,
+            )
+            for point in points:
+                self.client.set_payload(
+                    collection_name=self.collection,
+                    payload={"ts": _point_ts(point)},
+                    points=[point.id],
+                )
+                updated += 1
+            if offset is None:
+                break
+        self.legacy_fallback = False
+        logger.info(f"[SVIM] Backfilled ts on {updated} point(s) in {self.collection}")
+        return updated
+
+
+def _timestamp_ts(raw: Optional[str]) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(raw).timestamp() if raw else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _point_ts(point: Any) -> float:
+    payload = point.payload or {}
+    ts = payload.get("ts")
+    if ts is None:
+        ts = _timestamp_ts((payload.get("metadata") or {}).get("timestamp"))
+    return float(ts) if ts is not None else 0.0
+
 
 def embed_text(text: str) -> List[float]:
     """
@@ -0,0 +1,223 @@
+"""
+Fila de escrita em background (write-behind) do agente SVIM.
+
+A resposta ao cliente não depende de salvar a memória no Qdrant nem do log em
+Postgres; esses trabalhos entram nesta fila e são executados por workers
+assíncronos depois que a resposta já saiu.
+
+- Limitada (`max_size`): com a fila cheia, `submit` espera (backpressure).
+- Retry com backoff exponencial (com jitter) por trabalho.
+- `flush()` espera a fila esvaziar; `aclose()` faz flush e encerra os workers.
+- Durabilidade opcional via journal JSONL append-only (`journal_path`): cada
+  trabalho é gravado ao entrar e marcado ao terminar. Na próxima inicialização
+  os trabalhos sem marca de término são reexecutados (entrega "at least once";
+  os handlers devem ser idempotentes, ex.: upsert com id fixo).
+
+Os trabalhos e seus payloads precisam ser serializáveis em JSON.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from agents.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+DEFAULT_MAX_SIZE = 1000
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 10.0
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        handlers: Optional[Dict[str, Handler]] = None,
+        max_size: int = DEFAULT_MAX_SIZE,
+        workers: int = DEFAULT_WORKERS,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_max: float = DEFAULT_BACKOFF_MAX,
+        journal_path: Optional[str] = None,
+        name: str = "write_behind",
+    ) -> None:
+        self.handlers: Dict[str, Handler] = dict(handlers or {})
+        self.max_size = max_size
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.journal_path = journal_path
+        self.name = name
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._journal = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self.failed = 0
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self.handlers[kind] = handler
+
+    @property
+    def started(self) -> bool:
+        return self._queue is not None
+
+    async def start(self) -> None:
+        """Sobe os workers e reexecuta trabalhos pendentes do journal (idempotente)."""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self.started:
+                return
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            pending = self._open_journal()
+            # Contexto novo: os workers não herdam ContextVars do turno que os criou
+            # (ex.: o uso de LLM de um trabalho não conta no turno de quem enfileirou)
+            self._workers = [
+                asyncio.create_task(self._worker(), context=contextvars.Context()) for _ in range(self.workers)
+            ]
+
+            for job in pending:
+                metrics.incr(f"{self.name}.replayed")
+                await self._queue.put(job)
+            if pending:
+                logger.info(f"[SVIM] Write-behind replaying {len(pending)} pending job(s) from journal")
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> str:
+        """Enfileira um trabalho; espera se a fila estiver cheia. Retorna o id do trabalho."""
+        if kind not in self.handlers:
+            raise ValueError(f"Tipo de trabalho desconhecido: {kind}")
+        if not self.started:
+            await self.start()
+
+        job = {"id": uuid.uuid4().hex, "kind": kind, "payload": payload}
+        self._append_journal({"op": "put", **job})
+        if self._queue.full():
+            metrics.incr(f"{self.name}.backpressure")
+        await self._queue.put(job)
+        metrics.incr(f"{self.name}.enqueued")
+        return job["id"]
+
+    async def flush(self, timeout: Optional[float] = None) -> None:
+        """Espera todos os trabalhos enfileirados terminarem (com sucesso ou não)."""
+        if self.started:
+            await asyncio.wait_for(self._queue.join(), timeout)
+
+    async def aclose(self, timeout: Optional[float] = 30.0) -> None:
+        if not self.started:
+            return
+        try:
+            await self.flush(timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"[SVIM] Write-behind closed with {self._queue.qsize()} job(s) pending; "
+                "they stay in the journal for replay"
+            )
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._close_journal()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "enqueued": metrics.counter(f"{self.name}.enqueued"),
+            "completed": metrics.counter(f"{self.name}.completed"),
+            "retries": metrics.counter(f"{self.name}.retries"),
+            "failed": metrics.counter(f"{self.name}.failed"),
+        }
+
+    # ==================== Internos ====================
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            logger.error(f"[SVIM] Write-behind job {job['id']} has unknown kind '{job['kind']}'")
+            self._append_journal({"op": "done", "id": job["id"]})
+            return
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                await handler(job["payload"])
+                metrics.incr(f"{self.name}.completed")
+                self._append_journal({"op": "done", "id": job["id"]})
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                if attempt >= self.max_retries:
+                    # Fica sem marca de término no journal: é reexecutado no próximo start
+                    self.failed += 1
+                    metrics.incr(f"{self.name}.failed")
+                    logger.error(f"[SVIM] Write-behind job {job['kind']} failed after {attempt + 1} attempt(s): {exc}")
+                    return
+                metrics.incr(f"{self.name}.retries")
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+                logger.warning(f"[SVIM] Write-behind job {job['kind']} failed ({exc}); retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def _open_journal(self) -> List[Dict[str, Any]]:
+        """Lê o journal, reescreve só com os pendentes e abre para append."""
+        if not self.journal_path:
+            return []
+
+        pending: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Última linha truncada por um crash no meio da escrita
+                        continue
+                    if record.get("op") == "put":
+                        pending[record["id"]] = {k: record[k] for k in ("id", "kind", "payload")}
+                    elif record.get("op") == "done":
+                        pending.pop(record.get("id"), None)
+
+        # Compacta: mantém só o que ainda precisa rodar
+        tmp_path = f"{self.journal_path}.tmp"
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            for job in pending.values():
+                fh.write(json.dumps({"op": "put", **job}, ensure_ascii=False, default=str) + "\n")
+        os.replace(tmp_path, self.journal_path)
+
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        return list(pending.values())
+
+    def _append_journal(self, record: Dict[str, Any]) -> None:
+        if self._journal is None:
+            return
+        self._journal.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._journal.flush()
+
+    def _close_journal(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+__all__ = ["WriteBehindQueue"]
@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+import pytest
+
+from agents.embedding_cache import reset_embedding_cache
+from agents.openai_client import reset_openai_pool
+
+
+# Benchmarks de latência/throughput (`@pytest.mark.bench`) ficam fora da suíte
+# normal: o tempo de parede varia com a máquina. Rode com `--bench`.
+def pytest_addoption(parser):
+    parser.addoption("--bench", action="store_true", default=False, help="roda os benchmarks (marcados com bench)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "bench: benchmark de tempo de parede; só roda com --bench")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--bench"):
+        return
+    skip = pytest.mark.skip(reason="benchmark: rode com --bench")
+    for item in items:
+        if "bench" in item.keywords:
+            item.add_marker(skip)
+
+
+class FakeOpenAIServer:
+    """
+    Servidor local compatível com a API da OpenAI (chat completions e embeddings).
+
+    Permite medir throughput/latência dos clientes sem rede nem custo:
+    - `latency`: segundos de espera simulada por requisição
+    - `chat_responder(body) -> str | dict`: texto ou {"tool_calls": [...]} da resposta
+    - `requests`: corpo JSON de cada requisição recebida
+    - `max_in_flight`: pico de requisições simultâneas observado
+    - `stream_delay`: tempo de geração por chunk (palavra); com `stream=True` é a
+      espera entre chunks, sem streaming a soma delas antes de responder
+    - `prompt_tokens_details.cached_tokens` imita o cache de prefixo da OpenAI:
+      maior prefixo do system prompt já visto, a partir de 1024 tokens, em blocos de 128
+    """
+
+    def __init__(self, latency: float = 0.0, embedding_dim: int = 1536) -> None:
+        self.latency = latency
+        self.stream_delay = 0.0
+        self.embedding_dim = embedding_dim
+        self.chat_responder: Callable[[Dict[str, Any]], Any] = lambda body: "ok"
+        self.requests: List[Dict[str, Any]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._system_prompts: List[str] = []
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                with server._lock:
+                    server.requests.append(body)
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    if server.latency:
+                        time.sleep(server.latency)
+                    if self.path.endswith("/chat/completions") and body.get("stream"):
+                        self.send_response(200)
+                        self.send_header("Content-Type", "text/event-stream")
+                        self.end_headers()
+                        for chunk in server._chat_stream(body):
+                            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                            self.wfile.flush()
+                            if server.stream_delay:
+                                time.sleep(server.stream_delay)
+                        self.wfile.write(b"data: [DONE]\n\n")
+                        return
+                    if self.path.endswith("/chat/completions"):
+                        payload = server._chat(body)
+                        if server.stream_delay:
+                            time.sleep(server.stream_delay * len(list(server._chat_stream(body))))
+                    elif self.path.endswith("/embeddings"):
+                        payload = server._embeddings(body)
+                    else:
+                        self.send_response(404)
+                        self.end_headers()
+                        return
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        class Server(ThreadingHTTPServer):
+            # backlog padrão (5) atrasa rajadas de conexões simultâneas
+            request_queue_size = 128
+
+        self._httpd = Server(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    @staticmethod
+    def _count_tokens(text: str) -> int:
+        return max(1, len(text) // 4)
+
+    def _cached_tokens(self, body: Dict[str, Any]) -> int:
+        messages = body.get("messages") or [{}]
+        system = str(messages[0].get("content") or "") if messages[0].get("role") == "system" else ""
+        with self._lock:
+            longest = max((len(os.path.commonprefix([system, seen])) for seen in self._system_prompts), default=0)
+            if system not in self._system_prompts:
+                self._system_prompts.append(system)
+        tokens = self._count_tokens(system[:longest]) if longest else 0
+        return 0 if tokens < 1024 else tokens - tokens % 128
+
+    def _chat(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        reply = self.chat_responder(body)
+        message: Dict[str, Any] = {"role": "assistant", "content": None}
+        if isinstance(reply, dict) and "tool_calls" in reply:
+            message["tool_calls"] = reply["tool_calls"]
+        else:
+            message["content"] = reply if isinstance(reply, str) else json.dumps(reply)
+
+        prompt_tokens = sum(self._count_tokens(str(m.get("content") or "")) for m in body.get("messages", []))
+        completion_tokens = self._count_tokens(message["content"] or "")
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": self._cached_tokens(body)},
+            },
+        }
+
+    def _chat_stream(self, body: Dict[str, Any]):
+        """Mesma resposta de `_chat`, em chunks (uma palavra de texto por chunk)."""
+        completion = self._chat(body)
+        message = completion["choices"][0]["message"]
+        base = {"id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"], "model": completion["model"]}
+
+        def chunk(delta, finish_reason=None):
+            return {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+        if message.get("tool_calls"):
+            for index, call in enumerate(message["tool_calls"]):
+                yield chunk({"tool_calls": [{"index": index, **call}]})
+        else:
+            words = (message["content"] or "").split(" ")
+            for i, word in enumerate(words):
+                yield chunk({"content": word if i == 0 else f" {word}"})
+        yield chunk({}, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield {**base, "choices": [], "usage": completion["usage"]}
+
+    def _embeddings(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        inputs = body.get("input")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        data = [
+            {"object": "embedding", "index": i, "embedding": self.vector_for(text)}
+            for i, text in enumerate(inputs)
+        ]
+        tokens = sum(self._count_tokens(text) for text in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "fake"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def vector_for(self, text: str) -> List[float]:
+        """Vetor determinístico (mesmo texto -> mesmo vetor)."""
+        seed = hashlib.sha256(text.encode("utf-8")).digest()
+        return [((seed[i % len(seed)] + i) % 251) / 251.0 - 0.5 for i in range(self.embedding_dim)]
+
+
+@pytest.fixture
+def fake_openai_server(monkeypatch):
+    """Sobe o FakeOpenAIServer e aponta o pool OpenAI padrão para ele."""
+    server = FakeOpenAIServer().start()
+    monkeypatch.setenv("OPENAI_BASE_URL", server.url)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    reset_openai_pool()
+    reset_embedding_cache()
+    try:
+        yield server
+    finally:
+        server.stop()
+        reset_openai_pool()
+        reset_embedding_cache()
+
+
+class DummyQdrant:
+    """Qdrant sem servidor: coleções vazias e escritas ignoradas."""
+
+    class _Collections:
+        collections = []
+
+    def get_collections(self):
+        return self._Collections()
+
+    def upsert(self, *args, **kwargs):
+        return None
+
+    def scroll(self, *args, **kwargs):
+        return [], None
+
+    def query_points(self, *args, **kwargs):
+        class _Response:
+            points = []
+
+        return _Response()
+
+    def create_collection(self, *args, **kwargs):
+        return None
+
+    def create_payload_index(self, *args, **kwargs):
+        return None
+
+
+@pytest.fixture
+def svim_agent_factory(monkeypatch, fake_openai_server):
+    """Cria SVIMAgent com Qdrant falso e LLM/embeddings servidos pelo FakeOpenAIServer."""
+    from agents.maria import create_svim_agent
+
+    monkeypatch.setattr("agents.maria.create_qdrant_client", lambda config=None: DummyQdrant())
+    monkeypatch.setattr("agents.maria.ensure_qdrant_collection", lambda *args, **kwargs: None)
+
+    def factory(**config):
+        return create_svim_agent({"workflow_checkpointer": False, **config})
+
+    return factory
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from agents.tools.cache import CatalogCache
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_then_serves_stale_while_revalidating():
+    calls = {"count": 0}
+
+    async def fetch():
+        calls["count"] += 1
+        return {"data": [{"id": calls["count"]}]}
+
+    cache = CatalogCache(ttl_seconds=0.05, stale_ttl_seconds=10)
+
+    first = await cache.get_or_fetch("1:/profissionais", fetch)
+    second = await cache.get_or_fetch("1:/profissionais", fetch)
+    assert first == second == {"data": [{"id": 1}]}
+    assert calls["count"] == 1
+
+    await asyncio.sleep(0.06)
+    # vencido: devolve o valor antigo na hora e atualiza em background
+    stale = await cache.get_or_fetch("1:/profissionais", fetch)
+    assert stale == {"data": [{"id": 1}]}
+    await asyncio.sleep(0.01)
+    refreshed = await cache.get_or_fetch("1:/profissionais", fetch)
+    assert refreshed == {"data": [{"id": 2}]}
+
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["stale_hits"] == 1
+    assert stats["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_coalesces_concurrent_misses_and_evicts_lru():
+    calls = []
+
+    def fetch_for(key):
+        async def fetch():
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return {"data": key}
+
+        return fetch
+
+    cache = CatalogCache(max_entries=2)
+    fetch_a = fetch_for("a")
+    results = await asyncio.gather(*[cache.get_or_fetch("a", fetch_a) for _ in range(5)])
+    assert results == [{"data": "a"}] * 5
+    assert calls == ["a"]
+
+    await cache.get_or_fetch("b", fetch_for("b"))
+    await cache.get_or_fetch("c", fetch_for("c"))
+    assert cache.peek("a") is None
+    assert cache.peek("c") == {"data": "c"}
+
+
+@pytest.mark.asyncio
+async def test_cache_does_not_store_errors():
+    cache = CatalogCache()
+
+    async def fetch():
+        return {"error": "HTTP_ERROR"}
+
+    await cache.get_or_fetch("k", fetch)
+    assert cache.peek("k") is None
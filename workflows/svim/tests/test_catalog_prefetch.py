@@ -0,0 +1,171 @@
+import asyncio
+import time
+
+import pytest
+
+from agents.catalog import CatalogPrefetcher
+from agents.metrics import metrics
+from agents.resolvers.index import _snapshots
+from agents.resolvers.service import resolve_professional, resolve_service
+from agents.tools import cache as cache_module
+from agents.tools.cache import CatalogCache, refreshing
+from agents.tools.professionals import listar_profissionais_tool, listar_servicos_profissional_tool
+
+LATENCY = 0.02
+
+
+class FakeTrinks:
+    """Cliente HTTP falso com latência fixa; conta chamadas e requisições simultâneas."""
+
+    def __init__(self, professionals=20, services=4, failing=()):
+        self.headers = {"estabelecimentoId": "1"}
+        self.professionals = [{"id": i, "nome": f"Profissional {i}"} for i in range(1, professionals + 1)]
+        self.services = services
+        self.failing = set(failing)
+        self.calls = []
+        self.inflight = 0
+        self.max_inflight = 0
+
+    async def get(self, path, params=None):
+        self.calls.append(path)
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            await asyncio.sleep(LATENCY)
+        finally:
+            self.inflight -= 1
+        if path == "/profissionais":
+            return {"data": self.professionals}
+        professional_id = int(path.split("/")[2])
+        if professional_id in self.failing:
+            return {"error": "HTTP_ERROR", "status_code": 503}
+        return {
+            "data": [
+                {"id": professional_id * 100 + n, "nome": f"Corte {n}", "categoria": "Cabelo"}
+                for n in range(self.services)
+            ]
+        }
+
+
+@pytest.fixture
+def trinks(monkeypatch):
+    def install(**kwargs):
+        client = FakeTrinks(**kwargs)
+        monkeypatch.setattr("agents.tools.professionals.get_http_client", lambda: client)
+        monkeypatch.setattr(cache_module, "_default_cache", CatalogCache())
+        metrics.reset()
+        return client
+
+    return install
+
+
+def _prefetcher(**kwargs):
+    return CatalogPrefetcher(listar_profissionais_tool, listar_servicos_profissional_tool, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_refresh_warms_cache_and_resolver_index_with_bounded_fan_out(trinks):
+    client = trinks(professionals=20, services=4)
+
+    result = await _prefetcher(concurrency=4).refresh()
+    assert result["professionals"] == 20 and result["services"] == 80 and result["errors"] == 0
+    assert len(client.calls) == 21
+    assert client.max_inflight == 4
+    assert metrics.summary("catalog_prefetch.refresh_ms")["count"] == 1
+    assert metrics.summary("catalog_prefetch.services")["max"] == 80
+
+    # Mensagem depois da pré-carga: nada vai à API e o índice do snapshot já existe
+    snapshots = len(_snapshots)
+    profs = await listar_profissionais_tool()
+    services = await listar_servicos_profissional_tool(profissionalId=7)
+    assert len(client.calls) == 21
+    assert resolve_professional("com o Profissional 7", profs["data"])["id"] == 7
+    assert resolve_service("quero um corte", 7, services["data"])["id"] == 700
+    assert len(_snapshots) == snapshots
+
+
+@pytest.mark.asyncio
+async def test_refresh_bypasses_fresh_entries_and_keeps_them_on_errors(trinks):
+    client = trinks(professionals=3, failing={2})
+    prefetcher = _prefetcher()
+
+    await prefetcher.refresh()
+    first = await listar_servicos_profissional_tool(profissionalId=1)
+    result = await prefetcher.refresh()
+
+    # Entradas ainda válidas são buscadas de novo (o cache não serve a pré-carga)
+    assert client.calls.count("/profissionais") == 2
+    assert await listar_servicos_profissional_tool(profissionalId=1) is not first
+    assert result["errors"] == 1 and result["services"] == 8
+    assert prefetcher.stats()["errors"] == 2
+
+    client.failing = {1}
+    await prefetcher.refresh()
+    # Falha na atualização não derruba o valor anterior
+    assert (await listar_servicos_profissional_tool(profissionalId=1))["data"][0]["id"] == 100
+
+    # Fora de `refreshing()` o cache volta ao normal
+    calls = len(client.calls)
+    await listar_profissionais_tool()
+    assert len(client.calls) == calls
+    with refreshing():
+        await listar_profissionais_tool()
+    assert len(client.calls) == calls + 1
+
+
+@pytest.mark.asyncio
+async def test_background_task_refreshes_on_timer_until_closed(trinks):
+    trinks(professionals=2)
+    prefetcher = _prefetcher(interval_seconds=0.05)
+
+    prefetcher.start()
+    prefetcher.start()
+    await asyncio.sleep(0.2)
+    assert prefetcher.stats()["running"]
+    await prefetcher.aclose()
+
+    refreshes = metrics.counter("catalog_prefetch.refreshes")
+    assert refreshes >= 2
+    await asyncio.sleep(0.1)
+    assert metrics.counter("catalog_prefetch.refreshes") == refreshes
+    assert not prefetcher.stats()["running"]
+
+
+@pytest.mark.asyncio
+async def test_agent_starts_prefetch_in_background(trinks, svim_agent_factory):
+    trinks(professionals=2)
+    agent = svim_agent_factory(catalog_prefetch_interval=3600, write_behind=False)
+
+    await agent.start_background()
+    await asyncio.sleep(0.1)
+    assert agent.catalog_prefetcher.stats()["last"]["services"] == 8
+    await agent.aclose()
+    assert not agent.catalog_prefetcher.running
+
+    assert svim_agent_factory(catalog_prefetch_enabled=False).catalog_prefetcher is None
+
+
+@pytest.mark.bench
+@pytest.mark.asyncio
+async def test_first_message_latency_cold_vs_prefetched(trinks):
+    async def first_message():
+        started = time.perf_counter()
+        profs = await listar_profissionais_tool()
+        resolve_professional("com o Profissional 12", profs["data"])
+        services = await listar_servicos_profissional_tool(profissionalId=12)
+        resolve_service("quero um corte", 12, services["data"])
+        return (time.perf_counter() - started) * 1000
+
+    trinks(professionals=40)
+    cold_ms = await first_message()
+
+    trinks(professionals=40)
+    refresh = await _prefetcher(concurrency=8).refresh()
+    warm_ms = await first_message()
+
+    assert warm_ms < cold_ms
+    print(
+        f"\n[bench] first scheduling message: cold {cold_ms:.1f} ms vs prefetched {warm_ms:.2f} ms "
+        f"(refresh of {refresh['professionals']} professionals / {refresh['services']} services "
+        f"in {refresh['refresh_ms']:.0f} ms with fan-out 8)"
+    )
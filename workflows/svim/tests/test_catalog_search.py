@@ -0,0 +1,135 @@
+import hashlib
+import math
+import re
+import statistics
+import time
+
+import pytest
+from qdrant_client import QdrantClient
+
+from agents.catalog import CatalogSync
+from agents.metrics import metrics
+from agents.tools import index as tools_index
+
+DIM = 256
+
+PROFESSIONALS = [
+    {"id": 1, "nome": "Beatrice Zuppo Pardini", "apelido": "Bia", "tags": ["coloração", "mechas"]},
+    {"id": 2, "nome": "Ricardo Alves", "apelido": "Rick", "tags": ["barbearia", "barba"]},
+]
+SERVICES = {
+    1: [
+        {"id": 10, "nome": "Mechas", "descricao": "clareamento em luzes e reflexos", "categoria": "Coloração", "duracaoEmMinutos": 180, "valor": 420},
+        {"id": 11, "nome": "Escova modelada", "descricao": "escova lisa ou ondulada", "categoria": "Cabelo", "duracaoEmMinutos": 50, "valor": 90},
+        {"id": 12, "nome": "Hidratação", "descricao": "tratamento para fios ressecados", "categoria": "Tratamento", "duracaoEmMinutos": 60, "valor": 120},
+    ],
+    2: [
+        {"id": 20, "nome": "Corte masculino", "descricao": "tesoura e máquina", "categoria": "Barbearia", "duracaoEmMinutos": 40, "valor": 70},
+        {"id": 21, "nome": "Toalha quente", "descricao": "barba feita na navalha", "categoria": "Barbearia", "duracaoEmMinutos": 30, "valor": 50},
+    ],
+}
+
+
+def _keyword_vector(text):
+    """Embedding de teste: bag of words com hashing (textos com palavras em comum ficam próximos)."""
+    vector = [0.0] * DIM
+    for token in re.findall(r"\w+", text.lower()):
+        if len(token) < 3:
+            continue
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        vector[digest[0] % DIM] += 1.0 if digest[1] % 2 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class KeywordEmbedder:
+    async def embed_many(self, texts):
+        return [_keyword_vector(text) for text in texts]
+
+
+async def _synced_catalog():
+    sync = CatalogSync(QdrantClient(":memory:"), embedder=KeywordEmbedder(), vector_size=DIM)
+    await sync.sync_professionals_catalog(PROFESSIONALS)
+    for professional_id, services in SERVICES.items():
+        await sync.sync_services_catalog(professional_id, services)
+    return sync
+
+
+@pytest.mark.asyncio
+async def test_search_returns_services_for_free_text_requests():
+    sync = await _synced_catalog()
+
+    [top, *_] = await sync.search_services("quero fazer luzes", k=3)
+    assert top.item["id"] == 10 and top.matched == "Mechas"
+
+    by_professional = await sync.search_services("barba na navalha", professional_id=2, k=3)
+    assert by_professional[0].item["id"] == 21
+    assert {c.item["id"] for c in by_professional} <= {20, 21}
+
+    professionals = await sync.search_professionals("alguém de barbearia para barba", k=1)
+    assert professionals[0].item["id"] == 2
+
+
+@pytest.mark.asyncio
+async def test_search_before_sync_returns_nothing():
+    sync = CatalogSync(QdrantClient(":memory:"), embedder=KeywordEmbedder(), vector_size=DIM)
+
+    assert await sync.search_services("quero fazer luzes") == []
+    assert await sync.search_services("   ") == []
+
+
+@pytest.mark.asyncio
+async def test_prepare_appointment_context_falls_back_to_catalog_search(
+    fake_openai_server, svim_agent_factory, monkeypatch
+):
+    async def listar_profissionais(page: int = 1, pageSize: int = 50):
+        return {"data": PROFESSIONALS}
+
+    async def listar_servicos_profissional(profissionalId: int, page: int = 1, pageSize: int = 50):
+        return {"data": SERVICES[profissionalId]}
+
+    for tool in tools_index.TOOLS:
+        if tool["name"] == "listar_profissionais":
+            monkeypatch.setitem(tool, "py_fn", listar_profissionais)
+        if tool["name"] == "listar_servicos_profissional":
+            monkeypatch.setitem(tool, "py_fn", listar_servicos_profissional)
+
+    agent = svim_agent_factory(catalog_search_min_score=0.2)
+    agent.catalog_sync = CatalogSync(QdrantClient(":memory:"), embedder=KeywordEmbedder(), vector_size=DIM)
+    metrics.reset()
+
+    state = {
+        "messages": [{"role": "user", "content": "quero fazer luzes com a Bia"}],
+        "appointment_context": {},
+    }
+    await agent._prepare_appointment_context(state)
+
+    draft = state["appointment_context"]["appointment_draft"]
+    assert draft["professionalId"] == 1
+    assert draft["serviceId"] == 10 and draft["durationMinutes"] == 180 and draft["price"] == 420
+    assert metrics.counter("catalog_search.resolved") == 1
+
+    # Sem serviço na mensagem a busca não decide; fica a escolha padrão de resolve_service
+    state = {"messages": [{"role": "user", "content": "pode ser com a Bia?"}], "appointment_context": {}}
+    await agent._prepare_appointment_context(state)
+    assert metrics.counter("catalog_search.unresolved") == 1
+    await agent.aclose()
+
+
+@pytest.mark.bench
+@pytest.mark.asyncio
+async def test_catalog_search_latency():
+    sync = await _synced_catalog()
+    queries = ["quero fazer luzes", "barba", "hidratar o cabelo ressecado", "escova ondulada"]
+    for query in queries:
+        await sync.search_services(query)  # aquece
+
+    timings = []
+    for _ in range(25):
+        for query in queries:
+            started = time.perf_counter()
+            await sync.search_services(query)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    p50 = statistics.median(timings)
+    print(f"\n[bench] catalog semantic search (local Qdrant): p50 {p50:.2f} ms over {len(timings)} queries")
@@ -0,0 +1,142 @@
+import random
+
+import pytest
+from qdrant_client import QdrantClient
+
+from agents.catalog import CatalogSync
+from agents.catalog.sync import PROFESSIONALS_COLLECTION, SERVICES_COLLECTION
+from agents.local_index import LocalVectorClient, select_vector_client
+
+DIM = 32
+
+
+class CountingEmbedder:
+    model = "test-embedding"
+
+    def __init__(self):
+        self.texts = 0
+
+    async def embed_many(self, texts):
+        self.texts += len(texts)
+        return [[random.Random(text).uniform(-1, 1) for _ in range(DIM)] for text in texts]
+
+
+class CountingClient:
+    """Repassa para o cliente real contando upserts/deletes."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.upserts = []
+        self.deletes = []
+
+    def upsert(self, collection_name, points):
+        self.upserts.append(len(points))
+        return self.inner.upsert(collection_name=collection_name, points=points)
+
+    def delete(self, collection_name, points_selector):
+        self.deletes.append(len(points_selector.points))
+        return self.inner.delete(collection_name=collection_name, points_selector=points_selector)
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+def _services(n, price=100):
+    return [{"id": i, "nome": f"Serviço {i}", "categoria": "Cabelo", "valor": price} for i in range(n)]
+
+
+def _sync(client, embedder, batch_size=64):
+    # TTL negativo: toda chamada sincroniza (simula TTL expirado / novo processo)
+    return CatalogSync(client, ttl_seconds=-1, embedder=embedder, vector_size=DIM, batch_size=batch_size)
+
+
+@pytest.mark.parametrize("backend", ["qdrant", "local"])
+@pytest.mark.asyncio
+async def test_resync_only_touches_changed_items(backend):
+    inner = QdrantClient(":memory:") if backend == "qdrant" else LocalVectorClient()
+    client = CountingClient(inner)
+    embedder = CountingEmbedder()
+    sync = _sync(client, embedder, batch_size=50)
+    services = _services(120)
+
+    first = await sync.sync_services_catalog(7, services)
+    assert first == {"upserted": 120, "deleted": 0, "unchanged": 0}
+    assert embedder.texts == 120
+    assert client.upserts == [50, 50, 20]
+
+    # Sem mudanças: nenhum embedding nem escrita
+    client.upserts.clear()
+    assert await sync.sync_services_catalog(7, services) == {"upserted": 0, "deleted": 0, "unchanged": 120}
+    assert embedder.texts == 120 and client.upserts == []
+
+    # Preço alterado, serviço novo, dois removidos
+    changed = [dict(svc) for svc in services[2:]]
+    changed[0]["valor"] = 150
+    changed.append({"id": 500, "nome": "Mechas", "categoria": "Coloração", "valor": 400})
+    result = await sync.sync_services_catalog(7, changed)
+    assert result == {"upserted": 2, "deleted": 2, "unchanged": 117}
+    assert embedder.texts == 122
+    assert client.deletes == [2]
+    assert inner.count(collection_name=SERVICES_COLLECTION).count == 119
+
+    # Outro profissional não é afetado pela remoção
+    await sync.sync_services_catalog(8, _services(3))
+    assert (await sync.sync_services_catalog(7, changed))["unchanged"] == 119
+    assert inner.count(collection_name=SERVICES_COLLECTION).count == 122
+
+
+@pytest.mark.asyncio
+async def test_hashes_survive_process_restart_and_empty_response_keeps_catalog():
+    client = QdrantClient(":memory:")
+    professionals = [{"id": i, "nome": f"Profissional {i}", "tags": ["cabelo"]} for i in range(30)]
+    await _sync(client, CountingEmbedder()).sync_professionals_catalog(professionals)
+
+    # Novo processo: `_last_sync` vazio, mas os hashes estão no payload
+    embedder = CountingEmbedder()
+    result = await _sync(client, embedder).sync_professionals_catalog(professionals)
+    assert result == {"upserted": 0, "deleted": 0, "unchanged": 30}
+    assert embedder.texts == 0
+
+    assert (await _sync(client, embedder).sync_professionals_catalog([]))["deleted"] == 0
+    assert client.count(collection_name=PROFESSIONALS_COLLECTION).count == 30
+
+
+@pytest.mark.asyncio
+async def test_large_catalog_resync_embeds_only_churned_items():
+    client = QdrantClient(":memory:")
+    embedder = CountingEmbedder()
+    sync = _sync(client, embedder, batch_size=128)
+    services = _services(1000)
+
+    await sync.sync_services_catalog(1, services)
+    full_texts = embedder.texts
+    assert full_texts == 1000
+
+    churned = [dict(svc, valor=120) if svc["id"] % 100 == 0 else svc for svc in services]
+    result = await sync.sync_services_catalog(1, churned)
+
+    # 1% de mudança: 10 embeddings, não 1000
+    assert result["upserted"] == 10
+    assert embedder.texts - full_texts == 10
+
+
+@pytest.mark.asyncio
+async def test_fresh_processes_with_default_backend_do_not_reembed():
+    remote = QdrantClient(":memory:")
+    services = _services(10)
+    collections = {
+        name: {"mode": "auto", "dim": DIM} for name in (PROFESSIONALS_COLLECTION, SERVICES_COLLECTION)
+    }
+
+    results = []
+    for _ in range(3):
+        # Cada volta simula um processo novo: roteador e CatalogSync recriados, só o Qdrant persiste
+        client = select_vector_client(remote, collections)
+        embedder = CountingEmbedder()
+        results.append((await _sync(client, embedder).sync_services_catalog(7, services), embedder.texts))
+        if client is not remote:
+            client.close()
+
+    assert results[0] == ({"upserted": 10, "deleted": 0, "unchanged": 0}, 10)
+    assert results[1] == results[2] == ({"upserted": 0, "deleted": 0, "unchanged": 10}, 0)
+    assert remote.count(collection_name=SERVICES_COLLECTION).count == 10
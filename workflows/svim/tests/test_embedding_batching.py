@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from agents.catalog import CatalogSync
+from agents.embedding_cache import EmbeddingCache
+from agents.embeddings import EmbeddingClient
+from agents.openai_client import OpenAIPool
+from agents.vector_store import SVIMVectorStore
+
+
+def _embedding_requests(server):
+    return [body for body in server.requests if "input" in body]
+
+
+class RecordingQdrant:
+    def __init__(self):
+        self.upserts = []
+
+    def upsert(self, collection_name, points):
+        self.upserts.append((collection_name, points))
+
+    def get_collections(self):
+        return type("Collections", (), {"collections": []})()
+
+    def scroll(self, *args, **kwargs):
+        return [], None
+
+    def create_collection(self, *args, **kwargs):
+        pass
+
+    def create_payload_index(self, *args, **kwargs):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_concurrent_embeds_share_one_request(fake_openai_server):
+    client = EmbeddingClient(pool=OpenAIPool(), use_cache=False, batch_window_ms=20)
+
+    vectors = await asyncio.gather(*[client.embed(f"conversa {i}") for i in range(30)])
+
+    assert len(_embedding_requests(fake_openai_server)) == 1
+    assert vectors[7] == fake_openai_server.vector_for("conversa 7")
+
+
+@pytest.mark.asyncio
+async def test_embed_many_keeps_order_dedupes_and_splits_batches(fake_openai_server):
+    client = EmbeddingClient(pool=OpenAIPool(), cache=EmbeddingCache(), max_batch_size=4)
+    texts = ["a", "b", "a", "c", "d", "e", "b"]
+
+    vectors = await client.embed_many(texts)
+
+    assert vectors == [fake_openai_server.vector_for(t) for t in texts]
+    # 5 textos distintos em lotes de até 4
+    assert sorted(len(body["input"]) for body in _embedding_requests(fake_openai_server)) == [1, 4]
+
+    await client.embed_many(["c", "a"])
+    assert len(_embedding_requests(fake_openai_server)) == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_text(fake_openai_server):
+    fake_openai_server.latency = 0.05
+    client = EmbeddingClient(pool=OpenAIPool(), use_cache=False, batch_window_ms=10)
+
+    first = asyncio.create_task(client.embed_many(["abc"]))
+    second = asyncio.create_task(client.embed_many(["abc"]))
+    await asyncio.sleep(0.02)
+    first.cancel()
+
+    assert await second == [fake_openai_server.vector_for("abc")]
+    assert first.cancelled()
+    assert len(_embedding_requests(fake_openai_server)) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_failure_reaches_every_caller(fake_openai_server):
+    fake_openai_server.stop()
+    client = EmbeddingClient(pool=OpenAIPool(timeout=2), use_cache=False)
+
+    results = await asyncio.gather(client.embed("x"), client.embed("y"), return_exceptions=True)
+
+    assert all(isinstance(result, Exception) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_vector_store_coalesces_concurrent_memory_writes(fake_openai_server):
+    fake_openai_server.latency = 0.05
+    qdrant = RecordingQdrant()
+    client = EmbeddingClient(pool=OpenAIPool(), use_cache=False, batch_window_ms=10)
+    store = SVIMVectorStore(qdrant, "svim_memory", embedder=client)
+    n = 40
+
+    await asyncio.gather(*[
+        store.add_conversation(f"user-{i}", "s", [{"role": "user", "content": f"mensagem {i}"}])
+        for i in range(n)
+    ])
+
+    requests = _embedding_requests(fake_openai_server)
+    assert len(qdrant.upserts) == n
+    assert len(requests) < n / 4
+
+
+@pytest.mark.asyncio
+async def test_catalog_sync_embeds_whole_catalog_in_one_request(fake_openai_server):
+    qdrant = RecordingQdrant()
+    sync = CatalogSync(qdrant, embedder=EmbeddingClient(pool=OpenAIPool(), use_cache=False))
+    services = [{"id": i, "nome": f"Serviço {i}", "categoria": "cabelo"} for i in range(25)]
+
+    await sync.sync_services_catalog(7, services)
+    await sync.sync_services_catalog(7, services)  # dentro do TTL: nada a fazer
+
+    assert len(_embedding_requests(fake_openai_server)) == 1
+    collection, points = qdrant.upserts[0]
+    assert collection == "services_catalog"
+    assert len(points) == 25
+    assert len(points[0].vector) == fake_openai_server.embedding_dim
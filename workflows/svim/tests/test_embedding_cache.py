@@ -0,0 +1,68 @@
+import pytest
+
+from agents.embedding_cache import EmbeddingCache, embedding_key
+from agents.embeddings import EmbeddingClient
+from agents.openai_client import OpenAIPool
+
+
+def _embedding_requests(server):
+    return [body for body in server.requests if "input" in body]
+
+
+def test_key_ignores_whitespace_but_not_model():
+    assert embedding_key("  oi,\n  tudo bem? ", "m") == embedding_key("oi, tudo bem?", "m")
+    assert embedding_key("oi", "m") != embedding_key("oi", "outro-modelo")
+    assert embedding_key("oi", "m") != embedding_key("Oi", "m")
+
+
+def test_lru_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2)
+    cache.set("a", "m", [1.0])
+    cache.set("b", "m", [2.0])
+    assert cache.get("a", "m") == [1.0]
+    cache.set("c", "m", [3.0])
+
+    assert cache.get("b", "m") is None
+    assert cache.get("a", "m") == [1.0]
+    assert cache.get("c", "m") == [3.0]
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    first = EmbeddingCache(path=path)
+    first.set("horário de sábado", "m", [0.25, -0.5, 1.0])
+    first.close()
+
+    second = EmbeddingCache(path=path)
+    assert second.get("horário  de sábado", "m") == [0.25, -0.5, 1.0]
+    assert second.disk_hits == 1
+    # Promovido para o LRU
+    assert second.get("horário de sábado", "m") == [0.25, -0.5, 1.0]
+    assert second.hits == 1
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_repeated_texts_skip_embeddings_api(fake_openai_server):
+    cache = EmbeddingCache()
+    client = EmbeddingClient(pool=OpenAIPool(), cache=cache)
+    texts = ["oi", "obrigada", "oi ", "quero agendar", "Obrigada", "oi"] * 5
+
+    vectors = [await client.embed(text) for text in texts]
+
+    assert vectors[0] == vectors[2] == vectors[5]
+    # "oi", "obrigada", "quero agendar", "Obrigada"
+    assert len(_embedding_requests(fake_openai_server)) == 4
+    stats = cache.stats()
+    assert stats["saved_api_calls"] == len(texts) - 4
+    assert stats["hit_rate"] == pytest.approx((len(texts) - 4) / len(texts))
+
+
+@pytest.mark.asyncio
+async def test_cache_can_be_disabled(fake_openai_server):
+    client = EmbeddingClient(pool=OpenAIPool(), use_cache=False)
+
+    await client.embed("oi")
+    await client.embed("oi")
+
+    assert len(_embedding_requests(fake_openai_server)) == 2
@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+import pytest
+
+from agents.http_client import HttpClient, HttpClientError
+
+
+@pytest.fixture(autouse=True)
+def trinks_env(monkeypatch):
+    monkeypatch.setenv("URL_BASE", "http://trinks.test")
+    monkeypatch.setenv("ESTABELECIMENTO_ID", "1")
+    monkeypatch.setenv("HTTP_BACKOFF_BASE", "0.01")
+
+
+@pytest.mark.asyncio
+async def test_get_retries_transient_errors_with_backoff():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"data": [{"id": 1}]})
+
+    client = HttpClient(transport=httpx.MockTransport(handler))
+
+    result = await client.get("/profissionais", params={"page": 1})
+
+    assert result == {"data": [{"id": 1}]}
+    assert len(calls) == 3
+    assert calls[0].headers["estabelecimentoId"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_post_is_not_retried():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(503)
+
+    client = HttpClient(transport=httpx.MockTransport(handler))
+
+    with pytest.raises(HttpClientError):
+        await client.post("/agendamentos", json={"servicoId": 1})
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded_per_establishment(monkeypatch):
+    monkeypatch.setenv("HTTP_MAX_CONCURRENCY", "2")
+    in_flight = {"now": 0, "max": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.02)
+        in_flight["now"] -= 1
+        return httpx.Response(200, json={"ok": True})
+
+    client = HttpClient(transport=httpx.MockTransport(handler))
+
+    await asyncio.gather(*[client.get(f"/profissionais/{i}/servicos") for i in range(8)])
+
+    assert in_flight["max"] == 2
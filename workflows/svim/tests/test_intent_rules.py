@@ -0,0 +1,45 @@
+import pytest
+
+from agents.intent_rules import RuleBasedIntentClassifier
+
+
+@pytest.mark.parametrize(
+    "message, intent",
+    [
+        ("oi", "smalltalk"),
+        ("Olá, bom dia!", "smalltalk"),
+        ("obrigada, tchau", "farewell"),
+        ("quero cortar o cabelo amanhã", "schedule"),
+        ("quero marcar um horário", "schedule"),
+        ("pode agendar uma escova pra sexta?", "schedule"),
+        ("cancela meu agendamento", "cancel"),
+        ("quero remarcar meu horário de sexta", "reschedule"),
+        ("preciso cancelar meu horário", "cancel"),
+        ("quanto custa a escova?", "info"),
+    ],
+)
+def test_confident_local_intents(message, intent):
+    classifier = RuleBasedIntentClassifier()
+
+    prediction = classifier.classify(message)
+
+    assert prediction.intent == intent
+    assert classifier.is_confident(prediction)
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "pode confirmar",
+        "segunda às 18h",
+        "quero marcar, quanto custa o corte?",
+        "Beatriz",
+        "qual a marca do shampoo?",
+        "minha agenda tá cheia",
+        "desmarcar e marcar outro",
+    ],
+)
+def test_uncertain_messages_fall_back_to_llm(message):
+    classifier = RuleBasedIntentClassifier()
+
+    assert not classifier.is_confident(classifier.classify(message))
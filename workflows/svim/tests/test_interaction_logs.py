@@ -0,0 +1,183 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from agents.metrics import metrics
+from agents.infra import (
+    BatchedInteractionLogger,
+    ensure_interaction_logs_table,
+    interaction_logs,
+    log_svim_interaction,
+)
+
+
+def _engine(tmp_path, name="logs.db"):
+    engine = create_engine(f"sqlite:///{tmp_path / name}", future=True)
+    ensure_interaction_logs_table(engine)
+    return engine
+
+
+def _fields(i):
+    return {
+        "user_id": f"u{i}",
+        "session_id": f"s{i}",
+        "intent": "info",
+        "request": {"message": f"oi {i}"},
+        "response": {"success": True, "response": "Olá! 😊"},
+    }
+
+
+def _rows(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(interaction_logs).order_by(interaction_logs.c.id)).mappings().all()
+
+
+def test_sync_logger_stores_json_objects(tmp_path):
+    engine = _engine(tmp_path)
+    session = sessionmaker(bind=engine)()
+
+    log_svim_interaction(session, **_fields(1))
+
+    (row,) = _rows(engine)
+    assert row["request_json"] == {"message": "oi 1"}
+    assert row["response_json"]["response"] == "Olá! 😊"
+    assert row["created_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_batched_logger_flushes_when_batch_fills_and_on_close(tmp_path):
+    engine = _engine(tmp_path)
+    batched = BatchedInteractionLogger(engine, batch_size=10, flush_interval_ms=10_000)
+    metrics.reset()
+
+    for i in range(25):
+        await batched.log(**_fields(i))
+    await asyncio.sleep(0.1)  # lote cheio acorda o flush sem esperar o intervalo
+    assert len(_rows(engine)) == 25
+    assert batched.pending == 0
+
+    await batched.log(**_fields(25))
+    await batched.aclose()
+    rows = _rows(engine)
+    assert [r["user_id"] for r in rows] == [f"u{i}" for i in range(26)]
+    # Um INSERT/COMMIT por lote, não por linha: 10 + 10 + 5 e o 1 do fechamento
+    assert metrics.counter("interaction_log.batches") == 4
+
+
+@pytest.mark.asyncio
+async def test_batched_logger_flushes_on_interval(tmp_path):
+    engine = _engine(tmp_path)
+    batched = BatchedInteractionLogger(engine, batch_size=100, flush_interval_ms=20)
+
+    await batched.log(**_fields(1))
+    await asyncio.sleep(0.2)
+
+    assert len(_rows(engine)) == 1
+    await batched.aclose()
+
+
+@pytest.mark.asyncio
+async def test_batched_logger_keeps_rows_when_database_fails(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'missing.db'}", future=True)  # sem tabela
+    batched = BatchedInteractionLogger(engine, batch_size=100, flush_interval_ms=10_000)
+
+    await batched.log(**_fields(1))
+    with pytest.raises(Exception):
+        await batched.flush()
+    assert batched.pending == 1
+
+    ensure_interaction_logs_table(engine)
+    await batched.aclose()
+    assert len(_rows(engine)) == 1
+
+
+@pytest.mark.asyncio
+async def test_batched_logger_gives_up_on_batch_after_max_retries(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'missing.db'}", future=True)  # sem tabela
+    spilled = []
+
+    async def dead_letter(rows):
+        spilled.append(rows)
+
+    batched = BatchedInteractionLogger(engine, batch_size=100, flush_interval_ms=10_000, max_retries=2, dead_letter=dead_letter)
+    await batched.log(**_fields(1))
+    for _ in range(2):
+        with pytest.raises(Exception):
+            await batched.flush()
+    await batched.flush()
+
+    # Esgotadas as tentativas o lote sai do buffer e vai para o dead-letter
+    assert batched.pending == 0
+    assert [[row["user_id"] for row in rows] for rows in spilled] == [["u1"]]
+
+    # O replay do dead-letter grava direto, sem buffer
+    ensure_interaction_logs_table(engine)
+    await batched.write(spilled[0])
+    assert [r["user_id"] for r in _rows(engine)] == ["u1"]
+
+    # Sem dead-letter, o lote é descartado (e contado)
+    metrics.reset()
+    broken = create_engine(f"sqlite:///{tmp_path / 'other.db'}", future=True)
+    dropping = BatchedInteractionLogger(broken, batch_size=100, flush_interval_ms=10_000, max_retries=0)
+    await dropping.log(**_fields(2))
+    await dropping.aclose()
+    assert dropping.pending == 0
+    assert metrics.counter("interaction_log.dropped") == 1
+
+
+@pytest.mark.bench
+@pytest.mark.asyncio
+async def test_benchmark_batched_vs_per_row_commit(tmp_path):
+    n = 1000
+
+    engine = _engine(tmp_path, "per_row.db")
+    session = sessionmaker(bind=engine)()
+    started = time.perf_counter()
+    for i in range(n):
+        log_svim_interaction(session, **_fields(i))
+    per_row = n / (time.perf_counter() - started)
+
+    engine = _engine(tmp_path, "batched.db")
+    batched = BatchedInteractionLogger(engine, batch_size=200, flush_interval_ms=50)
+    started = time.perf_counter()
+    for i in range(n):
+        await batched.log(**_fields(i))
+    await batched.aclose()
+    batched_rate = n / (time.perf_counter() - started)
+
+    assert len(_rows(engine)) == n
+    print(f"\n[bench] interaction_logs: per-row {per_row:.0f} rows/s | batched {batched_rate:.0f} rows/s")
+
+
+@pytest.mark.asyncio
+async def test_agent_spills_failed_batches_to_write_behind_journal(tmp_path, svim_agent_factory):
+    from agents.maria import create_svim_agent
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'late.db'}", future=True)  # tabela ainda não existe
+    agent = create_svim_agent(
+        {
+            "workflow_checkpointer": False,
+            "catalog_prefetch_enabled": False,
+            "interaction_log_max_retries": 0,
+            "write_behind_journal": str(tmp_path / "journal.jsonl"),
+            "write_behind_max_retries": 0,
+        },
+        session_factory=sessionmaker(bind=engine),
+    )
+
+    await agent.interaction_logger.log(**_fields(1))
+    await agent.interaction_logger.flush()
+    await agent.write_behind.flush()
+    assert agent.interaction_logger.pending == 0
+    assert agent.write_behind.stats()["failed"] >= 1
+
+    # O lote ficou no journal e é regravado na próxima subida
+    await agent.write_behind.aclose()
+    ensure_interaction_logs_table(engine)
+    await agent.write_behind.start()
+    await agent.write_behind.flush()
+    assert [r["user_id"] for r in _rows(engine)] == ["u1"]
+    await agent.aclose()
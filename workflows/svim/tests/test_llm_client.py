@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from agents.embeddings import EmbeddingClient
+from agents.llm_client import LLMClient
+from agents.openai_client import OpenAIPool
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_does_not_block_event_loop(fake_openai_server):
+    fake_openai_server.latency = 0.2
+    fake_openai_server.chat_responder = lambda body: "Olá! 😊"
+    client = LLMClient()
+
+    results = await asyncio.gather(
+        *[client.chat_completion([{"role": "user", "content": f"oi {i}"}]) for i in range(20)]
+    )
+
+    assert results == ["Olá! 😊"] * 20
+    # Com o loop bloqueado as chamadas iriam uma de cada vez
+    assert fake_openai_server.max_in_flight > 1
+
+
+@pytest.mark.asyncio
+async def test_pool_respects_concurrency_limit(fake_openai_server):
+    fake_openai_server.latency = 0.1
+    client = EmbeddingClient(pool=OpenAIPool(max_concurrency=4))
+
+    vectors = await asyncio.gather(*[client.embed(f"texto {i}") for i in range(12)])
+
+    assert len(vectors) == 12
+    assert len(vectors[0]) == 1536
+    assert fake_openai_server.max_in_flight <= 4
+
+
+@pytest.mark.asyncio
+async def test_pool_applies_per_call_timeout(fake_openai_server):
+    fake_openai_server.latency = 1.0
+    client = LLMClient(pool=OpenAIPool(timeout=0.2))
+
+    with pytest.raises(asyncio.TimeoutError):
+        await client.chat_completion([{"role": "user", "content": "oi"}])
@@ -0,0 +1,222 @@
+import os
+import random
+import statistics
+import time
+import uuid
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as rest
+
+from agents.infra import ensure_qdrant_collection
+from agents.local_index import LocalVectorClient, LocalVectorIndex, VectorClientRouter, select_vector_client
+from agents.vector_store import SVIMVectorStore
+
+DIM = 64
+
+
+def _vectors(n, seed=7):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n, DIM)).astype(np.float32)
+
+
+def _brute_force(vectors, query, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return np.argsort(-scores)[:k].tolist()
+
+
+class StaticEmbedder:
+    async def embed(self, text):
+        return self._vector(text)
+
+    async def embed_many(self, texts):
+        return [self._vector(text) for text in texts]
+
+    @staticmethod
+    def _vector(text):
+        rng = random.Random(text)
+        return [rng.uniform(-1, 1) for _ in range(DIM)]
+
+
+def test_search_matches_brute_force_with_filter():
+    vectors = _vectors(300)
+    index = LocalVectorIndex(DIM)
+    index.upsert(list(range(300)), vectors, [{"professionalId": i % 3} for i in range(300)])
+    query = _vectors(1, seed=1)[0]
+
+    hits = index.search(query, k=5)
+    assert [point_id for point_id, _, _ in hits] == _brute_force(vectors, query, 5)
+
+    filtered = index.search(query, k=5, where={"professionalId": 2})
+    assert all(payload["professionalId"] == 2 for _, _, payload in filtered)
+    expected = [i for i in _brute_force(vectors, query, 300) if i % 3 == 2][:5]
+    assert [point_id for point_id, _, _ in filtered] == expected
+
+    # Atualização troca o vetor e o payload (e o índice por campo)
+    index.upsert([expected[0]], [-query], [{"professionalId": 0}])
+    assert expected[0] not in [point_id for point_id, _, _ in index.search(query, k=5, where={"professionalId": 2})]
+    index.delete([expected[1]])
+    assert expected[1] not in [point_id for point_id, _, _ in index.search(query, k=300)]
+    assert len(index) == 299
+
+
+def test_memmap_persistence_and_incremental_append(tmp_path):
+    path = str(tmp_path / "services")
+    vectors = _vectors(100)
+    ids = [str(uuid.uuid4()) for _ in range(100)]
+    index = LocalVectorIndex(DIM, path=path)
+    index.upsert(ids, vectors, [{"n": i} for i in range(100)])
+    index.delete([ids[0]])
+    index.close()
+
+    reopened = LocalVectorIndex(DIM, path=path)
+    assert len(reopened) == 99
+    query = vectors[5]
+    assert reopened.search(query, k=1)[0][0] == ids[5]
+
+    # Novos pontos vão para o fim do arquivo; os antigos não são reescritos
+    size_before = os.path.getsize(os.path.join(path, "vectors.f32"))
+    extra = _vectors(50, seed=3)
+    reopened.upsert([f"extra-{i}" for i in range(50)], extra, [{"n": 100 + i} for i in range(50)])
+    reopened.close()
+
+    again = LocalVectorIndex(DIM, path=path)
+    assert len(again) == 149
+    assert again.search(extra[10], k=1)[0][0] == "extra-10"
+    assert os.path.getsize(os.path.join(path, "vectors.f32")) > size_before
+    again.close()
+
+    with pytest.raises(ValueError):
+        LocalVectorIndex(DIM * 2, path=path)
+
+
+@pytest.mark.asyncio
+async def test_vector_store_runs_on_local_client():
+    client = LocalVectorClient()
+    ensure_qdrant_collection(client, "svim_memory", vector_size=DIM)
+    store = SVIMVectorStore(client, "svim_memory", embedder=StaticEmbedder())
+
+    for i in range(5):
+        await store.add_conversation(
+            "u1",
+            f"s{i}",
+            [{"role": "user", "content": f"mensagem {i}"}],
+            metadata={"timestamp": f"2025-12-0{i + 1}T10:00:00", "n": i},
+        )
+    await store.add_conversation("u2", "x", [{"role": "user", "content": "outro cliente"}])
+
+    messages, latest = await store.get_recent_context("u1", k=3)
+    assert [m["content"] for m in messages] == ["mensagem 2", "mensagem 3", "mensagem 4"]
+    assert latest["n"] == 4
+
+    results = await store.search("user: mensagem 3", user_id="u1", k=2)
+    assert results[0]["session_id"] == "s3" and results[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert all(r["session_id"] != "x" for r in results)
+
+
+def _remote_with(collection, n):
+    remote = QdrantClient(":memory:")
+    ensure_qdrant_collection(remote, collection, vector_size=DIM)
+    vectors = _vectors(n)
+    remote.upsert(
+        collection_name=collection,
+        points=[
+            rest.PointStruct(id=i, vector=vectors[i].tolist(), payload={"user_id": f"u{i % 2}", "ts": float(i)})
+            for i in range(n)
+        ],
+    )
+    return remote, vectors
+
+
+def test_select_vector_client_by_size_and_mirrors_writes():
+    remote, vectors = _remote_with("svim_memory", 40)
+
+    client = select_vector_client(remote, {"svim_memory": {"mode": "auto", "dim": DIM, "mirror": True}})
+    assert isinstance(client, VectorClientRouter)
+    assert client.backend("svim_memory") == "local+qdrant"
+    # Cópia inicial do Qdrant para o índice local
+    assert client.count(collection_name="svim_memory").count == 40
+    hit = client.query_points(collection_name="svim_memory", query=vectors[7].tolist(), limit=1).points[0]
+    assert hit.id == 7
+
+    client.upsert(
+        collection_name="svim_memory",
+        points=[rest.PointStruct(id=99, vector=vectors[0].tolist(), payload={"user_id": "u9", "ts": 99.0})],
+    )
+    assert remote.count(collection_name="svim_memory").count == 41
+    assert client.count(collection_name="svim_memory").count == 41
+
+    # Acima do limite fica no Qdrant
+    assert select_vector_client(remote, {"svim_memory": {"mode": "auto", "dim": DIM, "mirror": True}}, max_local_points=10) is remote
+    assert select_vector_client(remote, {"svim_memory": {"mode": "qdrant", "dim": DIM}}) is remote
+
+
+
+def test_auto_without_directory_mirrors_to_qdrant(tmp_path):
+    remote, _ = _remote_with("services_catalog", 20)
+
+    # Só em memória: espelhado, o Qdrant continua recebendo as escritas
+    catalog = select_vector_client(remote, {"services_catalog": {"mode": "auto", "dim": DIM}})
+    assert catalog.backend("services_catalog") == "local+qdrant"
+    assert catalog.backend("svim_memory") == "qdrant"
+    catalog.delete(collection_name="services_catalog", points_selector=rest.PointIdsList(points=[0]))
+    assert remote.count(collection_name="services_catalog").count == 19
+
+    # Com diretório o índice sobrevive ao reinício e pode ser só local
+    persisted = select_vector_client(remote, {"services_catalog": {"mode": "auto", "dim": DIM}}, directory=str(tmp_path))
+    assert persisted.backend("services_catalog") == "local"
+    persisted.close()
+
+    # Coleção ausente no Qdrant: fica no Qdrant até existir
+    fresh = QdrantClient(":memory:")
+    assert select_vector_client(fresh, {"services_catalog": {"mode": "auto", "dim": DIM}}) is fresh
+
+
+def test_unsupported_filter_falls_back_to_qdrant():
+    remote, vectors = _remote_with("svim_memory", 10)
+    client = select_vector_client(remote, {"svim_memory": {"mode": "auto", "dim": DIM, "mirror": True}})
+    range_filter = rest.Filter(must=[rest.FieldCondition(key="ts", range=rest.Range(gte=5.0))])
+
+    with pytest.raises(NotImplementedError):
+        client.local.query_points(collection_name="svim_memory", query=vectors[0].tolist(), query_filter=range_filter)
+    hits = client.query_points(
+        collection_name="svim_memory", query=vectors[0].tolist(), query_filter=range_filter, limit=10
+    ).points
+    assert sorted(hit.id for hit in hits) == [5, 6, 7, 8, 9]
+
+
+def _timed(fn, queries):
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        fn(query)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+@pytest.mark.bench
+def test_local_index_vs_qdrant_benchmark():
+    n = 500
+    remote, vectors = _remote_with("services_catalog", n)
+    local = LocalVectorClient()
+    local.create_collection("services_catalog", vectors_config=rest.VectorParams(size=DIM, distance=rest.Distance.COSINE))
+    local.upsert(
+        "services_catalog",
+        [rest.PointStruct(id=i, vector=vectors[i].tolist(), payload={"user_id": f"u{i % 2}"}) for i in range(n)],
+    )
+    queries = [q.tolist() for q in _vectors(200, seed=11)]
+
+    def search(client):
+        return lambda query: client.query_points(collection_name="services_catalog", query=query, limit=5)
+
+    for query in queries[:5]:
+        assert [p.id for p in search(local)(query).points] == [p.id for p in search(remote)(query).points]
+
+    local_p50 = _timed(search(local), queries)
+    qdrant_p50 = _timed(search(remote), queries)
+    print(
+        f"\n[bench] top-5 over {n} vectors (dim {DIM}): local index p50 {local_p50:.3f} ms, "
+        f"Qdrant (in-process, no network) p50 {qdrant_p50:.3f} ms"
+    )
@@ -0,0 +1,134 @@
+import hashlib
+import math
+import re
+import statistics
+
+import pytest
+from qdrant_client import QdrantClient
+
+from agents.infra import ensure_qdrant_collection
+from agents.vector_store import SVIMVectorStore
+
+DIM = 256
+
+# (pergunta antiga, resposta antiga, nova pergunta sobre o mesmo assunto)
+TOPICS = [
+    ("qual o valor da progressiva para cabelo longo?", "A progressiva para cabelo longo custa R$ 280.", "quanto sai a progressiva no cabelo longo"),
+    ("vocês fazem manicure com esmaltação em gel?", "Sim, a esmaltação em gel dura umas 3 semanas.", "a esmaltação em gel na manicure dura quanto"),
+    ("tem estacionamento no salão?", "Temos estacionamento conveniado na rua de trás.", "onde estaciono o carro perto do salão, tem estacionamento"),
+    ("a Bia faz penteado para noiva?", "A Bia faz penteado de noiva com teste antes.", "penteado de noiva com a Bia precisa de teste"),
+    ("aceitam pix ou cartão?", "Aceitamos pix, débito e cartão de crédito.", "posso pagar no pix"),
+    ("fazem design de sobrancelha com henna?", "Fazemos design de sobrancelha com ou sem henna.", "quero sobrancelha com henna"),
+    ("quanto tempo demora a coloração?", "A coloração leva cerca de 2 horas.", "a coloração demora muito tempo"),
+    ("tem massagem relaxante no spa?", "O spa tem massagem relaxante de 50 minutos.", "quero marcar massagem relaxante no spa"),
+    ("vocês atendem no domingo?", "No domingo só abrimos em datas especiais.", "abre domingo"),
+    ("fazem barba com toalha quente?", "A barba com toalha quente está no combo da barbearia.", "barba com toalha quente na barbearia"),
+]
+
+
+def _keyword_vector(text):
+    """Embedding de teste: bag of words com hashing (textos com palavras em comum ficam próximos)."""
+    vector = [0.0] * DIM
+    for token in re.findall(r"\w+", text.lower()):
+        if len(token) < 3:
+            continue
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        vector[digest[0] % DIM] += 1.0 if digest[1] % 2 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class KeywordEmbedder:
+    async def embed(self, text):
+        return _keyword_vector(text)
+
+    async def embed_many(self, texts):
+        return [_keyword_vector(text) for text in texts]
+
+
+def _store():
+    client = QdrantClient(":memory:")
+    ensure_qdrant_collection(client, "svim_memory", vector_size=DIM)
+    return SVIMVectorStore(client, "svim_memory", embedder=KeywordEmbedder())
+
+
+async def _save(store, user_id, question, answer, topic):
+    await store.add_conversation(
+        user_id,
+        f"s-{topic}",
+        [{"role": "user", "content": question}, {"role": "assistant", "content": answer}],
+        metadata={"topic": topic},
+    )
+
+
+@pytest.mark.asyncio
+async def test_search_recall():
+    store = _store()
+    for topic, (question, answer, _) in enumerate(TOPICS):
+        await _save(store, "cliente", question, answer, topic)
+        # Mesmo assunto, outros clientes: o filtro por user_id precisa excluir
+        await _save(store, "outra", question, answer, topic)
+        for filler in range(3):
+            await _save(store, "cliente", f"ok obrigada {topic} {filler}", "Por nada! 😊", -1)
+
+    k = 3
+    recalls = []
+    for topic, (_, _, query) in enumerate(TOPICS):
+        hits = await store.search(query, user_id="cliente", k=k, score_threshold=0.1)
+
+        assert all(hit["session_id"] == f"s-{hit['metadata']['topic']}" for hit in hits)
+        recalls.append(1.0 if any(hit["metadata"]["topic"] == topic for hit in hits) else 0.0)
+
+    assert statistics.mean(recalls) >= 0.9
+
+
+@pytest.mark.asyncio
+async def test_search_is_scoped_to_user_and_threshold():
+    store = _store()
+    await _save(store, "outra", *TOPICS[0][:2], 0)
+    assert await store.search(TOPICS[0][2], user_id="cliente", k=3) == []
+
+    await _save(store, "cliente", *TOPICS[0][:2], 0)
+    assert len(await store.search(TOPICS[0][2], user_id="cliente", k=3, score_threshold=0.1)) == 1
+    assert await store.search("horário de funcionamento", user_id="cliente", k=3, score_threshold=0.5) == []
+
+
+@pytest.mark.asyncio
+async def test_related_memory_is_added_to_prompt(fake_openai_server, svim_agent_factory, monkeypatch):
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr("agents.maria.create_qdrant_client", lambda config=None: client)
+    monkeypatch.setattr("agents.maria.ensure_qdrant_collection", ensure_qdrant_collection)
+    fake_openai_server.chat_responder = lambda body: (
+        {"intent": "info"} if "classificador" in body["messages"][0]["content"] else "Certo!"
+    )
+    agent = svim_agent_factory(
+        qdrant_vector_size=DIM, max_context_messages=2, write_behind=False, memory_score_threshold=0.1
+    )
+    agent.vector_store.embedder = KeywordEmbedder()
+
+    await agent.process_message(user_id="cliente", message=TOPICS[0][0])
+    for i in range(3):
+        await agent.process_message(user_id="cliente", message=f"obrigada pela ajuda de novo {i}")
+    fake_openai_server.requests.clear()
+
+    await agent.process_message(user_id="cliente", message=TOPICS[0][2])
+
+    prompts = [body["messages"][0]["content"] for body in fake_openai_server.requests if "messages" in body]
+    answer_prompt = prompts[-1]
+    assert "Conversas anteriores relacionadas" in answer_prompt
+    assert TOPICS[0][0] in answer_prompt
+
+
+@pytest.mark.asyncio
+async def test_memory_search_skipped_when_disabled(fake_openai_server, svim_agent_factory, monkeypatch):
+    fake_openai_server.chat_responder = lambda body: "Certo!"
+    agent = svim_agent_factory(enable_memory=False)
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("search should not run")
+
+    monkeypatch.setattr(agent.vector_store, "search", fail)
+
+    result = await agent.process_message(user_id="cliente", message="quanto custa a progressiva no cabelo longo?")
+
+    assert result["success"]
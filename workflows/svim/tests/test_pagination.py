@@ -0,0 +1,174 @@
+import asyncio
+import json
+import time
+from contextlib import aclosing
+
+import pytest
+
+from agents.metrics import metrics
+from agents.tools import cache as cache_module
+from agents.tools.cache import CatalogCache
+from agents.tools import index as tools_index
+from agents.tools.pagination import fetch_all, iter_pages, llm_view
+from agents.tools.professionals import listar_profissionais_tool
+from agents.tools.schedule import listar_agendamentos_tool
+
+LATENCY = 0.02
+
+
+class PagedApi:
+    """API paginada falsa (formato Trinks: data/page/pageSize/totalPages/totalRecords)."""
+
+    def __init__(self, total, with_totals=True, failing_page=None):
+        self.headers = {"estabelecimentoId": "1"}
+        self.total = total
+        self.with_totals = with_totals
+        self.failing_page = failing_page
+        self.requested = []
+        self.inflight = 0
+        self.max_inflight = 0
+
+    async def get(self, path, params=None):
+        page, page_size = params["page"], params["pageSize"]
+        self.requested.append(page)
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            await asyncio.sleep(LATENCY)
+        finally:
+            self.inflight -= 1
+        if page == self.failing_page:
+            return {"error": "HTTP_ERROR", "status_code": 503}
+        start = (page - 1) * page_size
+        response = {
+            "data": [{"id": i, "nome": f"Item {i}"} for i in range(start, min(start + page_size, self.total))],
+            "page": page,
+            "pageSize": page_size,
+        }
+        if self.with_totals:
+            response["totalRecords"] = self.total
+            response["totalPages"] = -(-self.total // page_size)
+        return response
+
+    def fetcher(self, page_size=50):
+        return lambda page: self.get("/x", {"page": page, "pageSize": page_size})
+
+
+@pytest.mark.asyncio
+async def test_fetch_all_reads_total_and_fetches_remaining_pages_concurrently():
+    api = PagedApi(total=230)
+
+    result = await fetch_all(api.fetcher(), concurrency=3)
+    assert [item["id"] for item in result["data"]] == list(range(230))
+    assert result["pagesFetched"] == 5 and result["totalRecords"] == 230
+    assert sorted(api.requested) == [1, 2, 3, 4, 5]
+    assert api.max_inflight == 3
+
+    # Sem total na resposta: sequencial até a página incompleta
+    api = PagedApi(total=120, with_totals=False)
+    result = await fetch_all(api.fetcher())
+    assert len(result["data"]) == 120 and api.requested == [1, 2, 3]
+    assert api.max_inflight == 1
+
+
+@pytest.mark.asyncio
+async def test_iter_pages_stops_early_and_cancels_pending_pages():
+    api = PagedApi(total=1000)
+    metrics.reset()
+
+    found = None
+    async with aclosing(iter_pages(api.fetcher(), concurrency=2)) as pages:
+        async for page in pages:
+            found = next((item for item in page["data"] if item["id"] == 60), None)
+            if found:
+                break
+
+    assert found["id"] == 60
+    # Página 1, a 2 (com o item) e a 3 já adiantada na janela; nada das outras 17
+    assert sorted(api.requested) == [1, 2, 3]
+    assert metrics.counter("pagination.cancelled_pages") == 1
+    await asyncio.sleep(LATENCY * 2)
+    assert api.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_do_not_return_partial_lists():
+    assert (await fetch_all(PagedApi(total=200, failing_page=3).fetcher()))["error"] == "PAGINATION_ERROR"
+    first_page_error = await fetch_all(PagedApi(total=200, failing_page=1).fetcher())
+    assert first_page_error == {"error": "HTTP_ERROR", "status_code": 503}
+
+
+@pytest.mark.asyncio
+async def test_list_tools_return_every_page(monkeypatch):
+    api = PagedApi(total=130)
+    monkeypatch.setattr("agents.tools.professionals.get_http_client", lambda: api)
+    monkeypatch.setattr("agents.tools.schedule.get_http_client", lambda: api)
+    monkeypatch.setattr(cache_module, "_default_cache", CatalogCache())
+
+    profs = await listar_profissionais_tool()
+    assert len(profs["data"]) == 130
+    # Listagem completa cacheada como uma entrada só (mesmo snapshot para os resolvers)
+    assert await listar_profissionais_tool() is profs
+    assert len(api.requested) == 3
+
+    # Página explícita continua disponível
+    assert [p["id"] for p in (await listar_profissionais_tool(page=3))["data"]] == list(range(100, 130))
+
+    agenda = await listar_agendamentos_tool({"dataInicio": "2025-12-01", "dataFim": "2025-12-31"})
+    assert len(agenda["data"]) == 130
+
+    # Ao LLM vai só o começo da listagem e o total
+    view = llm_view(profs)
+    assert [p["id"] for p in view["data"]] == list(range(50))
+    assert view["totalItens"] == 130 and view["itensOmitidos"] == 80
+    assert "pagesFetched" not in view
+    assert len(profs["data"]) == 130
+    assert llm_view({"error": "HTTP_ERROR"}) == {"error": "HTTP_ERROR"}
+    small = {"data": [{"id": 1}]}
+    assert llm_view(small) is small
+
+
+@pytest.mark.asyncio
+async def test_tool_result_sent_to_llm_is_capped(fake_openai_server, svim_agent_factory, monkeypatch):
+    async def full_catalog(**kwargs):
+        return {"data": [{"id": i, "nome": f"Serviço {i}"} for i in range(300)], "pagesFetched": 6}
+
+    tool = next(t for t in tools_index.TOOLS if t["name"] == "listar_servicos")
+    monkeypatch.setitem(tool, "py_fn", full_catalog)
+
+    def responder(body):
+        if "classificador de intenção" in body["messages"][0]["content"]:
+            return {"intent": "info"}
+        if body.get("tools"):
+            return {"tool_calls": [{"id": "c1", "type": "function", "function": {"name": "listar_servicos", "arguments": "{}"}}]}
+        return "Temos vários serviços!"
+
+    fake_openai_server.chat_responder = responder
+    agent = svim_agent_factory(write_behind=False)
+    await agent.process_message(user_id="u1", message="quais serviços vocês têm?")
+
+    (tool_message,) = [
+        m for body in fake_openai_server.requests for m in body.get("messages", []) if m.get("role") == "tool"
+    ]
+    sent = json.loads(tool_message["content"])
+    assert len(sent["data"]) == 50 and sent["totalItens"] == 300
+
+
+@pytest.mark.bench
+@pytest.mark.asyncio
+async def test_concurrent_pagination_benchmark():
+    pages = 10
+
+    started = time.perf_counter()
+    sequential = await fetch_all(PagedApi(total=pages * 50, with_totals=False).fetcher())
+    sequential_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    concurrent = await fetch_all(PagedApi(total=pages * 50).fetcher(), concurrency=4)
+    concurrent_ms = (time.perf_counter() - started) * 1000
+
+    assert sequential["data"] == concurrent["data"]
+    print(
+        f"\n[bench] {pages} pages x {LATENCY * 1000:.0f} ms: sequential {sequential_ms:.0f} ms, "
+        f"concurrent (4 in flight) {concurrent_ms:.0f} ms"
+    )
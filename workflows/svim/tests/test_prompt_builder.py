@@ -0,0 +1,108 @@
+import json
+
+from agents.maria import SVIMIntent
+from agents.prompt_builder import build_scheduling_context
+from agents.prompts import SVIMPrompts
+from agents.tokens import count_tokens
+
+
+def _professional(i):
+    return {
+        "id": 664600 + i,
+        "nome": f"Profissional {i}",
+        "apelido": f"Pro{i}",
+        "email": f"pro{i}@svim.com.br",
+        "telefone": "11 99999-0000",
+        "ativo": True,
+        "tags": ["cabelo", "coloração", "escova"],
+        "foto": "https://cdn.example.com/" + "x" * 60,
+    }
+
+
+def _state(history_turns=10):
+    history = "\n".join(
+        f"user: pergunta {i} sobre horário de corte\nassistant: resposta {i} com detalhes do horário disponível"
+        for i in range(history_turns)
+    )
+    return {
+        "messages": [{"role": "user", "content": "pode ser com a Bia na quinta às 15h?", "timestamp": "2025-12-10T10:00:00"}],
+        "user_id": "5511999990000",
+        "session_id": "svim_session_5511999990000_1",
+        "intent": SVIMIntent.SCHEDULE,
+        "customer_profile": {"clienteId": 555, "name": "Guilherme", "preferences": {"x": 1}},
+        "appointment_context": {
+            "history": history + "\nuser: pode ser com a Bia na quinta às 15h?",
+            "memories": "user: ano passado fiz luzes com a Bia\nassistant: Ótimo!",
+            "appointment_draft": {
+                "professionalId": 664601,
+                "professionalName": "Profissional 1",
+                "professional": _professional(1),
+                "serviceId": 20,
+                "serviceName": "Corte",
+                "durationMinutes": 60,
+                "price": 130.0,
+                "service": {"id": 20, "nome": "Corte", "descricao": "Corte feminino " * 10, "valor": 130.0},
+                "notes": "",
+            },
+        },
+        "policies_context": {"policies_text": "Cancelamentos com até 24h de antecedência."},
+        "needs_handoff": False,
+        "finish_session": False,
+        "system_prompt": "prompt anterior " * 50,
+        "tool_attempts": {"listar_profissionais": 1},
+        "session_state": None,
+    }
+
+
+def test_keeps_needed_fields_and_drops_the_rest():
+    context = build_scheduling_context(_state())
+
+    assert '"clienteId":555' in context
+    assert '"professionalId":664601' in context and '"serviceId":20' in context
+    assert "preferences" not in context
+    # dicts completos, estado interno e campos vazios ficam de fora
+    assert "cdn.example.com" not in context and "descricao" not in context
+    assert "prompt anterior" not in context and "tool_attempts" not in context
+    assert '"notes"' not in context
+    assert "Cancelamentos com até 24h" in context
+    assert "ano passado fiz luzes" in context
+    # a mensagem atual já vai em `messages`, não se repete no histórico
+    assert context.count("pode ser com a Bia na quinta") == 0
+
+
+def test_budget_is_enforced_keeping_latest_history():
+    context = build_scheduling_context(_state(history_turns=200), token_budget=300)
+
+    assert count_tokens(context) <= 300
+    assert '"serviceId":20' in context
+    assert "resposta 199" in context
+    assert "pergunta 0 " not in context
+
+
+def test_scheduling_prompt_is_smaller_than_full_state_dump():
+    state = _state()
+    prompts = SVIMPrompts()
+
+    old_context = json.dumps(state, ensure_ascii=False, indent=2, default=str)
+    new_context = build_scheduling_context(state)
+    prompt = prompts.get_scheduling_prompt(state, cliente_id=555, cliente_nome="Guilherme")
+
+    assert new_context in prompt
+    old_tokens, new_tokens = count_tokens(old_context), count_tokens(new_context)
+    assert new_tokens < old_tokens / 2
+
+
+def test_summary_survives_when_budget_cuts_history():
+    state = _state(history_turns=200)
+    summary = "Cliente prefere a Bia, faz luzes a cada 3 meses e só pode às quintas."
+    context = state["appointment_context"]
+    context["history"] = f"Resumo do cliente:\n{summary}\n\n{context['history']}"
+    context["summary"] = summary
+
+    built = build_scheduling_context(state, token_budget=300)
+
+    assert count_tokens(built) <= 300
+    assert f"Resumo do cliente:\n{summary}" in built
+    # O corte vem dos turnos antigos; os mais recentes continuam
+    assert "resposta 199" in built and "pergunta 0 " not in built
+    assert built.index("Resumo do cliente") < built.index("historico:")
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+from agents.metrics import metrics
+from agents import prompts as prompts_module
+from agents.prompts import PREFIX_FINGERPRINTS, SCHEDULING_PREFIX, STATIC_PREFIXES, SVIMPrompts
+from agents.tools import index as tools_index
+
+
+def _state(user_id, cliente_id, draft):
+    return {
+        "messages": [{"role": "user", "content": "quero marcar um corte"}],
+        "user_id": user_id,
+        "intent": "schedule",
+        "customer_profile": {"clienteId": cliente_id, "name": f"Cliente {cliente_id}"},
+        "appointment_context": {"appointment_draft": draft, "history": f"user: oi, sou {user_id}"},
+        "policies_context": {"policies_text": "Cancelamentos com 24h."},
+    }
+
+
+def test_prompts_start_with_byte_identical_static_prefix():
+    prompts = SVIMPrompts()
+    first = prompts.get_scheduling_prompt(_state("u1", 555, {"serviceId": 1}), cliente_id=555, cliente_nome="Ana")
+    second = prompts.get_scheduling_prompt(_state("u2", 777, {"professionalId": 9}), cliente_id=777)
+
+    shared = os.path.commonprefix([first.encode("utf-8"), second.encode("utf-8")])
+    assert shared.startswith(SCHEDULING_PREFIX.encode("utf-8"))
+    assert "**555**" in first and "555" not in SCHEDULING_PREFIX
+    assert first.index("**555**") > len(SCHEDULING_PREFIX) - 1
+
+    assert prompts.get_base_conversation_prompt("ctx A").startswith(STATIC_PREFIXES["base"])
+    assert prompts.get_single_pass_prompt("ctx B", "p").startswith(STATIC_PREFIXES["single_pass"])
+    assert prompts.get_summary_prompt("- gosta da Bia").startswith(STATIC_PREFIXES["summary"])
+    assert prompts.get_review_prompt(["promessa"], first).startswith(STATIC_PREFIXES["review"])
+
+
+def test_check_prefix_flags_dynamic_data_in_prefix():
+    prompts = SVIMPrompts()
+    metrics.reset()
+
+    assert prompts.check_prefix("base", prompts.get_base_conversation_prompt("ctx"))
+    assert not prompts.check_prefix("base", "cliente 555\n" + STATIC_PREFIXES["base"])
+    assert metrics.counter("prompt.prefix_hits") == 1
+    assert metrics.counter("prompt.prefix_mismatch") == 1
+
+
+def test_check_prefix_compares_turns_against_import_fingerprint(monkeypatch):
+    prompts = SVIMPrompts()
+    metrics.reset()
+
+    # Dois turnos com estados diferentes: mesmo hash de prefixo nos dois
+    turns = [
+        prompts.get_scheduling_prompt(_state("u1", 555, {"serviceId": 1}), cliente_id=555, cliente_nome="Ana"),
+        prompts.get_scheduling_prompt(_state("u2", 777, {"professionalId": 9, "date": "2025-12-15"}), cliente_id=777),
+    ]
+    assert turns[0] != turns[1]
+    assert all(prompts.check_prefix("scheduling", prompt) for prompt in turns)
+    assert prompts_module.prefix_fingerprints()["scheduling"] == PREFIX_FINGERPRINTS["scheduling"]
+
+    # Prefixo remontado no turno com dado do cliente: a própria tabela muda junto,
+    # mas o hash da importação não
+    drifted = "Cliente 555.\n" + STATIC_PREFIXES["base"]
+    monkeypatch.setattr(prompts_module, "BASE_CONVERSATION_PREFIX", drifted)
+    monkeypatch.setitem(STATIC_PREFIXES, "base", drifted)
+    assert not prompts.check_prefix("base", prompts.get_base_conversation_prompt("ctx"))
+    assert metrics.counter("prompt.prefix_mismatch") == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduling_turns_reuse_cached_prefix(fake_openai_server, svim_agent_factory, monkeypatch):
+    async def no_catalog(*args, **kwargs):
+        return {"data": []}
+
+    for tool in tools_index.TOOLS:
+        monkeypatch.setitem(tool, "py_fn", no_catalog)
+
+    def respond(body):
+        if "classificador de intenção" in body["messages"][0]["content"]:
+            return {"intent": "schedule"}
+        return "Qual dia você prefere?"
+
+    fake_openai_server.chat_responder = respond
+    agent = svim_agent_factory(write_behind=False)
+    metrics.reset()
+
+    turns = [("5511900000001", "quero marcar um corte"), ("5511900000002", "quero agendar escova na sexta")] * 3
+    usages = [
+        (await agent.process_message(user_id=user_id, message=message))["metadata"]["llm_usage"]
+        for user_id, message in turns
+    ]
+
+    scheduling_prompts = [
+        body["messages"][0]["content"]
+        for body in fake_openai_server.requests
+        if "messages" in body and "assistente de agendamentos" in body["messages"][0]["content"]
+    ]
+    assert len(scheduling_prompts) == len(turns)
+    assert len(os.path.commonprefix(scheduling_prompts)) >= len(SCHEDULING_PREFIX)
+    assert metrics.counter("prompt.prefix_mismatch") == 0
+
+    # A primeira chamada aquece o cache; as seguintes reaproveitam o prefixo
+    assert usages[0]["cached_tokens"] == 0
+    assert all(usage["cached_tokens"] > 0 for usage in usages[1:])
+    ratio = metrics.ratio("llm.cached_tokens", "llm.prompt_tokens")
+    assert ratio > 0.5
@@ -14,3 +14,39 @@ def test_resolve_service_prefers_haircut_over_other_categories():
     assert resolved
     assert resolved["id"] == 2
     assert "corte" in resolved["nome"].lower()
+
+
+def test_resolve_professional_folds_accents_and_reuses_snapshot_index():
+    from agents.resolvers.index import CatalogIndex
+    from agents.resolvers.service import resolve_professional
+
+    professionals_list = [
+        {"id": 1, "nome": "Luciana Souza", "apelido": "Lu"},
+        {"id": 2, "nome": "Beatrice Zuppo Pardini"},
+    ]
+
+    assert resolve_professional("pode ser com a BEATRICE?", professionals_list)["id"] == 2
+    assert resolve_professional("quero com a Lúciana", professionals_list)["id"] == 1
+    assert resolve_professional("tanto faz", professionals_list) is None
+
+    first = CatalogIndex.for_snapshot(professionals=professionals_list)
+    assert CatalogIndex.for_snapshot(professionals=professionals_list) is first
+
+
+def test_rank_professionals_tolerates_typos_and_flags_ambiguity():
+    from agents.resolvers.service import pick_candidate, rank_professionals
+
+    professionals_list = [
+        {"id": 1, "nome": "Beatrice Zuppo Pardini"},
+        {"id": 2, "nome": "Luciana Souza"},
+        {"id": 3, "nome": "Beatriz Lima"},
+    ]
+
+    candidates = rank_professionals("quero com a luciane amanhã", professionals_list)
+    assert [c.item["id"] for c in candidates] == [2]
+    assert pick_candidate(candidates, min_score=0.6)["id"] == 2
+
+    # "beatris" fica praticamente no meio de Beatriz e Beatrice: não escolhe sozinho
+    candidates = rank_professionals("pode ser com a beatris", professionals_list)
+    assert {c.item["id"] for c in candidates} == {1, 3}
+    assert pick_candidate(candidates, min_score=0.6) is None
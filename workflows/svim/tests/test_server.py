@@ -0,0 +1,69 @@
+import asyncio
+import socket
+
+import pytest
+
+from agents.run_once import forward_to_server
+from agents.server import SVIMServer
+
+
+class SlowAgent:
+    """Agente falso: simula só o tempo de LLM de cada mensagem."""
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def process(self, input_data, user_id=None):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return {"success": True, "response": f"eco: {input_data['message']}", "metadata": {"user_id": user_id}}
+
+
+@pytest.mark.asyncio
+async def test_server_reuses_agent_and_serves_concurrently():
+    agent = SlowAgent(delay=0.2)
+    server = SVIMServer(agent, port=0)
+    http_server = await server.start_http()
+    url = f"http://{server.host}:{server.port}"
+
+    try:
+        results = await asyncio.gather(
+            *[
+                asyncio.to_thread(forward_to_server, {"message": f"oi {i}", "user_id": str(i)}, url)
+                for i in range(10)
+            ]
+        )
+    finally:
+        http_server.close()
+        await http_server.wait_closed()
+
+    assert agent.calls == 10
+    assert [r["response"] for r in results] == [f"eco: oi {i}" for i in range(10)]
+    # Um agente só, atendendo as mensagens em paralelo
+    assert agent.max_in_flight > 1
+
+
+def test_forward_to_server_returns_none_when_server_is_down():
+    assert forward_to_server({"message": "oi"}, "http://127.0.0.1:9") is None
+
+
+def test_forward_to_server_does_not_fall_back_after_read_timeout(monkeypatch):
+    # Aceita a conexão (backlog) mas nunca responde: o servidor pode estar processando
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    monkeypatch.setenv("SVIM_SERVER_TIMEOUT", "0.2")
+    try:
+        result = forward_to_server({"message": "oi"}, f"http://127.0.0.1:{listener.getsockname()[1]}")
+    finally:
+        listener.close()
+
+    assert result is not None and result["success"] is False
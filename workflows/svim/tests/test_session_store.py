@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+
+from agents.session_store import InMemorySessionStore, SQLSessionStore, create_session_store, update_session
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemorySessionStore()
+    return SQLSessionStore(create_engine(f"sqlite:///{tmp_path / 'sessions.db'}", future=True))
+
+
+@pytest.mark.asyncio
+async def test_compare_and_set_is_versioned(store):
+    assert await store.get("u") is None
+    assert await store.compare_and_set("u", {"intent": "info"}, 0)
+    # Outro escritor que também achava que o estado não existia perde
+    assert not await store.compare_and_set("u", {"intent": "schedule"}, 0)
+
+    state = await store.get("u")
+    assert state.data == {"intent": "info"} and state.version == 1
+    assert await store.compare_and_set("u", {"intent": "schedule"}, 1)
+    assert not await store.compare_and_set("u", {"intent": "stale"}, 1)
+    assert (await store.get("u")).data == {"intent": "schedule"}
+    await store.aclose()
+
+
+@pytest.mark.asyncio
+async def test_update_session_merges_concurrent_turns(store):
+    base = await store.get("u")
+
+    def append(text):
+        return lambda previous: {"messages": ((previous or {}).get("messages") or []) + [text]}
+
+    # Dois turnos leram o mesmo estado (vazio) e gravam ao mesmo tempo
+    first, second = await asyncio.gather(
+        update_session(store, "u", base, append("a")),
+        update_session(store, "u", base, append("b")),
+    )
+
+    assert first is not None and second is not None
+    state = await store.get("u")
+    assert sorted(state.data["messages"]) == ["a", "b"]
+    assert state.version == 2
+
+
+def test_create_session_store_by_url(tmp_path):
+    assert isinstance(create_session_store(None), InMemorySessionStore)
+    assert isinstance(create_session_store(f"sqlite:///{tmp_path / 's.db'}"), SQLSessionStore)
+
+
+@pytest.mark.asyncio
+async def test_agent_loads_context_from_session_store(fake_openai_server, svim_agent_factory, monkeypatch, tmp_path):
+    fake_openai_server.chat_responder = lambda body: "Oi! Como posso ajudar?"
+    agent = svim_agent_factory(session_store_url=f"sqlite:///{tmp_path / 'sessions.db'}")
+    qdrant_reads = []
+    original = agent.vector_store.get_recent_context
+
+    async def counting_recent_context(*args, **kwargs):
+        qdrant_reads.append(kwargs.get("user_id"))
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(agent.vector_store, "get_recent_context", counting_recent_context)
+
+    await agent.process_message(
+        user_id="5511999990000",
+        message="oi, tudo bem?",
+        appointment_context={"appointment_draft": {"servico": "corte"}},
+    )
+    await agent.process_message(user_id="5511999990000", message="qual o horário de sábado?")
+    await agent.aclose()
+
+    # Só o primeiro turno (sem estado salvo) consultou o Qdrant
+    assert qdrant_reads == ["5511999990000"]
+    state = await agent.session_store.get("5511999990000")
+    assert state.version == 2
+    assert [m["content"] for m in state.data["messages"] if m["role"] == "user"] == [
+        "oi, tudo bem?",
+        "qual o horário de sábado?",
+    ]
+    assert state.data["appointment_context"]["appointment_draft"] == {"servico": "corte"}
+    assert "history" not in state.data["appointment_context"]
@@ -0,0 +1,115 @@
+import statistics
+import time
+
+import pytest
+
+from agents.tools import index as tools_index
+
+INFO_MESSAGES = [
+    "vocês atendem noivas em feriado?",
+    "tem alguém que faça penteado de festa?",
+    "meu cabelo é bem cacheado, vocês trabalham com isso?",
+]
+SMALLTALK_MESSAGES = [
+    "minha amiga indicou vocês, adorei o insta",
+    "hoje tô precisando de um mimo kkk",
+]
+
+
+def _responder(single_pass_reply):
+    def respond(body):
+        system = body["messages"][0]["content"]
+        last = body["messages"][-1]["content"]
+        if body.get("response_format"):
+            return single_pass_reply
+        if "classificador de intenção" in system:
+            return {"intent": "info" if "?" in last else "smalltalk"}
+        return "Atendemos sim! 😊"
+
+    return respond
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(q * (len(values) - 1)))]
+
+
+@pytest.mark.asyncio
+async def test_single_pass_answers_with_one_call(fake_openai_server, svim_agent_factory):
+    fake_openai_server.chat_responder = _responder({"intent": "info", "reply": "Atendemos sim! 😊"})
+    agent = svim_agent_factory(single_pass=True)
+
+    result = await agent.process_message(user_id="u1", message=INFO_MESSAGES[0])
+
+    assert result["response"] == "Atendemos sim! 😊"
+    assert result["metadata"]["intent"] == "info"
+    assert result["metadata"]["llm_usage"]["llm_calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_single_pass_falls_back_for_scheduling(fake_openai_server, svim_agent_factory, monkeypatch):
+    async def no_catalog(*args, **kwargs):
+        return {"data": []}
+
+    for tool in tools_index.TOOLS:
+        monkeypatch.setitem(tool, "py_fn", no_catalog)
+
+    fake_openai_server.chat_responder = _responder({"intent": "schedule", "reply": ""})
+    agent = svim_agent_factory(single_pass=True)
+
+    result = await agent.process_message(user_id="u1", message="dá pra encaixar a Bia pra mim?")
+
+    assert result["metadata"]["intent"] == "schedule"
+    assert result["response"] == "Atendemos sim! 😊"
+    # single-pass + scheduling prompt, sem a chamada de classificação
+    assert result["metadata"]["llm_usage"]["llm_calls"] == 2
+    chat_requests = [body for body in fake_openai_server.requests if "messages" in body]
+    assert "assistente de agendamentos" in chat_requests[-1]["messages"][0]["content"]
+
+
+@pytest.mark.asyncio
+async def test_single_pass_invalid_json_uses_two_step_path(fake_openai_server, svim_agent_factory):
+    fake_openai_server.chat_responder = _responder("isso não é json")
+    agent = svim_agent_factory(single_pass=True)
+
+    result = await agent.process_message(user_id="u1", message=INFO_MESSAGES[1])
+
+    assert result["response"] == "Atendemos sim! 😊"
+    assert result["metadata"]["intent"] == "info"
+    assert result["metadata"]["llm_usage"]["llm_calls"] == 3
+
+
+@pytest.mark.bench
+@pytest.mark.asyncio
+async def test_benchmark_single_pass_vs_two_step(fake_openai_server, svim_agent_factory):
+    fake_openai_server.latency = 0.02
+    fake_openai_server.chat_responder = _responder({"intent": "info", "reply": "Atendemos sim! 😊"})
+
+    report = {}
+    for mode in ("two_step", "single_pass"):
+        agent = svim_agent_factory(single_pass=mode == "single_pass")
+        latencies, tokens, calls = [], [], []
+        for i, message in enumerate((INFO_MESSAGES + SMALLTALK_MESSAGES) * 4):
+            started = time.perf_counter()
+            result = await agent.process_message(user_id=f"u{i}", message=message)
+            latencies.append((time.perf_counter() - started) * 1000)
+            usage = result["metadata"]["llm_usage"]
+            tokens.append(usage["prompt_tokens"] + usage["completion_tokens"])
+            calls.append(usage["llm_calls"])
+        report[mode] = {
+            "p50_ms": _percentile(latencies, 0.5),
+            "p95_ms": _percentile(latencies, 0.95),
+            "calls": statistics.mean(calls),
+            "tokens": statistics.mean(tokens),
+        }
+
+    print("\n[bench] mode         p50_ms  p95_ms  calls/turn  tokens/turn")
+    for mode, row in report.items():
+        print(
+            f"[bench] {mode:<12} {row['p50_ms']:7.1f} {row['p95_ms']:7.1f} "
+            f"{row['calls']:10.1f} {row['tokens']:12.0f}"
+        )
+
+    assert report["single_pass"]["calls"] == 1
+    assert report["two_step"]["calls"] == 2
+    assert report["single_pass"]["p50_ms"] < report["two_step"]["p50_ms"]
@@ -0,0 +1,112 @@
+import statistics
+
+import pytest
+
+from agents.metrics import metrics
+from agents.tokens import count_tokens, fit_recent_messages, truncate_to_tokens
+
+SUMMARY = "- Prefere a Bia para corte\n- Cabelo cacheado, faz hidratação mensal"
+LONG_REPLY = (
+    "Claro! Temos horários com a Bia na terça e na quinta à tarde, e a hidratação "
+    "para cabelo cacheado leva cerca de uma hora. Quer que eu veja um horário para você?"
+)
+
+
+def _responder(body):
+    system = body["messages"][0]["content"]
+    if "resumo curto sobre um cliente" in system:
+        return SUMMARY
+    if "classificador de intenção" in system:
+        return {"intent": "info"}
+    return LONG_REPLY
+
+
+def test_fit_recent_messages_keeps_newest_within_budget():
+    messages = [{"role": "user", "content": f"mensagem número {i} " * 5} for i in range(10)]
+
+    fitted = fit_recent_messages(messages, budget=80)
+
+    assert fitted == messages[-len(fitted):]
+    assert 0 < len(fitted) < 10
+    assert sum(count_tokens(m["content"]) + 4 for m in fitted) <= 80
+    assert fit_recent_messages(messages, budget=10_000, max_messages=3) == messages[-3:]
+
+
+def test_truncate_to_tokens():
+    text = "palavra " * 200
+    assert count_tokens(truncate_to_tokens(text, 20)) <= 21
+    assert truncate_to_tokens("curto", 20) == "curto"
+
+
+async def _run_conversation(agent, turns):
+    usages = []
+    for i in range(turns):
+        result = await agent.process_message(
+            user_id="5511999990000", message=f"vocês têm horário com a Bia para hidratação na semana {i}?"
+        )
+        usages.append(result["metadata"]["llm_usage"]["prompt_tokens"])
+    return usages
+
+
+@pytest.mark.asyncio
+async def test_long_conversation_is_summarized_and_compacted(fake_openai_server, svim_agent_factory):
+    fake_openai_server.chat_responder = _responder
+    agent = svim_agent_factory(
+        write_behind=False, summary_every_messages=8, max_context_messages=10, history_token_budget=250
+    )
+    metrics.reset()
+
+    await _run_conversation(agent, 12)
+
+    state = await agent.session_store.get("5511999990000")
+    assert state.data["summary"] == SUMMARY
+    assert state.data["message_count"] == 24
+    assert len(state.data["messages"]) <= agent.session_max_messages
+    assert metrics.counter("summary.updates") >= 2
+
+    prompts = [
+        body["messages"][0]["content"]
+        for body in fake_openai_server.requests
+        if "messages" in body and "resumo curto" not in body["messages"][0]["content"]
+    ]
+    assert "Resumo do cliente" in prompts[-1]
+    assert metrics.summary("context.history_tokens")["max"] <= 250
+
+
+@pytest.mark.asyncio
+async def test_summary_runs_in_background_when_session_ends(fake_openai_server, svim_agent_factory):
+    fake_openai_server.chat_responder = _responder
+    agent = svim_agent_factory()
+
+    await agent.process_message(user_id="u1", message="quero hidratação com a Bia, meu cabelo é cacheado")
+    result = await agent.process_message(user_id="u1", message="obrigada, tchau")
+    await agent.write_behind.flush()
+
+    assert result["metadata"]["finish_session"]
+    # O resumo não conta no uso de LLM do turno
+    assert result["metadata"]["llm_usage"]["llm_calls"] <= 2
+    state = await agent.session_store.get("u1")
+    assert state.data["summary"] == SUMMARY
+    assert state.data["summarized_count"] == 4
+    await agent.aclose()
+
+
+@pytest.mark.asyncio
+async def test_prompt_tokens_before_and_after(fake_openai_server, svim_agent_factory):
+    fake_openai_server.chat_responder = _responder
+    turns = 20
+
+    # Antes: histórico cru das últimas mensagens, sem resumo nem orçamento
+    before_agent = svim_agent_factory(
+        write_behind=False, summary_enabled=False, max_context_messages=20, history_token_budget=100_000
+    )
+    before = await _run_conversation(before_agent, turns)
+
+    after_agent = svim_agent_factory(
+        write_behind=False, summary_every_messages=10, max_context_messages=20, history_token_budget=300
+    )
+    after = await _run_conversation(after_agent, turns)
+
+    # Mesmo começo; com o histórico crescendo o orçamento passa a valer
+    tail_before, tail_after = statistics.mean(before[-5:]), statistics.mean(after[-5:])
+    assert tail_after < tail_before
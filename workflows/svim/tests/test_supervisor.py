@@ -0,0 +1,89 @@
+import pytest
+
+from agents.supervisor import REASON_PROMISE, REASON_SECRET, ResponseSupervisor
+
+
+def test_clean_response_has_no_flags():
+    supervisor = ResponseSupervisor()
+
+    review = supervisor.review("Seu horário com a Bia está marcado para sexta às 15h 😊. Enviamos o token de confirmação por SMS.")
+
+    assert review.reasons == []
+    assert not review.needs_llm
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ("Um momento, por favor! Temos horário amanhã às 10h.", "Temos horário amanhã às 10h."),
+        ("Temos horário amanhã às 10h. TODO: confirmar valor", "Temos horário amanhã às 10h."),
+        ("Sua senha: abc12345 está salva.", "Sua senha: [removido] está salva."),
+        ("A senha é: Abc12345", "A senha é: [removido]"),
+        ("Sua senha provisória é Xy7#kL9p", "Sua senha provisória é [removido]"),
+        ("Use a chave sk-abcdef1234567890 para acessar.", "Use a chave [removido] para acessar."),
+        ("Perfeito!\nSó um instante, por favor.\nCorte às 15h confirmado.", "Perfeito!\nCorte às 15h confirmado."),
+    ],
+)
+def test_local_rewrites(content, expected):
+    review = ResponseSupervisor().review(content)
+
+    assert review.content == expected
+    assert not review.needs_llm
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "Pode aguardar um momento enquanto a Bia termina o atendimento?",
+        "Em um instante, por favor, confira se o horário das 15h serve.",
+        "A senha é minha e não compartilho.",
+        "O token é enviado por SMS.",
+    ],
+)
+def test_ordinary_replies_are_left_alone(content):
+    review = ResponseSupervisor().review(content)
+
+    assert review.content == content
+    assert not review.needs_llm
+
+
+def test_ambiguous_secret_goes_to_llm_without_local_masking():
+    review = ResponseSupervisor().review("A senha é Bolinha, anote aí.")
+
+    assert REASON_SECRET in review.reasons
+    assert review.needs_llm
+    assert "Bolinha" in review.content
+
+
+def test_secret_value_not_masked_locally_goes_to_llm():
+    review = ResponseSupervisor().review("Use o token 4F9kQ2x no app para entrar.")
+
+    assert REASON_SECRET in review.reasons
+    assert review.needs_llm
+
+
+def test_structural_issues_escalate_to_llm():
+    review = ResponseSupervisor().review("Vou verificar a agenda e te aviso. Token: abcd1234")
+
+    assert review.needs_llm
+    assert REASON_PROMISE in review.reasons
+    assert REASON_SECRET in review.reasons
+    assert "abcd1234" not in review.content
+
+
+def test_placeholder_only_response_escalates():
+    review = ResponseSupervisor().review("TODO: preencher resposta")
+
+    assert review.needs_llm
+
+
+@pytest.mark.asyncio
+async def test_agent_skips_review_call_for_local_fix(fake_openai_server, svim_agent_factory):
+    fake_openai_server.chat_responder = lambda body: "Um momento, por favor. Abrimos às 10h 😊"
+    agent = svim_agent_factory()
+
+    result = await agent.process_message(user_id="u1", message="vocês atendem noivas em feriado?")
+
+    assert result["response"] == "Abrimos às 10h 😊"
+    # classificação + resposta, sem a chamada de revisão
+    assert result["metadata"]["llm_usage"]["llm_calls"] == 2
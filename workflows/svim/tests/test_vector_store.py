@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+
+from agents.infra import ensure_qdrant_collection
+from agents.metrics import metrics
+from agents.vector_store import SVIMVectorStore
+
+
+class StaticEmbedder:
+    async def embed_many(self, texts):
+        return [[1.0, 0.0, 0.0, 0.0] for _ in texts]
+
+
+class CountingQdrant:
+    """Repassa ao QdrantClient local contando as chamadas de scroll."""
+
+    def __init__(self, client):
+        self._client = client
+        self.scrolls = 0
+
+    def scroll(self, *args, **kwargs):
+        self.scrolls += 1
+        return self._client.scroll(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def _store(legacy_fallback=None):
+    client = QdrantClient(":memory:")
+    ensure_qdrant_collection(client, "svim_memory", vector_size=4)
+    counting = CountingQdrant(client)
+    return SVIMVectorStore(counting, "svim_memory", embedder=StaticEmbedder(), legacy_fallback=legacy_fallback), counting
+
+
+async def _save_turns(store, user_id, n, start=None):
+    start = start or datetime(2025, 1, 1, 9, 0)
+    for i in range(n):
+        await store.add_conversation(
+            user_id,
+            "s1",
+            [{"role": "user", "content": f"pergunta {i}"}, {"role": "assistant", "content": f"resposta {i}"}],
+            metadata={"timestamp": (start + timedelta(minutes=i)).isoformat(), "turn": i},
+        )
+
+
+@pytest.mark.asyncio
+async def test_recent_context_returns_latest_messages_in_order():
+    store, qdrant = _store()
+    await _save_turns(store, "5511999990000", 30)
+    await _save_turns(store, "5511888880000", 3)
+    qdrant.scrolls = 0
+
+    messages, latest = await store.get_recent_context("5511999990000", k=6)
+
+    assert [m["content"] for m in messages] == [
+        "pergunta 27", "resposta 27", "pergunta 28", "resposta 28", "pergunta 29", "resposta 29",
+    ]
+    assert latest["turn"] == 29
+    assert qdrant.scrolls == 1
+
+
+@pytest.mark.asyncio
+async def test_wrappers_keep_previous_api():
+    store, _ = _store()
+    await _save_turns(store, "u", 5)
+
+    assert [m["content"] for m in await store.get_user_context("u", k=2)] == ["pergunta 4", "resposta 4"]
+    assert (await store.get_latest_metadata("u"))["turn"] == 4
+    assert await store.get_latest_metadata("desconhecido") == {}
+
+
+@pytest.mark.asyncio
+async def test_legacy_points_without_ts_fall_back_and_backfill():
+    store, qdrant = _store()
+    base = datetime(2024, 6, 1)
+    qdrant.upsert(
+        collection_name="svim_memory",
+        points=[
+            PointStruct(
+                id=i,
+                vector=[1.0, 0.0, 0.0, 0.0],
+                payload={
+                    "user_id": "u",
+                    "messages": [{"role": "user", "content": f"antiga {i}"}],
+                    "metadata": {"timestamp": (base + timedelta(days=i)).isoformat(), "turn": i},
+                },
+            )
+            for i in (3, 0, 2, 1)
+        ],
+    )
+    metrics.reset()
+
+    messages, latest = await store.get_recent_context("u", k=2)
+    assert [m["content"] for m in messages] == ["antiga 2", "antiga 3"]
+    assert latest["turn"] == 3
+    assert metrics.counter("vector_store.legacy_scroll") == 1
+
+    assert store.backfill_ts() == 4
+    assert store.legacy_fallback is False
+    messages, latest = await store.get_recent_context("u", k=2)
+    assert [m["content"] for m in messages] == ["antiga 2", "antiga 3"]
+    assert latest["turn"] == 3
+
+
+@pytest.mark.asyncio
+async def test_collection_without_legacy_points_skips_legacy_scroll():
+    store, client = _store()
+    await _save_turns(store, "antigo", 3)
+    metrics.reset()
+
+    # Usuário novo (cold start): o scroll ordenado volta vazio
+    for user_id in ("novo-1", "novo-2", "novo-3"):
+        assert await store.get_recent_context(user_id, k=5) == ([], {})
+
+    # Só a checagem da primeira vez (um scroll limit=1), nenhum scroll antigo
+    assert metrics.counter("vector_store.legacy_scroll") == 0
+    assert store.legacy_fallback is False
+    assert client.scrolls == 3 + 1
+
+
+@pytest.mark.asyncio
+async def test_context_load_cost_does_not_grow_with_history():
+    store, client = _store(legacy_fallback=False)
+    await _save_turns(store, "curto", 5)
+    await _save_turns(store, "longo", 400)
+
+    scrolls = {}
+    for user_id in ("curto", "longo"):
+        client.scrolls = 0
+        messages, _ = await store.get_recent_context(user_id, k=10)
+        scrolls[user_id] = client.scrolls
+        assert len(messages) == 10
+
+    # Uma leitura ordenada e limitada, com 5 ou 400 turnos no histórico
+    assert scrolls == {"curto": 1, "longo": 1}
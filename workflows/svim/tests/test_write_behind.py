@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+
+from agents.write_behind import WriteBehindQueue
+
+
+@pytest.mark.asyncio
+async def test_retries_failed_jobs():
+    attempts = []
+
+    async def flaky(payload):
+        attempts.append(payload["n"])
+        if len(attempts) < 3:
+            raise ConnectionError("qdrant down")
+
+    queue = WriteBehindQueue({"memory": flaky}, max_retries=3, backoff_base=0.01)
+    await queue.submit("memory", {"n": 1})
+    await queue.aclose()
+
+    assert attempts == [1, 1, 1]
+    assert queue.failed == 0
+
+
+@pytest.mark.asyncio
+async def test_bounded_queue_applies_backpressure():
+    release = asyncio.Event()
+
+    async def blocked(payload):
+        await release.wait()
+
+    queue = WriteBehindQueue({"log": blocked}, max_size=1, workers=1)
+    await queue.submit("log", {})  # em execução no worker
+    await queue.submit("log", {})  # ocupa a fila
+
+    third = asyncio.create_task(queue.submit("log", {}))
+    await asyncio.sleep(0.05)
+    assert not third.done()
+
+    release.set()
+    await third
+    await queue.aclose()
+
+
+@pytest.mark.asyncio
+async def test_journal_replays_jobs_after_crash(tmp_path):
+    journal = str(tmp_path / "write_behind.jsonl")
+    never = asyncio.Event()
+
+    async def stuck(payload):
+        await never.wait()
+
+    crashed = WriteBehindQueue({"memory": stuck}, journal_path=journal)
+    await crashed.submit("memory", {"point_id": "p-1"})
+    await crashed.submit("memory", {"point_id": "p-2"})
+    # "crash": workers morrem sem flush
+    for task in crashed._workers:
+        task.cancel()
+    crashed._close_journal()
+
+    written = []
+
+    async def write(payload):
+        written.append(payload["point_id"])
+
+    recovered = WriteBehindQueue({"memory": write}, journal_path=journal)
+    await recovered.start()
+    await recovered.aclose()
+
+    assert sorted(written) == ["p-1", "p-2"]
+    # Tudo concluído: a próxima abertura compacta o journal para vazio
+    WriteBehindQueue({"memory": write}, journal_path=journal)._open_journal()
+    with open(journal, encoding="utf-8") as fh:
+        assert [json.loads(line) for line in fh] == []
+
+
+@pytest.mark.asyncio
+async def test_agent_responds_before_memory_is_written(fake_openai_server, svim_agent_factory, monkeypatch):
+    fake_openai_server.chat_responder = lambda body: {"intent": "smalltalk"} if body.get("max_tokens") == 32 else "Oi! 😊"
+    agent = svim_agent_factory()
+    saved = []
+
+    async def slow_add_conversation(**kwargs):
+        await asyncio.sleep(0.5)
+        saved.append(kwargs)
+
+    monkeypatch.setattr(agent.vector_store, "add_conversation", slow_add_conversation)
+
+    result = await agent.process_message(user_id="u1", message="oi")
+
+    # A resposta sai com a gravação da memória ainda na fila
+    assert result["response"] == "Oi! 😊"
+    assert saved == []
+
+    await agent.aclose()
+    assert len(saved) == 1
+    assert saved[0]["point_id"]